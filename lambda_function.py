@@ -1,25 +1,61 @@
 import json
 import boto3
+import botocore.exceptions
+from boto3.s3.transfer import TransferConfig
 import time
 import uuid
 import os
+import sys
+import sqlite3
+import threading
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 import traceback
 import logging
 from dotenv import load_dotenv
-import requests
+import httpx
 import base64
 import asyncio
+import bisect
+import functools
+import hashlib
+import heapq
+import io
+import itertools
+import multiprocessing
+import signal
+import zlib
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter, OrderedDict, deque
+from tempfile import SpooledTemporaryFile
 from contextlib import asynccontextmanager
 
 # FastAPI imports
-from fastapi import FastAPI, HTTPException, Request, BackgroundTasks, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Request, Header, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from fastapi.websockets import WebSocketState
 from pydantic import BaseModel
+from python_multipart.exceptions import FormParserError
+from python_multipart.multipart import MultipartParser, parse_options_header
 import uvicorn
 
+try:
+    import orjson  # Optional fast JSON encoder for large responses
+except ImportError:
+    orjson = None
+
+try:
+    import redis.asyncio as redis_asyncio  # Optional cross-process progress bus
+except ImportError:
+    redis_asyncio = None
+
+try:
+    import msgpack  # Optional compact binary WebSocket encoding
+except ImportError:
+    msgpack = None
+
 # Load environment variables
 load_dotenv()
 
@@ -38,6 +74,7 @@ VIDEO_OUTPUT_BUCKET = os.environ.get('VIDEO_OUTPUT_BUCKET', 'creative-brief-vide
 IMAGE_OUTPUT_BUCKET = os.environ.get('IMAGE_OUTPUT_BUCKET', 'creative-brief-visual-assets-087432099530')
 BEDROCK_AGENT_ID = os.environ.get('BEDROCK_AGENT_ID', 'F0DBNGWGKS')
 BEDROCK_AGENT_ALIAS_ID = os.environ.get('BEDROCK_AGENT_ALIAS_ID', 'OQR0YT8I99')
+BEDROCK_ENHANCE_MODEL_ID = os.environ.get('BEDROCK_ENHANCE_MODEL_ID', 'anthropic.claude-3-haiku-20240307-v1:0')
 
 # API Keys
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY', '')
@@ -58,37 +95,1301 @@ HAILUO_AVAILABLE = bool(MINIMAX_API_KEY and len(MINIMAX_API_KEY) > 10)
 RUNWAY_API_BASE = 'https://api.dev.runwayml.com/v1'
 RUNWAY_API_VERSION = '2024-11-06'
 
+# I/O limits - every provider, S3 and Bedrock call shares this in-flight budget
+MAX_INFLIGHT_IO = int(os.environ.get('MAX_INFLIGHT_IO', 32))
+HTTP_TIMEOUT_SECONDS = float(os.environ.get('HTTP_TIMEOUT_SECONDS', 60))
+PROGRESS_MIRROR_THREADS = int(os.environ.get('PROGRESS_MIRROR_THREADS', 2))
+
+# Runway task polling - (min, max) seconds between polls per task state
+RUNWAY_POLL_PENDING_MIN = float(os.environ.get('RUNWAY_POLL_PENDING_MIN', 5))
+RUNWAY_POLL_PENDING_MAX = float(os.environ.get('RUNWAY_POLL_PENDING_MAX', 30))
+RUNWAY_POLL_RUNNING_MIN = float(os.environ.get('RUNWAY_POLL_RUNNING_MIN', 3))
+RUNWAY_POLL_RUNNING_MAX = float(os.environ.get('RUNWAY_POLL_RUNNING_MAX', 15))
+RUNWAY_TASK_TIMEOUT = float(os.environ.get('RUNWAY_TASK_TIMEOUT', 300))
+
+# Veo 3 long-running operations
+VEO3_MODEL_ID = os.environ.get('VEO3_MODEL_ID', 'veo-3.0-generate-preview')
+VEO_POLL_MIN = float(os.environ.get('VEO_POLL_MIN', 5))
+VEO_POLL_MAX = float(os.environ.get('VEO_POLL_MAX', 20))
+VEO_OPERATION_TIMEOUT = float(os.environ.get('VEO_OPERATION_TIMEOUT', 600))
+
+# Job progress store limits
+JOB_STORE_MAX_JOBS = int(os.environ.get('JOB_STORE_MAX_JOBS', 10000))
+JOB_STORE_FINISHED_TTL = float(os.environ.get('JOB_STORE_FINISHED_TTL', 3600))
+
+# Local SQLite database for persistent indexes
+STATE_DB_PATH = os.environ.get('STATE_DB_PATH', 'creative_studio_state.db')
+
+# Visual asset catalog cache
+ASSET_CATALOG_TTL = float(os.environ.get('ASSET_CATALOG_TTL', 60))
+ASSET_LIST_CONCURRENCY = int(os.environ.get('ASSET_LIST_CONCURRENCY', 8))
+PRESIGNED_URL_EXPIRY = int(os.environ.get('PRESIGNED_URL_EXPIRY', 3600))
+PRESIGNED_URL_REFRESH_MARGIN = int(os.environ.get('PRESIGNED_URL_REFRESH_MARGIN', 300))
+ASSET_HASH_CONCURRENCY = int(os.environ.get('ASSET_HASH_CONCURRENCY', 8))
+
+# Content-addressed reference image storage
+REFERENCE_IMAGES_BUCKET = os.environ.get('REFERENCE_IMAGES_BUCKET', VISUAL_ASSETS_BUCKET)
+REFERENCE_IMAGES_PREFIX = os.environ.get('REFERENCE_IMAGES_PREFIX', 'reference-images/sha256/')
+MAX_REFERENCE_IMAGE_BYTES = int(os.environ.get('MAX_REFERENCE_IMAGE_BYTES', 25 * 1024 * 1024))
+MAX_REFERENCE_UPLOAD_FILES = int(os.environ.get('MAX_REFERENCE_UPLOAD_FILES', 10))
+
+# Provider output ingestion into S3
+INGEST_PART_SIZE = int(os.environ.get('INGEST_PART_SIZE', 8 * 1024 * 1024))
+INGEST_PARTS_IN_FLIGHT = int(os.environ.get('INGEST_PARTS_IN_FLIGHT', 4))
+INGEST_ATTEMPTS = int(os.environ.get('INGEST_ATTEMPTS', 3))
+INGEST_RETRY_DELAY = float(os.environ.get('INGEST_RETRY_DELAY', 2))
+
+# Pooled provider client tuning
+PROVIDER_POOL_MAX_CONNECTIONS = int(os.environ.get('PROVIDER_POOL_MAX_CONNECTIONS', 100))
+PROVIDER_POOL_MAX_KEEPALIVE = int(os.environ.get('PROVIDER_POOL_MAX_KEEPALIVE', 20))
+PROVIDER_KEEPALIVE_EXPIRY = float(os.environ.get('PROVIDER_KEEPALIVE_EXPIRY', 30))
+
+# Prompt enhancement cache
+ENHANCE_CACHE_MAX_ENTRIES = int(os.environ.get('ENHANCE_CACHE_MAX_ENTRIES', 1000))
+ENHANCE_CACHE_TTL = float(os.environ.get('ENHANCE_CACHE_TTL', 600))
+ENHANCE_BATCH_CONCURRENCY = int(os.environ.get('ENHANCE_BATCH_CONCURRENCY', 8))
+ENHANCE_STREAM_CONCURRENCY = int(os.environ.get('ENHANCE_STREAM_CONCURRENCY', 16))
+MAX_ENHANCE_BATCH_ITEMS = int(os.environ.get('MAX_ENHANCE_BATCH_ITEMS', 100))
+MAX_GENERATE_BATCH_ITEMS = int(os.environ.get('MAX_GENERATE_BATCH_ITEMS', 100))
+
+# Durable job queue and generation workers
+JOB_WORKER_PROCESSES = int(os.environ.get('JOB_WORKER_PROCESSES', 2))
+EMBEDDED_JOB_WORKER = os.environ.get('EMBEDDED_JOB_WORKER', 'true').lower() == 'true'
+JOB_WORKER_POLL_INTERVAL = float(os.environ.get('JOB_WORKER_POLL_INTERVAL', 1))
+JOB_LEASE_SECONDS = float(os.environ.get('JOB_LEASE_SECONDS', 60))
+JOB_FINALIZE_GRACE_SECONDS = float(os.environ.get('JOB_FINALIZE_GRACE_SECONDS', 10))
+
+# Progress fan-out between processes - memory:// for a single process, redis://host:port/db to scale out
+PROGRESS_BUS_URL = os.environ.get('PROGRESS_BUS_URL', 'memory://')
+PROGRESS_BUS_CHANNEL = os.environ.get('PROGRESS_BUS_CHANNEL', 'creative-studio:progress')
+JOB_STATE_TTL = int(os.environ.get('JOB_STATE_TTL', 3600))
+
+# Progress event coalescing and WebSocket compression
+PROGRESS_MIN_INTERVAL = float(os.environ.get('PROGRESS_MIN_INTERVAL', 1.0))
+WS_PER_MESSAGE_DEFLATE = os.environ.get('WS_PER_MESSAGE_DEFLATE', 'true').lower() == 'true'
+
+# Per-connection WebSocket limits
+WS_SEND_QUEUE_SIZE = int(os.environ.get('WS_SEND_QUEUE_SIZE', 256))
+MAX_WS_SUBSCRIPTIONS = int(os.environ.get('MAX_WS_SUBSCRIPTIONS', 1000))
+
+# Server-Sent Events job status streams
+JOB_EVENT_BUFFER_SIZE = int(os.environ.get('JOB_EVENT_BUFFER_SIZE', 32))
+JOB_EVENT_LOG_MAX_JOBS = int(os.environ.get('JOB_EVENT_LOG_MAX_JOBS', 10000))
+MAX_SSE_JOBS = int(os.environ.get('MAX_SSE_JOBS', 50))
+SSE_KEEPALIVE_SECONDS = float(os.environ.get('SSE_KEEPALIVE_SECONDS', 15))
+MAX_STATUS_WAIT = float(os.environ.get('MAX_STATUS_WAIT', 30))
+
+# Write-behind job metadata persistence
+METADATA_FLUSH_INTERVAL = float(os.environ.get('METADATA_FLUSH_INTERVAL', 0.5))
+METADATA_FLUSH_BATCH = int(os.environ.get('METADATA_FLUSH_BATCH', 50))
+METADATA_TERMINAL_MEMORY = int(os.environ.get('METADATA_TERMINAL_MEMORY', 100000))
+METADATA_MAX_ATTEMPTS = int(os.environ.get('METADATA_MAX_ATTEMPTS', 8))
+METADATA_RETRY_BASE = float(os.environ.get('METADATA_RETRY_BASE', 0.5))
+METADATA_RETRY_MAX = float(os.environ.get('METADATA_RETRY_MAX', 30))
+
+# Generation history index
+HISTORY_INDEX_BACKEND = os.environ.get('HISTORY_INDEX_BACKEND', 'sqlite')
+MAX_HISTORY_PAGE_SIZE = int(os.environ.get('MAX_HISTORY_PAGE_SIZE', 200))
+
+
+# ==================== NON-BLOCKING I/O ====================
+
+# boto3 and the Bedrock agent SDK are synchronous, so they run in a bounded executor
+io_executor = ThreadPoolExecutor(max_workers=MAX_INFLIGHT_IO, thread_name_prefix='blocking-io')
+# Progress mirroring into the queue table is small and latency-sensitive, so it never queues behind transfers
+progress_executor = ThreadPoolExecutor(max_workers=PROGRESS_MIRROR_THREADS, thread_name_prefix='progress-mirror')
+# Token streams hold a thread for as long as the client reads, so they get their own pool outside the I/O budget
+enhance_stream_executor = ThreadPoolExecutor(max_workers=ENHANCE_STREAM_CONCURRENCY, thread_name_prefix='enhance-stream')
+_io_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def io_slot() -> asyncio.Semaphore:
+    """Semaphore limiting how many outbound calls are in flight at once"""
+    global _io_semaphore
+    if _io_semaphore is None:
+        # Created lazily so it binds to the server's running loop
+        _io_semaphore = asyncio.Semaphore(MAX_INFLIGHT_IO)
+    return _io_semaphore
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking SDK call in the I/O executor without stalling the event loop"""
+    async with io_slot():
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(io_executor, functools.partial(func, *args, **kwargs))
+
+
+# ==================== PROVIDER CLIENTS ====================
+
+def pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=PROVIDER_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=PROVIDER_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=PROVIDER_KEEPALIVE_EXPIRY
+    )
+
+
+class ProviderClients:
+    """Long-lived, pooled SDK and HTTP clients shared by every job
+
+    Created and warmed by the app lifespan for each configured provider in MODEL_REGISTRY;
+    accessors also create clients on first use so background workers work without it.
+    """
+
+    def __init__(self):
+        self._http: Optional[httpx.AsyncClient] = None
+        self._runway: Optional[httpx.AsyncClient] = None
+        self._openai = None
+        self._openai_http: Optional[httpx.AsyncClient] = None
+        self._genai = None
+
+    def http(self) -> httpx.AsyncClient:
+        """General-purpose pool for downloads and provider output ingestion"""
+        if self._http is None or self._http.is_closed:
+            # Provider download links (e.g. Gemini files) redirect to storage
+            self._http = httpx.AsyncClient(timeout=HTTP_TIMEOUT_SECONDS, limits=pool_limits(), follow_redirects=True)
+        return self._http
+
+    def runway(self) -> httpx.AsyncClient:
+        if self._runway is None or self._runway.is_closed:
+            self._runway = httpx.AsyncClient(
+                base_url=RUNWAY_API_BASE,
+                headers={
+                    'Authorization': f'Bearer {RUNWAY_API_KEY}',
+                    'X-Runway-Version': RUNWAY_API_VERSION,
+                    'Content-Type': 'application/json'
+                },
+                timeout=HTTP_TIMEOUT_SECONDS,
+                limits=pool_limits()
+            )
+        return self._runway
+
+    def openai(self):
+        if self._openai is None:
+            import openai
+            self._openai_http = httpx.AsyncClient(timeout=HTTP_TIMEOUT_SECONDS, limits=pool_limits())
+            self._openai = openai.AsyncOpenAI(api_key=OPENAI_API_KEY, http_client=self._openai_http)
+        return self._openai
+
+    def genai(self):
+        if self._genai is None:
+            from google import genai
+            self._genai = genai.Client(api_key=GEMINI_API_KEY)
+        return self._genai
+
+    async def start(self):
+        """Create and warm a client for every provider with an available model"""
+        configured = {
+            info['provider'] for models in MODEL_REGISTRY.values()
+            for info in models.values() if info['available']
+        }
+        self.http()
+        warm_targets = []
+        try:
+            if 'Runway' in configured:
+                warm_targets.append((self.runway(), RUNWAY_API_BASE))
+            if 'OpenAI' in configured:
+                self.openai()
+                warm_targets.append((self._openai_http, 'https://api.openai.com/v1'))
+            if 'Google' in configured:
+                self.genai()
+        except Exception as e:
+            # Jobs retry client creation on first use - never block startup on it
+            logger.error(f"Error creating provider clients: {e}")
+
+        # Open the TLS connections up front so the first job does not pay for them
+        async def warm(client: httpx.AsyncClient, url: str):
+            try:
+                await client.head(url, timeout=5)
+            except Exception as e:
+                logger.debug(f"Warm-up of {url} failed: {e}")
+
+        await asyncio.gather(*(warm(client, url) for client, url in warm_targets))
+        logger.info(f"🔗 Provider clients ready: {', '.join(sorted(configured)) or 'none'}")
+
+    async def close(self):
+        for client in (self._http, self._runway):
+            if client is not None:
+                await client.aclose()
+        if self._openai is not None:
+            await self._openai.close()
+        if self._genai is not None:
+            try:
+                await self._genai.aio.aclose()
+                self._genai.close()
+            except Exception as e:
+                logger.debug(f"Error closing Google client: {e}")
+        self._http = self._runway = self._openai = self._openai_http = self._genai = None
+
+
+providers = ProviderClients()
+
 
 # WebSocket connection manager
+def negotiate_ws_encoding(websocket: WebSocket) -> str:
+    """Pick msgpack when the client offers it as a subprotocol or ?encoding=msgpack and it is installed"""
+    offered = list(websocket.scope.get('subprotocols') or []) + [websocket.query_params.get('encoding', 'json')]
+    if 'msgpack' in offered and msgpack is not None:
+        return 'msgpack'
+    return 'json'
+
+
+def encode_msgpack(data: dict) -> bytes:
+    # Epoch seconds pack into 9 bytes instead of a 26 character ISO string
+    timestamp = data.get('timestamp')
+    if isinstance(timestamp, str):
+        data = {**data, 'timestamp': datetime.fromisoformat(timestamp).timestamp()}
+    return msgpack.packb(data)
+
+
+class Connection:
+    """One WebSocket with its own bounded send queue and drain task
+
+    Producers never await the socket: when the queue is full the oldest
+    message is dropped so a slow consumer cannot hold up generation.
+    """
+
+    def __init__(self, websocket: WebSocket, client_id: str, encoding: str, queue_size: int):
+        self.websocket = websocket
+        self.client_id = client_id
+        self.encoding = encoding
+        self.queue: deque = deque(maxlen=queue_size)
+        self.subscriptions: set = set()
+        self.dropped = 0
+        self.sent = 0
+        self._ready = asyncio.Event()
+        self._drain: Optional[asyncio.Task] = None
+
+    def start(self, on_error):
+        self._drain = asyncio.create_task(self._drain_queue(on_error))
+
+    def stop(self):
+        if self._drain is not None:
+            self._drain.cancel()
+            self._drain = None
+
+    def enqueue(self, data: dict):
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1
+        self.queue.append(data)
+        self._ready.set()
+
+    async def _drain_queue(self, on_error):
+        try:
+            while True:
+                await self._ready.wait()
+                self._ready.clear()
+                while self.queue:
+                    data = self.queue.popleft()
+                    if self.websocket.client_state != WebSocketState.CONNECTED:
+                        return
+                    if self.encoding == 'msgpack':
+                        await self.websocket.send_bytes(encode_msgpack(data))
+                    else:
+                        await self.websocket.send_json(data)
+                    self.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error sending to {self.client_id}: {e}")
+            on_error(self)
+
+
 class ConnectionManager:
+    def __init__(self, queue_size: int, max_subscriptions: int):
+        self.queue_size = queue_size
+        self.max_subscriptions = max_subscriptions
+        self.active_connections: Dict[str, set] = {}  # client_id -> every socket that client has open
+        self.job_subscribers: Dict[str, set] = {}  # job_id -> sockets subscribed to it
+
+    async def connect(self, websocket: WebSocket, client_id: str) -> Connection:
+        encoding = negotiate_ws_encoding(websocket)
+        subprotocol = encoding if encoding in (websocket.scope.get('subprotocols') or []) else None
+        await websocket.accept(subprotocol=subprotocol)
+        connection = Connection(websocket, client_id, encoding, self.queue_size)
+        self.active_connections.setdefault(client_id, set()).add(connection)
+        connection.start(self.disconnect)
+        logger.info(f"WebSocket connected: {client_id} ({encoding}, "
+                    f"{len(self.active_connections[client_id])} open)")
+        return connection
+
+    def disconnect(self, connection: Connection):
+        connection.stop()
+        sockets = self.active_connections.get(connection.client_id)
+        if sockets is None or connection not in sockets:
+            return
+        sockets.discard(connection)
+        if not sockets:
+            del self.active_connections[connection.client_id]
+        self.unsubscribe(connection, list(connection.subscriptions))
+        logger.info(f"WebSocket disconnected: {connection.client_id}")
+
+    def subscribe(self, connection: Connection, job_ids: List[str]) -> List[str]:
+        """Subscribe up to the per-connection cap; returns the job IDs accepted"""
+        accepted = []
+        for job_id in job_ids:
+            if job_id not in connection.subscriptions and len(connection.subscriptions) >= self.max_subscriptions:
+                break
+            connection.subscriptions.add(job_id)
+            self.job_subscribers.setdefault(job_id, set()).add(connection)
+            accepted.append(job_id)
+        return accepted
+
+    def unsubscribe(self, connection: Connection, job_ids: List[str]):
+        for job_id in job_ids:
+            connection.subscriptions.discard(job_id)
+            subscribers = self.job_subscribers.get(job_id)
+            if subscribers is not None:
+                subscribers.discard(connection)
+                if not subscribers:
+                    del self.job_subscribers[job_id]
+
+    async def send_progress(self, client_id: Optional[str], data: dict):
+        """Queue data for every socket of client_id and every subscriber of its job; never waits on a socket"""
+        targets = set(self.active_connections.get(client_id, ())) if client_id else set()
+        job_id = data.get('job_id')
+        if job_id:
+            targets.update(self.job_subscribers.get(job_id, ()))
+        for connection in targets:
+            connection.enqueue(data)
+
+    def stats(self) -> Dict[str, Any]:
+        connections = [c for sockets in self.active_connections.values() for c in sockets]
+        return {
+            'clients': len(self.active_connections),
+            'connections': len(connections),
+            'subscribed_jobs': len(self.job_subscribers),
+            'queued': sum(len(c.queue) for c in connections),
+            'dropped': sum(c.dropped for c in connections)
+        }
+
+
+manager = ConnectionManager(WS_SEND_QUEUE_SIZE, MAX_WS_SUBSCRIPTIONS)
+
+
+# ==================== PROGRESS BUS ====================
+
+class ProgressBus(ABC):
+    """Fans progress events out to whichever process holds the client's WebSocket
+
+    Also shares each job's latest progress so a status check served by any
+    process sees it. Subclasses provide the transport.
+    """
+
     def __init__(self):
-        self.active_connections: Dict[str, WebSocket] = {}
+        self._handlers = []
+        self.published = 0
+        self.delivered = 0
+
+    def subscribe(self, handler):
+        """Register an async handler(websocket_id, data) for every event on the bus"""
+        self._handlers.append(handler)
+
+    async def _deliver(self, websocket_id: str, data: Dict):
+        self.delivered += 1
+        for handler in self._handlers:
+            try:
+                await handler(websocket_id, data)
+            except Exception as e:
+                logger.error(f"Progress handler error for {websocket_id}: {e}")
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    @abstractmethod
+    async def publish(self, websocket_id: str, data: Dict):
+        ...
+
+    @abstractmethod
+    async def set_state(self, job_id: str, state: Dict):
+        ...
+
+    @abstractmethod
+    async def get_state(self, job_id: str) -> Optional[Dict]:
+        ...
+
+    def stats(self) -> Dict[str, Any]:
+        return {'backend': type(self).__name__, 'published': self.published, 'delivered': self.delivered}
+
+
+class InMemoryProgressBus(ProgressBus):
+    """Single-process bus - events go straight to the local handlers"""
 
-    async def connect(self, websocket: WebSocket, client_id: str):
-        await websocket.accept()
-        self.active_connections[client_id] = websocket
-        logger.info(f"WebSocket connected: {client_id}")
+    def __init__(self, max_jobs: int):
+        super().__init__()
+        self.max_jobs = max_jobs
+        self._states: OrderedDict = OrderedDict()
 
-    def disconnect(self, client_id: str):
-        if client_id in self.active_connections:
-            del self.active_connections[client_id]
-            logger.info(f"WebSocket disconnected: {client_id}")
+    async def publish(self, websocket_id: str, data: Dict):
+        self.published += 1
+        await self._deliver(websocket_id, data)
 
-    async def send_progress(self, client_id: str, data: dict):
-        if client_id in self.active_connections:
-            websocket = self.active_connections[client_id]
+    async def set_state(self, job_id: str, state: Dict):
+        self._states[job_id] = state
+        self._states.move_to_end(job_id)
+        while len(self._states) > self.max_jobs:
+            self._states.popitem(last=False)
+
+    async def get_state(self, job_id: str) -> Optional[Dict]:
+        return self._states.get(job_id)
+
+
+class RedisProgressBus(ProgressBus):
+    """Redis pub/sub for events and expiring keys for job state, shared by every process and node"""
+
+    def __init__(self, url: str, channel: str, state_ttl: int):
+        super().__init__()
+        self.url = url
+        self.channel = channel
+        self.state_ttl = state_ttl
+        self._client = None
+        self._listener: Optional[asyncio.Task] = None
+        self.reconnects = 0
+
+    def _state_key(self, job_id: str) -> str:
+        return f'{self.channel}:job:{job_id}'
+
+    async def start(self):
+        if self._client is None:
+            self._client = redis_asyncio.from_url(self.url)
+            self._listener = asyncio.create_task(self._listen())
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _listen(self):
+        while True:
+            pubsub = self._client.pubsub()
             try:
-                if websocket.client_state == WebSocketState.CONNECTED:
-                    await websocket.send_json(data)
+                await pubsub.subscribe(self.channel)
+                async for message in pubsub.listen():
+                    if message['type'] != 'message':
+                        continue
+                    event = json.loads(message['data'])
+                    await self._deliver(event['websocket_id'], event['data'])
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                logger.error(f"Error sending to {client_id}: {e}")
-                self.disconnect(client_id)
+                # Events published while disconnected are lost; job state is still readable
+                self.reconnects += 1
+                logger.error(f"Progress bus subscription lost, reconnecting: {e}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    async def publish(self, websocket_id: str, data: Dict):
+        self.published += 1
+        await self._client.publish(self.channel, json.dumps({'websocket_id': websocket_id, 'data': data}))
+
+    async def set_state(self, job_id: str, state: Dict):
+        await self._client.set(self._state_key(job_id), json.dumps(state), ex=self.state_ttl)
+
+    async def get_state(self, job_id: str) -> Optional[Dict]:
+        raw = await self._client.get(self._state_key(job_id))
+        return json.loads(raw) if raw else None
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), 'channel': self.channel, 'reconnects': self.reconnects}
+
+
+def create_progress_bus(url: str) -> ProgressBus:
+    """Pick the progress bus backend from PROGRESS_BUS_URL"""
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        if redis_asyncio is not None:
+            return RedisProgressBus(url, PROGRESS_BUS_CHANNEL, JOB_STATE_TTL)
+        logger.error("⚠️ PROGRESS_BUS_URL needs the redis package - progress stays in this process")
+    elif not url.startswith('memory://'):
+        logger.error(f"⚠️ Unknown PROGRESS_BUS_URL scheme: {url} - progress stays in this process")
+    return InMemoryProgressBus(JOB_STORE_MAX_JOBS)
+
+
+progress_bus = create_progress_bus(PROGRESS_BUS_URL)
+progress_bus.subscribe(manager.send_progress)
+
+
+class CoalescedJob:
+    __slots__ = ('sent_key', 'sent_at', 'pending', 'timer')
+
+    def __init__(self):
+        self.sent_key: Optional[tuple] = None  # (progress, status) last fanned out
+        self.sent_at = 0.0
+        self.pending: Optional[tuple] = None  # Latest (websocket_id, data) held back by the interval
+        self.timer: Optional[asyncio.Task] = None
+
+
+class ProgressCoalescer:
+    """Per-job throttle in front of the progress bus
+
+    Updates that do not move progress or status are dropped, updates inside
+    min_interval collapse into the latest one, and status changes (including
+    the terminal update) always go out immediately.
+    """
+
+    def __init__(self, min_interval: float, emit):
+        self.min_interval = min_interval
+        self.emit = emit  # async (job_id, websocket_id, data)
+        self._jobs: Dict[str, CoalescedJob] = {}
+        self.sent = 0
+        self.suppressed = 0
+        self.coalesced = 0
+
+    async def submit(self, job_id: str, websocket_id: Optional[str], data: Dict):
+        job = self._jobs.get(job_id)
+        if job is None:
+            job = self._jobs[job_id] = CoalescedJob()
+
+        key = (data['progress'], data['status'])
+        if data['status'] in TERMINAL_STATUSES:
+            del self._jobs[job_id]
+            if job.timer is not None:
+                job.timer.cancel()
+            if job.pending is not None:
+                self.coalesced += 1
+            await self._send(job_id, job, websocket_id, data)
+            return
+
+        latest_key = (job.pending[1]['progress'], job.pending[1]['status']) if job.pending else job.sent_key
+        if key == latest_key:
+            self.suppressed += 1
+            return
+
+        status_changed = job.sent_key is None or key[1] != job.sent_key[1]
+        wait = job.sent_at + self.min_interval - time.monotonic()
+        if status_changed or (wait <= 0 and job.timer is None):
+            if job.timer is not None:
+                job.timer.cancel()
+                job.timer = None
+            if job.pending is not None:
+                self.coalesced += 1
+                job.pending = None
+            await self._send(job_id, job, websocket_id, data)
+            return
+
+        if job.pending is not None:
+            self.coalesced += 1
+        job.pending = (websocket_id, data)
+        if job.timer is None:
+            job.timer = asyncio.create_task(self._flush_later(job_id, job, max(wait, 0)))
+
+    def forget(self, job_id: str):
+        """Drop a job's throttle state, e.g. once the job store has evicted it"""
+        job = self._jobs.pop(job_id, None)
+        if job is not None and job.timer is not None:
+            job.timer.cancel()
+
+    async def _flush_later(self, job_id: str, job: CoalescedJob, delay: float):
+        await asyncio.sleep(delay)
+        job.timer = None
+        if job.pending is not None:
+            websocket_id, data = job.pending
+            job.pending = None
+            await self._send(job_id, job, websocket_id, data)
+
+    async def _send(self, job_id: str, job: CoalescedJob, websocket_id: Optional[str], data: Dict):
+        job.sent_key = (data['progress'], data['status'])
+        job.sent_at = time.monotonic()
+        self.sent += 1
+        try:
+            await self.emit(job_id, websocket_id, data)
+        except Exception as e:
+            logger.error(f"Progress fan-out failed for {job_id}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'tracked_jobs': len(self._jobs),
+            'sent': self.sent,
+            'suppressed': self.suppressed,
+            'coalesced': self.coalesced,
+            'min_interval': self.min_interval
+        }
+
+
+# ==================== JOB STATE STORE ====================
+
+TERMINAL_STATUSES = ('completed', 'failed')
+RESULT_FIELDS = ('video_url', 'video_key', 'image_urls', 'error')
+
+
+class JobRecord:
+    """Compact in-memory state for one generation job"""
+    __slots__ = ('job_id', 'progress', 'status', 'message', 'updated_at', 'finished_at',
+                 'model_ref', 'metadata', 'result')
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.progress = 0
+        self.status = 'initializing'
+        self.message = ''
+        self.updated_at = time.time()
+        self.finished_at = None
+        self.model_ref = None  # (type, model) key into MODEL_REGISTRY, shared instead of copied
+        self.metadata = None
+        self.result = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "job_id": self.job_id,
+            "progress": self.progress,
+            "status": self.status,
+            "message": self.message,
+            "timestamp": datetime.fromtimestamp(self.updated_at).isoformat()
+        }
+        if self.result:
+            data.update(self.result)
+        if self.metadata is not None:
+            metadata = dict(self.metadata)
+            if self.result:
+                metadata.update(self.result)
+            if self.model_ref:
+                metadata['model_info'] = MODEL_REGISTRY[self.model_ref[0]][self.model_ref[1]]
+            data['metadata'] = metadata
+        return data
+
+
+class JobStore:
+    """Bounded job progress store - finished jobs expire after a TTL, LRU eviction above the cap"""
+
+    def __init__(self, max_jobs: int, finished_ttl: float):
+        self.max_jobs = max_jobs
+        self.finished_ttl = finished_ttl
+        # Active jobs are only evicted once every finished job has gone
+        self._active: OrderedDict = OrderedDict()
+        self._finished: OrderedDict = OrderedDict()
+        self._evict_handlers = []
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._active) + len(self._finished)
+
+    def __contains__(self, job_id: str):
+        return job_id in self._active or job_id in self._finished
+
+    def on_evict(self, handler):
+        """Register handler(job_id) for every job dropped by the TTL or LRU sweep"""
+        self._evict_handlers.append(handler)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the job's status response, or None if it is unknown or expired"""
+        record = self._lookup(job_id)
+        if record is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return record.to_dict()
+
+    def update_progress(self, job_id: str, progress: int, status: str, message: str = "") -> JobRecord:
+        record = self._lookup(job_id) or self._insert(job_id)
+        record.progress = progress
+        record.status = sys.intern(status)
+        record.message = message
+        record.updated_at = time.time()
+        if status in TERMINAL_STATUSES:
+            self._finish(record)
+        return record
+
+    def complete(self, job_id: str, metadata: Optional[Dict] = None, **result):
+        """Attach the job's outputs and final metadata"""
+        record = self._lookup(job_id) or self._insert(job_id)
+        record.result = {k: v for k, v in result.items() if v is not None} or None
+        if metadata is not None:
+            record.model_ref = (metadata.get('type'), metadata.get('model'))
+            if record.model_ref[0] not in MODEL_REGISTRY or record.model_ref[1] not in MODEL_REGISTRY[record.model_ref[0]]:
+                record.model_ref = None
+            # model_info and result URLs are rebuilt on read, so they are not kept twice
+            skip = RESULT_FIELDS + (('model_info',) if record.model_ref else ())
+            record.metadata = {k: v for k, v in metadata.items() if k not in skip}
+        record.updated_at = time.time()
+        self._finish(record)
+
+    def fail(self, job_id: str, error: str, metadata: Optional[Dict] = None):
+        self.complete(job_id, metadata, error=error)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'size': len(self),
+            'active': len(self._active),
+            'finished': len(self._finished),
+            'max_jobs': self.max_jobs,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
+
+    def _lookup(self, job_id: str) -> Optional[JobRecord]:
+        self._expire()
+        record = self._active.get(job_id)
+        if record is not None:
+            self._active.move_to_end(job_id)
+            return record
+        record = self._finished.get(job_id)
+        if record is not None:
+            self._finished.move_to_end(job_id)
+        return record
+
+    def _insert(self, job_id: str) -> JobRecord:
+        record = JobRecord(job_id)
+        self._active[job_id] = record
+        while len(self) > self.max_jobs:
+            victims = self._finished if self._finished else self._active
+            evicted, _ = victims.popitem(last=False)
+            self.evictions += 1
+            self._evicted(evicted)
+        return record
+
+    def _finish(self, record: JobRecord):
+        if record.finished_at is None:
+            record.finished_at = time.time()
+        if self._active.pop(record.job_id, None) is not None:
+            self._finished[record.job_id] = record
+
+    def _expire(self):
+        cutoff = time.time() - self.finished_ttl
+        while self._finished:
+            job_id, record = next(iter(self._finished.items()))
+            if record.finished_at > cutoff:
+                break
+            del self._finished[job_id]
+            self.expirations += 1
+            self._evicted(job_id)
+
+    def _evicted(self, job_id: str):
+        for handler in self._evict_handlers:
+            handler(job_id)
+
+
+job_store = JobStore(JOB_STORE_MAX_JOBS, JOB_STORE_FINISHED_TTL)
+
+
+# ==================== JOB LOCATION INDEX ====================
+
+def open_state_db(path: str) -> sqlite3.Connection:
+    """Open the local SQLite state database shared by the persistent indexes"""
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+def job_metadata_location(client: str, job_type: str, job_id: str) -> tuple:
+    """S3 bucket and key of a job's metadata.json"""
+    bucket = VIDEO_OUTPUT_BUCKET if job_type == "video" else IMAGE_OUTPUT_BUCKET
+    return bucket, f"{client.lower()}/generated-{job_type}s/{job_id}/metadata.json"
+
+
+class JobLocationIndex:
+    """Persistent job_id -> (bucket, key, client, type) map so status checks need one S3 read
+
+    Calls are blocking - run them via run_blocking.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = open_state_db(path)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS job_locations ('
+            'job_id TEXT PRIMARY KEY, bucket TEXT NOT NULL, key TEXT NOT NULL, '
+            'client TEXT NOT NULL, type TEXT NOT NULL, created_at REAL NOT NULL)'
+        )
+
+    def put(self, job_id: str, bucket: str, key: str, client: str, job_type: str):
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO job_locations VALUES (?, ?, ?, ?, ?, ?)',
+                (job_id, bucket, key, client, job_type, time.time())
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, str]]:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT bucket, key, client, type FROM job_locations WHERE job_id = ?', (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'bucket': row[0], 'key': row[1], 'client': row[2], 'type': row[3]}
+
+
+job_index = JobLocationIndex(STATE_DB_PATH)
+
+
+# ==================== DURABLE JOB QUEUE ====================
+
+class DurableJobQueue:
+    """SQLite-backed generation queue shared by the API and worker processes
+
+    Jobs move pending -> claimed -> finalizing -> done. A claimed or finalizing
+    job carries a lease that its worker renews. Once a claimed job's lease lapses
+    (worker crashed, deploy, reload) it goes back to pending and keeps its
+    provider_task_id so the next worker can resume polling instead of submitting
+    again. Finalizing jobs have finished generating and carry their terminal
+    metadata on the row; they no longer count against concurrency and never go
+    back to pending - once their lease lapses another worker replays only the
+    metadata write, so a finished generation is never paid for twice. Claims
+    enforce each model's concurrency cap and token bucket here, so the
+    MODEL_REGISTRY limits hold across every API and worker process sharing the
+    database. Calls are blocking - run them via run_blocking.
+    """
+
+    def __init__(self, path: str, lease_seconds: float):
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._conn = open_state_db(path)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS job_queue ('
+            'job_id TEXT PRIMARY KEY, model_type TEXT NOT NULL, model TEXT NOT NULL, '
+            'priority INTEGER NOT NULL, request TEXT NOT NULL, reference_urls TEXT NOT NULL, '
+            'metadata TEXT NOT NULL, state TEXT NOT NULL, provider_task_id TEXT, '
+            'worker_id TEXT, attempts INTEGER NOT NULL DEFAULT 0, lease_until REAL, '
+            'enqueued_at REAL NOT NULL, updated_at REAL NOT NULL, '
+            'progress INTEGER NOT NULL DEFAULT 0, status TEXT, message TEXT, final_metadata TEXT, '
+            'event_seq INTEGER NOT NULL DEFAULT 0)'
+        )
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(job_queue)')}
+        for column, definition in (('final_metadata', 'TEXT'), ('event_seq', 'INTEGER NOT NULL DEFAULT 0')):
+            if column not in columns:
+                self._conn.execute(f'ALTER TABLE job_queue ADD COLUMN {column} {definition}')
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS job_queue_pending ON job_queue (state, priority, enqueued_at)'
+        )
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS job_queue_model_state '
+            'ON job_queue (state, model_type, model, priority, enqueued_at)'
+        )
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS rate_buckets ('
+            'model_type TEXT NOT NULL, model TEXT NOT NULL, tokens REAL NOT NULL, updated_at REAL NOT NULL, '
+            'PRIMARY KEY (model_type, model))'
+        )
+
+    def enqueue(self, job_id: str, request: Dict, reference_urls: List[str], metadata: Dict, priority: int):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO job_queue (job_id, model_type, model, priority, request, reference_urls, '
+                'metadata, state, enqueued_at, updated_at, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (job_id, request['type'], request['model'], priority, json.dumps(request),
+                 json.dumps(reference_urls), json.dumps(metadata), 'pending', now, now, 'queued')
+            )
+
+    def claim(self, worker_id: str, capacity: Dict[tuple, int],
+              rate_limits: Dict[tuple, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Atomically lease pending jobs per model, highest priority first.
+
+        capacity maps (model_type, model) to how many more jobs the caller can take
+        locally; each model is further limited by its max_concurrent minus the jobs
+        claimed anywhere, and by the tokens left in its shared rate bucket.
+        """
+        now = time.time()
+        rows = []
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                pending = self._conn.execute(
+                    'SELECT DISTINCT model_type, model FROM job_queue WHERE state = ?', ('pending',)
+                ).fetchall()
+                claimed = {
+                    (row[0], row[1]): row[2]
+                    for row in self._conn.execute(
+                        'SELECT model_type, model, COUNT(*) FROM job_queue WHERE state = ? GROUP BY model_type, model',
+                        ('claimed',)
+                    )
+                }
+                for key in pending:
+                    limit = rate_limits.get(key)
+                    if limit is None:
+                        continue
+                    free = min(capacity.get(key, 0), limit.get('max_concurrent', 4) - claimed.get(key, 0))
+                    if free <= 0:
+                        continue
+                    tokens = self._refill(key, limit, now)
+                    take = min(free, int(tokens))
+                    if take <= 0:
+                        continue
+                    leased = self._conn.execute(
+                        'UPDATE job_queue SET state = ?, worker_id = ?, attempts = attempts + 1, lease_until = ?, '
+                        'updated_at = ? WHERE job_id IN (SELECT job_id FROM job_queue '
+                        'WHERE state = ? AND model_type = ? AND model = ? ORDER BY priority, enqueued_at LIMIT ?) '
+                        'RETURNING job_id, priority, request, reference_urls, metadata, provider_task_id, attempts',
+                        ('claimed', worker_id, now + self.lease_seconds, now, 'pending', key[0], key[1], take)
+                    ).fetchall()
+                    self._conn.execute(
+                        'UPDATE rate_buckets SET tokens = ? WHERE model_type = ? AND model = ?',
+                        (tokens - len(leased), key[0], key[1])
+                    )
+                    rows.extend(leased)
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+        return [
+            {
+                'job_id': row[0],
+                'priority': row[1],
+                'request': json.loads(row[2]),
+                'reference_urls': json.loads(row[3]),
+                'metadata': json.loads(row[4]),
+                'provider_task_id': row[5],
+                'attempts': row[6]
+            }
+            for row in sorted(rows, key=lambda r: r[1])
+        ]
+
+    def _refill(self, key: tuple, limit: Dict[str, Any], now: float) -> float:
+        """Refill a model's shared token bucket up to now and return its tokens"""
+        rate = limit.get('requests_per_minute', 60) / 60.0
+        burst = max(1, limit.get('burst', 1))
+        row = self._conn.execute(
+            'SELECT tokens, updated_at FROM rate_buckets WHERE model_type = ? AND model = ?', key
+        ).fetchone()
+        tokens = burst if row is None else min(burst, row[0] + max(0.0, now - row[1]) * rate)
+        self._conn.execute(
+            'INSERT OR REPLACE INTO rate_buckets (model_type, model, tokens, updated_at) VALUES (?, ?, ?, ?)',
+            (key[0], key[1], tokens, now)
+        )
+        return tokens
+
+    def renew(self, worker_id: str):
+        """Extend the lease on every job this worker holds"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'UPDATE job_queue SET lease_until = ? WHERE state IN (?, ?) AND worker_id = ?',
+                (now + self.lease_seconds, 'claimed', 'finalizing', worker_id)
+            )
+
+    def requeue_expired(self) -> int:
+        """Return jobs whose worker stopped renewing its lease to the pending state"""
+        with self._lock:
+            cursor = self._conn.execute(
+                'UPDATE job_queue SET state = ?, worker_id = NULL, lease_until = NULL, updated_at = ? '
+                'WHERE state = ? AND lease_until < ?',
+                ('pending', time.time(), 'claimed', time.time())
+            )
+        return cursor.rowcount
+
+    def release(self, worker_id: str) -> int:
+        """Hand this worker's unfinished jobs back immediately on a clean shutdown"""
+        now = time.time()
+        with self._lock:
+            requeued = self._conn.execute(
+                'UPDATE job_queue SET state = ?, worker_id = NULL, lease_until = NULL, updated_at = ? '
+                'WHERE state = ? AND worker_id = ?',
+                ('pending', now, 'claimed', worker_id)
+            ).rowcount
+            # Finalizing jobs stay finalizing with a lapsed lease, so the next worker replays just their write
+            expired = self._conn.execute(
+                'UPDATE job_queue SET worker_id = NULL, lease_until = 0, updated_at = ? WHERE state = ? AND worker_id = ?',
+                (now, 'finalizing', worker_id)
+            ).rowcount
+        return requeued + expired
+
+    def claim_finalizing(self, worker_id: str, limit: int) -> List[Dict[str, Any]]:
+        """Lease finalizing jobs whose worker went away, to replay their terminal metadata write"""
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                'UPDATE job_queue SET worker_id = ?, lease_until = ?, updated_at = ? WHERE job_id IN '
+                '(SELECT job_id FROM job_queue WHERE state = ? AND lease_until < ? LIMIT ?) '
+                'RETURNING job_id, status, final_metadata',
+                (worker_id, now + self.lease_seconds, now, 'finalizing', now, limit)
+            ).fetchall()
+        return [{'job_id': row[0], 'status': row[1], 'final_metadata': json.loads(row[2])} for row in rows]
+
+    def set_provider_task(self, job_id: str, task_id: str):
+        with self._lock:
+            self._conn.execute(
+                'UPDATE job_queue SET provider_task_id = ?, updated_at = ? WHERE job_id = ?',
+                (task_id, time.time(), job_id)
+            )
+
+    def record_progress(self, job_id: str, progress: int, status: str, message: str,
+                        updated_at: float) -> Optional[int]:
+        """Store the job's latest progress and return its event sequence number, or None for unknown jobs"""
+        with self._lock:
+            row = self._conn.execute(
+                'UPDATE job_queue SET progress = ?, status = ?, message = ?, updated_at = ?, event_seq = event_seq + 1 '
+                'WHERE job_id = ? RETURNING event_seq',
+                (progress, status, message, updated_at, job_id)
+            ).fetchone()
+        return row[0] if row else None
+
+    def finalizing(self, job_id: str, status: str, final: Dict[str, Any]):
+        """Record a finished generation's terminal metadata; it no longer counts against concurrency"""
+        with self._lock:
+            self._conn.execute(
+                'UPDATE job_queue SET state = ?, status = ?, final_metadata = ?, updated_at = ? '
+                'WHERE job_id = ? AND state = ?',
+                ('finalizing', status, json.dumps(final), time.time(), job_id, 'claimed')
+            )
+
+    def finish(self, job_id: str, status: str, message: Optional[str] = None):
+        with self._lock:
+            self._conn.execute(
+                'UPDATE job_queue SET state = ?, status = ?, message = COALESCE(?, message), worker_id = NULL, '
+                'lease_until = NULL, updated_at = ? WHERE job_id = ?',
+                ('done', status, message, time.time(), job_id)
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Queue state of a job, with its position among pending jobs for the same model"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT state, progress, status, message, updated_at, model_type, model, priority, enqueued_at, '
+                'final_metadata, event_seq FROM job_queue WHERE job_id = ?', (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            job = {
+                'job_id': job_id,
+                'queue_state': row[0],
+                'progress': row[1],
+                'status': row[2],
+                'message': row[3],
+                'timestamp': datetime.fromtimestamp(row[4]).isoformat(),
+                'seq': row[10]
+            }
+            if row[0] == 'finalizing':
+                # Finished generation whose metadata.json may not be in S3 yet
+                job['metadata'] = json.loads(row[9])
+            elif row[0] == 'pending':
+                ahead, depth = self._conn.execute(
+                    'SELECT SUM(priority < ? OR (priority = ? AND enqueued_at < ?)), COUNT(*) FROM job_queue '
+                    'WHERE state = ? AND model_type = ? AND model = ?',
+                    (row[7], row[7], row[8], 'pending', row[5], row[6])
+                ).fetchone()
+                job['queue_position'] = (ahead or 0) + 1
+                job['queue_depth'] = depth
+                job['queue_wait_seconds'] = round(time.time() - row[8], 3)
+        return job
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute('SELECT state, COUNT(*) FROM job_queue GROUP BY state').fetchall()
+        return dict(rows)
+
+
+job_queue = DurableJobQueue(STATE_DB_PATH, JOB_LEASE_SECONDS)
+
+
+# ==================== METADATA PERSISTENCE ====================
+
+class PendingMetadata:
+    __slots__ = ('bucket', 'key', 'body', 'terminal', 'create_only', 'first_queued_at', 'written',
+                 'attempts', 'retry_at')
+
+    def __init__(self, bucket: str, key: str, body: bytes, terminal: bool, create_only: bool):
+        self.bucket = bucket
+        self.key = key
+        self.body = body
+        self.terminal = terminal
+        self.create_only = create_only
+        self.first_queued_at = time.monotonic()
+        self.written: Optional[asyncio.Future] = None  # Resolved once a terminal write lands
+        self.attempts = 0
+        self.retry_at = 0.0  # monotonic time before which a failed write is not retried
+
+
+class MetadataWriter:
+    """Write-behind persistence of job metadata.json
+
+    Updates are snapshotted as compact JSON and coalesced per job, so only the
+    latest version of each job is written. A background task flushes them in
+    concurrent batches; shutdown flushes whatever is left. Failed writes are
+    retried with exponential backoff and dropped after max_attempts, failing the
+    terminal future. Each job's terminal state is written exactly once - later
+    updates for that job are ignored.
+
+    The terminal guard is per process and bounded by terminal_memory. Across
+    processes it is enforced by the job queue instead: the only writes are the
+    create-only initial record, which never replaces an existing object, and the
+    terminal write, which only the worker holding the job's finalizing lease
+    issues from the final metadata stored on the row. Once the row is done no
+    worker writes that job's metadata again, and a replay after a crash writes
+    the same bytes.
+    """
+
+    def __init__(self, flush_interval: float, batch_size: int, terminal_memory: int,
+                 max_attempts: int = METADATA_MAX_ATTEMPTS, retry_base: float = METADATA_RETRY_BASE,
+                 retry_max: float = METADATA_RETRY_MAX):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.terminal_memory = terminal_memory
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self._pending: OrderedDict = OrderedDict()  # job_id -> PendingMetadata
+        self._terminal_written: OrderedDict = OrderedDict()  # This process only - see class docstring
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.submitted = 0
+        self.coalesced = 0
+        self.writes = 0
+        self.terminal_writes = 0
+        self.skipped = 0
+        self.errors = 0
+        self.dropped = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+
+    def start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush(force=True)
+
+    def submit(self, job_id: str, metadata: Dict, terminal: bool = False,
+               create_only: bool = False) -> Optional[asyncio.Future]:
+        """Queue the job's current metadata; create_only never overwrites an existing object
+
+        Terminal updates return a future that resolves once the write has landed.
+        """
+        if job_id in self._terminal_written:
+            self.skipped += 1
+            return None
+        previous = self._pending.get(job_id)
+        if previous is not None:
+            if previous.terminal and not terminal:
+                self.skipped += 1
+                return previous.written
+            self.coalesced += 1
+
+        bucket, key = job_metadata_location(metadata['client'], metadata['type'], job_id)
+        update = PendingMetadata(bucket, key, json_bytes(metadata), terminal, create_only and previous is None)
+        if previous is not None:
+            update.first_queued_at = previous.first_queued_at
+            update.written = previous.written
+        if terminal and update.written is None:
+            update.written = asyncio.get_running_loop().create_future()
+        self._pending[job_id] = update
+        self.submitted += 1
+        if self._wakeup is not None and (terminal or len(self._pending) >= self.batch_size):
+            self._wakeup.set()
+        return update.written
+
+    async def flush(self, force: bool = False):
+        """Attempt every due write once; force also attempts writes still backing off"""
+        for _ in range((len(self._pending) + self.batch_size - 1) // self.batch_size):
+            if not await self._flush_batch(force):
+                break
 
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            'pending': len(self._pending),
+            'submitted': self.submitted,
+            'coalesced': self.coalesced,
+            'writes': self.writes,
+            'terminal_writes': self.terminal_writes,
+            'skipped': self.skipped,
+            'errors': self.errors,
+            'dropped': self.dropped,
+            'avg_lag_seconds': round(self.total_lag / self.writes, 3) if self.writes else 0.0,
+            'max_lag_seconds': round(self.max_lag, 3),
+            'oldest_pending_seconds': round(max((now - p.first_queued_at for p in self._pending.values()), default=0.0), 3)
+        }
 
-manager = ConnectionManager()
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Metadata flush error: {e}")
 
-# Progress tracking
-generation_progress = {}
+    async def _flush_batch(self, force: bool = False) -> int:
+        now = time.monotonic()
+        due = []
+        for job_id, update in self._pending.items():
+            if len(due) >= self.batch_size:
+                break
+            if force or update.retry_at <= now:
+                due.append(job_id)
+        batch = [(job_id, self._pending.pop(job_id)) for job_id in due]
+        await asyncio.gather(*(self._write(job_id, update) for job_id, update in batch))
+        return len(batch)
+
+    async def _write(self, job_id: str, update: PendingMetadata):
+        extra = {'IfNoneMatch': '*'} if update.create_only else {}
+        try:
+            await run_blocking(
+                s3_client.put_object,
+                Bucket=update.bucket,
+                Key=update.key,
+                Body=update.body,
+                ContentType='application/json',
+                **extra
+            )
+        except botocore.exceptions.ClientError as e:
+            if update.create_only and e.response.get('Error', {}).get('Code') == 'PreconditionFailed':
+                # A later state is already stored - the initial record must not replace it
+                self.skipped += 1
+                return
+            self._retry(job_id, update, e)
+            return
+        except Exception as e:
+            self._retry(job_id, update, e)
+            return
+
+        lag = time.monotonic() - update.first_queued_at
+        self.writes += 1
+        self.total_lag += lag
+        self.max_lag = max(self.max_lag, lag)
+        if update.terminal:
+            self.terminal_writes += 1
+            self._terminal_written[job_id] = True
+            while len(self._terminal_written) > self.terminal_memory:
+                self._terminal_written.popitem(last=False)
+            if not update.written.done():
+                update.written.set_result(True)
+
+    def _retry(self, job_id: str, update: PendingMetadata, error: Exception):
+        self.errors += 1
+        update.attempts += 1
+        if job_id in self._pending:
+            # A newer version was queued meanwhile and supersedes the failed write
+            logger.error(f"Error saving metadata for {job_id}: {error}")
+            return
+        if update.attempts >= self.max_attempts:
+            self.dropped += 1
+            logger.error(f"❌ Giving up on metadata for {job_id} after {update.attempts} attempts: {error}")
+            if update.written is not None and not update.written.done():
+                update.written.set_exception(RuntimeError(f"Metadata write failed after {update.attempts} attempts: {error}"))
+            return
+        delay = min(self.retry_max, self.retry_base * 2 ** (update.attempts - 1))
+        logger.error(f"Error saving metadata for {job_id} (attempt {update.attempts}, retrying in {delay:.1f}s): {error}")
+        update.retry_at = time.monotonic() + delay
+        self._pending[job_id] = update
+
+
+metadata_writer = MetadataWriter(METADATA_FLUSH_INTERVAL, METADATA_FLUSH_BATCH, METADATA_TERMINAL_MEMORY)
 
 
 # Lifespan context manager for startup/shutdown
@@ -96,9 +1397,25 @@ generation_progress = {}
 async def lifespan(app: FastAPI):
     # Startup
     logger.info("🚀 Starting Creative AI Studio Backend with WebSocket support")
+    await providers.start()
+    await progress_bus.start()
+    runway_poller.start()
+    veo_poller.start()
+    metadata_writer.start()
+    if EMBEDDED_JOB_WORKER:
+        job_worker.start()
     yield
     # Shutdown
     logger.info("👋 Shutting down Creative AI Studio Backend")
+    await job_worker.stop()
+    await runway_poller.stop()
+    await veo_poller.stop()
+    await metadata_writer.stop()
+    await progress_bus.close()
+    await providers.close()
+    io_executor.shutdown(wait=False)
+    progress_executor.shutdown(wait=False)
+    enhance_stream_executor.shutdown(wait=False)
 
 
 # Create FastAPI app
@@ -129,7 +1446,8 @@ MODEL_REGISTRY = {
             "max_duration": 8,
             "cost_per_second": 0.10,
             "features": ["physics_aware", "camera_controls", "reference_images"],
-            "strengths": ["cinematic_quality", "realistic_motion", "brand_consistency"]
+            "strengths": ["cinematic_quality", "realistic_motion", "brand_consistency"],
+            "rate_limit": {"requests_per_minute": 10, "burst": 2, "max_concurrent": 4}
         },
         "runway": {
             "name": "Runway Gen-4",
@@ -138,7 +1456,8 @@ MODEL_REGISTRY = {
             "max_duration": 10,
             "cost_per_second": 0.15,
             "features": ["motion_control", "fast_generation", "style_transfer"],
-            "strengths": ["trendy_effects", "quick_turnaround", "creative_freedom"]
+            "strengths": ["trendy_effects", "quick_turnaround", "creative_freedom"],
+            "rate_limit": {"requests_per_minute": 20, "burst": 4, "max_concurrent": 6}
         },
         "hailuo": {
             "name": "Hailuo-02",
@@ -148,6 +1467,7 @@ MODEL_REGISTRY = {
             "cost_per_second": 0.08,
             "features": ["character_animation", "emotional_expression"],
             "strengths": ["narrative_flow", "character_consistency"],
+            "rate_limit": {"requests_per_minute": 10, "burst": 2, "max_concurrent": 2},
             "placeholder": True
         }
     },
@@ -158,7 +1478,8 @@ MODEL_REGISTRY = {
             "available": DALLE_AVAILABLE,
             "cost_per_image": 0.04,
             "features": ["creative_interpretation", "text_rendering"],
-            "strengths": ["artistic_style", "conceptual_clarity"]
+            "strengths": ["artistic_style", "conceptual_clarity"],
+            "rate_limit": {"requests_per_minute": 15, "burst": 3, "max_concurrent": 5}
         },
         "imagen4": {
             "name": "Imagen 4",
@@ -166,7 +1487,8 @@ MODEL_REGISTRY = {
             "available": IMAGEN4_AVAILABLE,
             "cost_per_image": 0.03,
             "features": ["photorealism", "accurate_details"],
-            "strengths": ["realistic_textures", "natural_lighting"]
+            "strengths": ["realistic_textures", "natural_lighting"],
+            "rate_limit": {"requests_per_minute": 20, "burst": 4, "max_concurrent": 5}
         }
     }
 }
@@ -267,6 +1589,21 @@ class VisualAssetsRequest(BaseModel):
     client: str
 
 
+class SimilarAssetsRequest(BaseModel):
+    client: str
+    key: str  # S3 key of the reference asset to match
+    max_distance: int = 10  # Hamming distance between 64-bit perceptual hashes
+    limit: int = 20
+
+
+class VisualAssetsPageRequest(BaseModel):
+    client: str
+    cursor: Optional[str] = None  # Opaque cursor from the previous page's next_cursor
+    page_size: int = 100
+    category: Optional[str] = None
+    extension: Optional[str] = None  # e.g. "png" or ".png"
+
+
 class EnhancePromptRequest(BaseModel):
     prompt: str
     model: str
@@ -278,6 +1615,12 @@ class EnhancePromptRequest(BaseModel):
     aspect_ratio: Optional[str] = "16:9"
     style_presets: Optional[Dict[str, Any]] = None
     has_reference_images: bool = False
+    websocket_id: Optional[str] = None  # Mirror streamed tokens to this socket
+
+
+
+class BatchEnhancePromptRequest(BaseModel):
+    items: List[EnhancePromptRequest]
 
 
 class UnifiedGenerateRequest(BaseModel):
@@ -294,14 +1637,33 @@ class UnifiedGenerateRequest(BaseModel):
     # Common
     quality: str = "standard"
     aspect_ratio: Optional[str] = "16:9"
-    reference_images: List[str] = []  # Now base64 data URLs
+    reference_images: List[str] = []  # base64 data URLs or "ref:sha256:..." handles
     style_presets: Optional[Dict[str, Any]] = None
     websocket_id: Optional[str] = None  # For progress tracking
+    priority: int = 5  # Scheduler priority - lower runs first
+
+
+class BatchGenerateRequest(BaseModel):
+    items: List[UnifiedGenerateRequest]
+    websocket_id: Optional[str] = None  # Tracks every job in the batch unless an item sets its own
 
 
 class StatusRequest(BaseModel):
     job_id: str
     type: str  # "video" or "image"
+    version: Optional[str] = None  # ETag from the previous response
+    wait: float = 0  # Seconds to hold the request open until the version changes
+
+
+class HistoryRequest(BaseModel):
+    client: Optional[str] = None
+    type: Optional[str] = "video"  # "video", "image", or null for both
+    model: Optional[str] = None
+    status: Optional[str] = None
+    since: Optional[str] = None  # ISO datetime, inclusive
+    until: Optional[str] = None  # ISO datetime, exclusive
+    cursor: Optional[str] = None
+    limit: int = 50
 
 
 # ==================== HELPER FUNCTIONS ====================
@@ -362,24 +1724,48 @@ def get_content_type(filename: str) -> str:
     return content_types.get(ext, 'application/octet-stream')
 
 
+def read_s3_json(bucket: str, key: str) -> Dict[str, Any]:
+    """Fetch and decode a JSON object from S3 (blocking - run via run_blocking)"""
+    response = s3_client.get_object(Bucket=bucket, Key=key)
+    return json.loads(response['Body'].read())
+
+
 # ==================== PROGRESS TRACKING ====================
 
 async def update_progress(job_id: str, websocket_id: Optional[str], progress: int, status: str, message: str = ""):
     """Send real-time progress updates via WebSocket"""
+    # Store in this process - always current for local status checks
+    record = job_store.update_progress(job_id, progress, status, message)
+
     progress_data = {
         "job_id": job_id,
         "progress": progress,
         "status": status,
         "message": message,
-        "timestamp": datetime.now().isoformat()
+        "timestamp": datetime.fromtimestamp(record.updated_at).isoformat()
     }
 
-    # Store in memory
-    generation_progress[job_id] = progress_data
+    # Everything that leaves the process goes through the per-job throttle
+    await progress_coalescer.submit(job_id, websocket_id, progress_data)
+
+
+async def emit_progress(job_id: str, websocket_id: Optional[str], progress_data: Dict):
+    # Mirror into the durable queue so any process can report it; the row numbers the job's events
+    seq = await asyncio.get_running_loop().run_in_executor(
+        progress_executor,
+        functools.partial(job_queue.record_progress, job_id, progress_data['progress'], progress_data['status'],
+                          progress_data['message'], datetime.fromisoformat(progress_data['timestamp']).timestamp())
+    )
+    if seq is not None:
+        progress_data['seq'] = seq
+
+    # Share with every process, then reach the client's sockets and job subscribers wherever they are connected
+    await progress_bus.set_state(job_id, progress_data)
+    await progress_bus.publish(websocket_id, progress_data)
 
-    # Send via WebSocket if connected
-    if websocket_id:
-        await manager.send_progress(websocket_id, progress_data)
+
+progress_coalescer = ProgressCoalescer(PROGRESS_MIN_INTERVAL, emit_progress)
+job_store.on_evict(progress_coalescer.forget)
 
 
 # ==================== TEST ENDPOINT ====================
@@ -402,6 +1788,23 @@ async def test_connection():
             }
         },
         'vfx_templates': len(VFX_TEMPLATES),
+        'job_store': job_store.stats(),
+        'scheduler': scheduler.stats(),
+        'job_queue': job_queue.stats(),
+        'job_worker': job_worker.stats(),
+        'progress_bus': progress_bus.stats(),
+        'progress_coalescer': progress_coalescer.stats(),
+        'websockets': manager.stats(),
+        'job_events': job_events.stats(),
+        'metadata_writer': metadata_writer.stats(),
+        'runway_poller': runway_poller.stats(),
+        'veo_poller': veo_poller.stats(),
+        'asset_catalog': asset_catalog.stats(),
+        'presigned_urls': presigned_urls.stats(),
+        'similarity_index': similarity_index.stats(),
+        'reference_store': reference_store.stats(),
+        'output_ingestor': output_ingestor.stats(),
+        'enhancement_cache': enhancement_cache.stats(),
         'bedrock_configured': bool(BEDROCK_AGENT_ID),
         's3_buckets_configured': bool(VISUAL_ASSETS_BUCKET and VIDEO_OUTPUT_BUCKET),
         'websocket_enabled': True,
@@ -427,55 +1830,161 @@ async def test_connection():
 
 # ==================== BEDROCK ENHANCEMENT ====================
 
+class EnhancementCache:
+    """TTL/LRU memo of Bedrock enhancements; identical in-flight requests share one call"""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()  # key -> (result, expires_at, latency)
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.bedrock_calls = 0
+        self.latency_saved = 0.0
+
+    @staticmethod
+    def key_for(agent_input: Dict[str, Any]) -> str:
+        normalized = dict(agent_input)
+        normalized['prompt'] = ' '.join(str(agent_input.get('prompt', '')).split())
+        return hashlib.sha256(json.dumps(normalized, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    async def get_or_compute(self, agent_input: Dict[str, Any], compute) -> Dict[str, Any]:
+        """Return the cached result for agent_input, or await compute() once for all callers"""
+        key = self.key_for(agent_input)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.latency_saved += entry[2]
+                return entry[0]
+            del self._entries[key]
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(in_flight)
+
+        self.misses += 1
+        self.bedrock_calls += 1
+        # Detached from the caller, so a cancelled first request never strands the others waiting on it
+        task = asyncio.create_task(self._compute(key, compute))
+        # Mark retrieved so failures nobody is left waiting for are not reported as unhandled
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._in_flight[key] = task
+        return await asyncio.shield(task)
+
+    async def _compute(self, key: str, compute) -> Dict[str, Any]:
+        started = time.monotonic()
+        try:
+            result = await compute()
+        finally:
+            del self._in_flight[key]
+        latency = time.monotonic() - started
+        # Empty replies are not worth remembering - the next call may do better
+        if result:
+            self._entries[key] = (result, time.monotonic() + self.ttl, latency)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'hit_rate': round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0,
+            'bedrock_calls': self.bedrock_calls,
+            'latency_saved_seconds': round(self.latency_saved, 3)
+        }
+
+
+enhancement_cache = EnhancementCache(ENHANCE_CACHE_MAX_ENTRIES, ENHANCE_CACHE_TTL)
+
+
+def build_agent_input(request: EnhancePromptRequest) -> Dict[str, Any]:
+    """Build the Bedrock agent input for an enhancement request"""
+    agent_input = {
+        "prompt": request.prompt,
+        "model": request.model,
+        "type": request.type,
+        "client": request.client,
+        "vfx_id": request.vfx_template,
+        "reference_assets": request.has_reference_images,
+        "style_presets": request.style_presets or {},
+        "duration": request.duration,
+        "aspect_ratio": request.aspect_ratio
+    }
+
+    # Add VFX motion if selected
+    if request.vfx_template and request.vfx_template in VFX_TEMPLATES:
+        vfx = VFX_TEMPLATES[request.vfx_template]
+        agent_input["vfx_motion"] = vfx["motion"]
+        agent_input["vfx_style"] = vfx["style"]
+
+    # Add camera movement if no VFX
+    if request.camera_movement and not request.vfx_template:
+        agent_input["camera_movement"] = request.camera_movement
+
+    return agent_input
+
+
 @app.post("/api/enhance_prompt")
 async def enhance_prompt_endpoint(request: EnhancePromptRequest):
     """Endpoint for enhancing prompts with Bedrock agent"""
+    return await enhance_prompt(request)
+
+
+@app.post("/api/enhance_prompt/batch")
+async def enhance_prompt_batch(request: BatchEnhancePromptRequest):
+    """Enhance many prompts at once with bounded Bedrock concurrency, results in request order"""
+    if len(request.items) > MAX_ENHANCE_BATCH_ITEMS:
+        raise HTTPException(status_code=400, detail=f'At most {MAX_ENHANCE_BATCH_ITEMS} items per batch')
+
+    logger.info(f"Enhancing batch of {len(request.items)} prompts")
+    semaphore = asyncio.Semaphore(ENHANCE_BATCH_CONCURRENCY)
+
+    async def enhance_item(item: EnhancePromptRequest) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                return await enhance_prompt(item)
+            except Exception as e:
+                logger.error(f"Batch item enhancement error: {e}")
+                return {
+                    "success": True,
+                    "original_prompt": item.prompt,
+                    "enhanced_prompt": enhance_prompt_locally(item),
+                    "model": item.model,
+                    "type": item.type
+                }
+
+    results = await asyncio.gather(*(enhance_item(item) for item in request.items))
+
+    return {
+        "success": True,
+        "results": results,
+        "total": len(results)
+    }
+
+
+async def enhance_prompt(request: EnhancePromptRequest) -> Dict[str, Any]:
+    """Enhance one prompt with the Bedrock agent, falling back to local enhancement"""
     try:
         logger.info(f"Enhancing prompt for {request.model}: {request.prompt[:100]}...")
 
         # Build input for Bedrock agent
-        agent_input = {
-            "prompt": request.prompt,
-            "model": request.model,
-            "type": request.type,
-            "client": request.client,
-            "vfx_id": request.vfx_template,
-            "reference_assets": request.has_reference_images,
-            "style_presets": request.style_presets or {},
-            "duration": request.duration,
-            "aspect_ratio": request.aspect_ratio
-        }
-
-        # Add VFX motion if selected
-        if request.vfx_template and request.vfx_template in VFX_TEMPLATES:
-            vfx = VFX_TEMPLATES[request.vfx_template]
-            agent_input["vfx_motion"] = vfx["motion"]
-            agent_input["vfx_style"] = vfx["style"]
-
-        # Add camera movement if no VFX
-        if request.camera_movement and not request.vfx_template:
-            agent_input["camera_movement"] = request.camera_movement
+        agent_input = build_agent_input(request)
 
         # Call Bedrock agent
         try:
-            response = bedrock_agent.invoke_agent(
-                agentId=BEDROCK_AGENT_ID,
-                agentAliasId=BEDROCK_AGENT_ALIAS_ID,
-                sessionId=str(uuid.uuid4()),
-                inputText=json.dumps(agent_input)
+            enhanced_data = await enhancement_cache.get_or_compute(
+                agent_input, lambda: run_blocking(invoke_enhancement_agent, agent_input)
             )
-
-            # Parse response
-            enhanced_data = {}
-            for event in response['completion']:
-                if 'chunk' in event:
-                    chunk_data = event['chunk']['bytes'].decode('utf-8')
-                    try:
-                        enhanced_data = json.loads(chunk_data)
-                        break
-                    except:
-                        continue
-
             enhanced_prompt = enhanced_data.get("enhanced_prompt", request.prompt)
 
         except Exception as e:
@@ -502,6 +2011,29 @@ async def enhance_prompt_endpoint(request: EnhancePromptRequest):
         }
 
 
+def invoke_enhancement_agent(agent_input: Dict[str, Any]) -> Dict[str, Any]:
+    """Call the Bedrock agent and parse its JSON reply (blocking - run via run_blocking)"""
+    response = bedrock_agent.invoke_agent(
+        agentId=BEDROCK_AGENT_ID,
+        agentAliasId=BEDROCK_AGENT_ALIAS_ID,
+        sessionId=str(uuid.uuid4()),
+        inputText=json.dumps(agent_input)
+    )
+
+    # Parse response - the completion stream is consumed here, off the event loop
+    enhanced_data = {}
+    for event in response['completion']:
+        if 'chunk' in event:
+            chunk_data = event['chunk']['bytes'].decode('utf-8')
+            try:
+                enhanced_data = json.loads(chunk_data)
+                break
+            except:
+                continue
+
+    return enhanced_data
+
+
 def enhance_prompt_locally(request: EnhancePromptRequest) -> str:
     """Local fallback for prompt enhancement"""
     prompt = request.prompt
@@ -534,146 +2066,839 @@ def enhance_prompt_locally(request: EnhancePromptRequest) -> str:
     return prompt[:1000]  # Limit to 1000 chars
 
 
-# ==================== WEBSOCKET ENDPOINT ====================
+# ==================== STREAMING ENHANCEMENT ====================
 
-@app.websocket("/ws/{client_id}")
-async def websocket_endpoint(websocket: WebSocket, client_id: str):
-    await manager.connect(websocket, client_id)
-    try:
-        while True:
-            # Keep connection alive
-            data = await websocket.receive_text()
-            # Echo back for connection test
-            await websocket.send_text(f"Echo: {data}")
-    except WebSocketDisconnect:
-        manager.disconnect(client_id)
+ENHANCE_SYSTEM_PROMPT = (
+    "You are a creative director who rewrites generation prompts for AI video and image models. "
+    "You receive a JSON brief with the user's prompt, the target model, optional VFX motion, camera "
+    "movement, style presets, duration and aspect ratio. Reply with only the enhanced prompt text - "
+    "vivid, specific and under 1000 characters - with no preamble, quotes or JSON."
+)
 
 
-# ==================== UNIFIED GENERATION ENDPOINT ====================
+def stream_enhancement(agent_input: Dict[str, Any], emit, stop: threading.Event):
+    """Stream enhancement tokens from bedrock_runtime (blocking - run in enhance_stream_executor)
 
-@app.post("/api/unified_generate")
-async def unified_generate(request: UnifiedGenerateRequest, background_tasks: BackgroundTasks):
-    """Unified endpoint for all model generation with WebSocket progress"""
+    emit(text) is called from the worker thread for every text delta.
+    """
+    response = bedrock_runtime.converse_stream(
+        modelId=BEDROCK_ENHANCE_MODEL_ID,
+        system=[{'text': ENHANCE_SYSTEM_PROMPT}],
+        messages=[{'role': 'user', 'content': [{'text': json.dumps(agent_input)}]}],
+        inferenceConfig={'maxTokens': 512, 'temperature': 0.7}
+    )
+    stream = response['stream']
     try:
-        logger.info(f'🎯 Unified generation: type={request.type}, model={request.model}, client={request.client}')
+        for event in stream:
+            if stop.is_set():
+                break
+            text = event.get('contentBlockDelta', {}).get('delta', {}).get('text')
+            if text:
+                emit(text)
+    finally:
+        stream.close()
 
-        # Validate model selection
-        if request.type not in MODEL_REGISTRY:
-            raise HTTPException(status_code=400, detail=f'Invalid type: {request.type}')
 
-        if request.model not in MODEL_REGISTRY[request.type]:
-            raise HTTPException(status_code=400, detail=f'Invalid model for {request.type}: {request.model}')
+async def enhancement_tokens(agent_input: Dict[str, Any]):
+    """Async iterator over enhancement tokens as Bedrock produces them"""
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+    done = object()
 
-        model_info = MODEL_REGISTRY[request.type][request.model]
+    def emit(text: str):
+        loop.call_soon_threadsafe(queue.put_nowait, text)
 
-        if not model_info['available']:
-            if model_info.get('placeholder'):
-                raise HTTPException(status_code=503, detail=f'{model_info["name"]} is coming soon')
-            raise HTTPException(status_code=503, detail=f'{model_info["name"]} is not configured')
+    async def produce():
+        try:
+            await loop.run_in_executor(enhance_stream_executor, stream_enhancement, agent_input, emit, stop)
+            queue.put_nowait(done)
+        except Exception as e:
+            queue.put_nowait(e)
 
-        # Generate job ID
-        job_id = str(uuid.uuid4())
-        logger.info(f'📋 Job ID: {job_id}')
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # Client went away or we finished - let the worker thread stop reading
+        stop.set()
+        await asyncio.shield(producer)
+
+
+def sse_event(event: str, data: Dict[str, Any], event_id: Optional[str] = None) -> bytes:
+    lines = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{lines}event: {event}\ndata: {json.dumps(data)}\n\n".encode('utf-8')
+
+
+@app.post("/api/enhance_prompt/stream")
+async def enhance_prompt_stream(request: EnhancePromptRequest):
+    """Stream an enhanced prompt token by token over Server-Sent Events"""
+    logger.info(f"Streaming enhancement for {request.model}: {request.prompt[:100]}...")
+    agent_input = build_agent_input(request)
+    request_id = str(uuid.uuid4())
+
+    async def events():
+        tokens = []
+        fallback = False
+        try:
+            async for text in enhancement_tokens(agent_input):
+                tokens.append(text)
+                yield sse_event('token', {'text': text})
+                if request.websocket_id:
+                    await progress_bus.publish(request.websocket_id, {
+                        'type': 'enhance_token', 'request_id': request_id, 'text': text
+                    })
+            enhanced_prompt = ''.join(tokens).strip() or request.prompt
+        except Exception as e:
+            logger.error(f"Bedrock streaming error: {e}")
+            enhanced_prompt = enhance_prompt_locally(request)
+            fallback = True
 
-        # Initial progress
+        result = {
+            "success": True,
+            "original_prompt": request.prompt,
+            "enhanced_prompt": enhanced_prompt,
+            "model": request.model,
+            "type": request.type,
+            "fallback": fallback
+        }
+        yield sse_event('done', result)
         if request.websocket_id:
-            await update_progress(job_id, request.websocket_id, 0, "initializing", "Starting generation...")
+            await progress_bus.publish(request.websocket_id, {'type': 'enhance_done', 'request_id': request_id, **result})
 
-        # Normalize inputs
-        normalized_duration = request.duration or 5
-        if request.type == "video" and request.model == "veo3":
-            normalized_duration = max(1, min(8, int(normalized_duration)))
+    return StreamingResponse(
+        events(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
-        # If VFX selected, clear camera movement to avoid conflict
-        normalized_camera = "" if request.vfx_template else (request.camera_movement or "")
 
-        # Process reference images from base64
-        reference_urls = []
-        if request.reference_images:
-            if request.websocket_id:
-                await update_progress(job_id, request.websocket_id, 5, "processing", "Processing reference images...")
+# ==================== WEBSOCKET ENDPOINT ====================
 
-            for idx, base64_image in enumerate(request.reference_images):
-                try:
-                    # Extract base64 data
-                    if ',' in base64_image:
-                        header, data = base64_image.split(',', 1)
-                    else:
-                        data = base64_image
+@app.websocket("/ws/{client_id}")
+async def websocket_endpoint(websocket: WebSocket, client_id: str):
+    """Progress socket - every event for client_id, plus jobs subscribed to explicitly
+
+    Client messages (JSON text, or msgpack binary on msgpack sockets):
+        {"action": "subscribe", "job_ids": [...]}
+        {"action": "unsubscribe", "job_ids": [...]}
+        {"action": "ping"}
+    """
+    connection = await manager.connect(websocket, client_id)
+    try:
+        while True:
+            message = await websocket.receive()
+            if message['type'] == 'websocket.disconnect':
+                break
+            try:
+                if message.get('bytes') is not None and connection.encoding == 'msgpack':
+                    command = msgpack.unpackb(message['bytes'])
+                else:
+                    command = json.loads(message.get('text') or '')
+                action = command.get('action')
+                job_ids = [str(job_id) for job_id in command.get('job_ids') or []]
+            except (ValueError, AttributeError, TypeError) as e:
+                connection.enqueue({'type': 'error', 'message': f'Invalid message: {e}'})
+                continue
 
-                    # Store for processing
-                    reference_urls.append(base64_image)
-                except Exception as e:
-                    logger.error(f"Error processing reference image {idx}: {e}")
+            if action == 'subscribe':
+                accepted = manager.subscribe(connection, job_ids)
+                connection.enqueue({'type': 'subscribed', 'job_ids': accepted})
+                if len(accepted) < len(job_ids):
+                    connection.enqueue({'type': 'error', 'message': f'Subscription limit of {manager.max_subscriptions} reached'})
+                # Current state first so the subscriber does not wait for the next update
+                for job_id in accepted:
+                    state = job_store.get(job_id) or await progress_bus.get_state(job_id)
+                    if state is not None:
+                        connection.enqueue({k: state[k] for k in ('job_id', 'progress', 'status', 'message', 'timestamp')})
+            elif action == 'unsubscribe':
+                manager.unsubscribe(connection, job_ids)
+                connection.enqueue({'type': 'unsubscribed', 'job_ids': job_ids})
+            elif action == 'ping':
+                connection.enqueue({'type': 'pong'})
+            else:
+                connection.enqueue({'type': 'error', 'message': f'Unknown action: {action}'})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        manager.disconnect(connection)
 
-        # Build metadata
-        metadata = {
-            'job_id': job_id,
-            'type': request.type,
-            'model': request.model,
-            'model_info': model_info,
-            'status': 'processing',
-            'client': request.client,
-            'original_prompt': request.prompt,
-            'duration': normalized_duration,
-            'camera_movement': normalized_camera,
-            'vfx_template': request.vfx_template,
-            'style_presets': request.style_presets,
-            'reference_images_count': len(reference_urls),
-            'quality': request.quality,
-            'aspect_ratio': request.aspect_ratio,
-            'created_at': datetime.now().isoformat()
-        }
 
-        # Save initial metadata to S3
-        try:
-            s3_client.put_object(
-                Bucket=VIDEO_OUTPUT_BUCKET if request.type == "video" else IMAGE_OUTPUT_BUCKET,
-                Key=f"{request.client.lower()}/generated-{request.type}s/{job_id}/metadata.json",
-                Body=json.dumps(metadata, indent=2),
-                ContentType='application/json'
-            )
-        except Exception as e:
-            logger.error(f"Error saving metadata: {e}")
+# ==================== REFERENCE IMAGE STORE ====================
 
-        # Route to appropriate handler
-        if request.type == "video":
-            if request.model == "veo3":
-                background_tasks.add_task(
-                    generate_veo3_video,
-                    job_id, request, reference_urls, metadata
-                )
-            elif request.model == "runway":
-                background_tasks.add_task(
-                    generate_runway_video,
-                    job_id, request, reference_urls, metadata
-                )
-            elif request.model == "hailuo":
-                raise HTTPException(status_code=503, detail="Hailuo-02 integration coming soon")
-            else:
-                raise HTTPException(status_code=400, detail=f"Unsupported video model: {request.model}")
+REFERENCE_HANDLE_PREFIX = 'ref:sha256:'
 
-        elif request.type == "image":
-            if request.model == "dalle3":
-                background_tasks.add_task(
-                    generate_dalle3_image,
-                    job_id, request, metadata
-                )
-            elif request.model == "imagen4":
-                background_tasks.add_task(
-                    generate_imagen4_image,
-                    job_id, request, metadata
-                )
-            else:
-                raise HTTPException(status_code=400, detail=f"Unsupported image model: {request.model}")
 
-        # Estimate cost
-        estimated_cost = 0
-        if request.type == "video":
-            estimated_cost = model_info.get('cost_per_second', 0.1) * normalized_duration
+def is_reference_handle(value: str) -> bool:
+    if not value.startswith(REFERENCE_HANDLE_PREFIX):
+        return False
+    digest = value[len(REFERENCE_HANDLE_PREFIX):]
+    return len(digest) == 64 and all(c in '0123456789abcdef' for c in digest)
+
+
+def decode_data_url(data_url: str) -> tuple:
+    """Split a base64 data URL into (bytes, content_type, sha256 hex) (CPU bound)"""
+    content_type = 'application/octet-stream'
+    if ',' in data_url:
+        header, data = data_url.split(',', 1)
+        if header.startswith('data:'):
+            content_type = header[5:].split(';', 1)[0] or content_type
+    else:
+        data = data_url
+    raw = base64.b64decode(data)
+    return raw, content_type, hashlib.sha256(raw).hexdigest()
+
+
+class ReferenceImageStore:
+    """Content-addressed S3 store for reference images - identical images are uploaded once"""
+
+    def __init__(self, bucket: str, prefix: str, known_limit: int = 100000):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.known_limit = known_limit
+        self._known: OrderedDict = OrderedDict()  # digests confirmed to exist in S3
+        self.uploads = 0
+        self.dedup_hits = 0
+        self.bytes_uploaded = 0
+
+    def key_for(self, handle: str) -> str:
+        return f"{self.prefix}{handle[len(REFERENCE_HANDLE_PREFIX):]}"
+
+    def presigned_url(self, handle: str) -> str:
+        return presigned_urls.get(self.bucket, self.key_for(handle))
+
+    async def load(self, handle: str) -> tuple:
+        """Read a stored reference back; returns (raw bytes, content type)"""
+        obj = await run_blocking(s3_client.get_object, Bucket=self.bucket, Key=self.key_for(handle))
+        raw = await run_blocking(obj['Body'].read)
+        return raw, obj.get('ContentType', 'image/png')
+
+    async def store_data_url(self, data_url: str) -> str:
+        """Store a base64 data URL and return its handle"""
+        raw, content_type, digest = await asyncio.get_running_loop().run_in_executor(None, decode_data_url, data_url)
+        return await self.store_bytes(raw, content_type, digest)
+
+    async def store_bytes(self, raw: bytes, content_type: str, digest: str) -> str:
+        handle = f"{REFERENCE_HANDLE_PREFIX}{digest}"
+        if await self.exists(digest):
+            self.dedup_hits += 1
+            return handle
+
+        await run_blocking(
+            s3_client.put_object,
+            Bucket=self.bucket,
+            Key=self.key_for(handle),
+            Body=raw,
+            ContentType=content_type,
+            Metadata={'sha256': digest}
+        )
+        self.uploads += 1
+        self.bytes_uploaded += len(raw)
+        self._remember(digest)
+        return handle
+
+    async def store_upload(self, fileobj, digest: str, size: int, content_type: str) -> tuple:
+        """Stream an uploaded file hashed on arrival into the store; returns (handle, size, deduplicated)"""
+        handle = f"{REFERENCE_HANDLE_PREFIX}{digest}"
+        if await self.exists(digest):
+            self.dedup_hits += 1
+            return handle, size, True
+
+        fileobj.seek(0)
+        # upload_fileobj streams the file in multipart chunks instead of reading it whole
+        await run_blocking(
+            s3_client.upload_fileobj,
+            fileobj,
+            self.bucket,
+            self.key_for(handle),
+            ExtraArgs={'ContentType': content_type, 'Metadata': {'sha256': digest}},
+            Config=REFERENCE_UPLOAD_TRANSFER_CONFIG
+        )
+        self.uploads += 1
+        self.bytes_uploaded += size
+        self._remember(digest)
+        return handle, size, False
+
+    async def exists(self, digest: str) -> bool:
+        if digest in self._known:
+            self._known.move_to_end(digest)
+            return True
+        try:
+            await run_blocking(s3_client.head_object, Bucket=self.bucket, Key=f"{self.prefix}{digest}")
+        except botocore.exceptions.ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+        self._remember(digest)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'uploads': self.uploads,
+            'dedup_hits': self.dedup_hits,
+            'bytes_uploaded': self.bytes_uploaded
+        }
+
+    def _remember(self, digest: str):
+        self._known[digest] = True
+        while len(self._known) > self.known_limit:
+            self._known.popitem(last=False)
+
+
+REFERENCE_UPLOAD_TRANSFER_CONFIG = TransferConfig(multipart_threshold=8 * 1024 * 1024,
+                                                  multipart_chunksize=8 * 1024 * 1024, max_concurrency=4)
+
+reference_store = ReferenceImageStore(REFERENCE_IMAGES_BUCKET, REFERENCE_IMAGES_PREFIX)
+
+
+IMAGE_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif')
+)
+IMAGE_SNIFF_BYTES = 12
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Image content type from a file's leading bytes, or None if it is not a supported image"""
+    for signature, content_type in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
+
+
+class ReferenceUpload:
+    """A file part of a reference upload, hashed and spooled as its bytes arrive"""
+
+    SPOOL_BYTES = 1024 * 1024  # Held in memory up to this size, then rolled over to disk
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.content_type: Optional[str] = None  # Sniffed from the leading bytes
+        self.head = b''
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.file = SpooledTemporaryFile(max_size=self.SPOOL_BYTES)
+
+
+class ReferenceUploadParser:
+    """Streaming multipart/form-data parser for reference image uploads
+
+    Limits are checked on every chunk, so an oversized or surplus file is rejected
+    without reading the rest of the body, and each file is returned as soon as its
+    part ends so it can be stored while later parts are still arriving.
+    """
+
+    def __init__(self, boundary: bytes, max_file_bytes: int, max_files: int):
+        self.max_file_bytes = max_file_bytes
+        self.max_files = max_files
+        self.files = 0
+        self._events: List[tuple] = []
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_name = b''
+        self._header_value = b''
+        self._current: Optional[ReferenceUpload] = None
+        self._spooled: List[ReferenceUpload] = []
+        self._parser = MultipartParser(boundary, {
+            'on_part_begin': self._on_part_begin,
+            'on_header_field': self._on_header_field,
+            'on_header_value': self._on_header_value,
+            'on_header_end': self._on_header_end,
+            'on_headers_finished': lambda: self._events.append(('headers', self._headers)),
+            'on_part_data': lambda data, start, end: self._events.append(('data', data[start:end])),
+            'on_part_end': lambda: self._events.append(('end', None))
+        })
+
+    async def feed(self, chunk: bytes) -> List[ReferenceUpload]:
+        """Parse a chunk of the body and return the files it completed"""
+        try:
+            self._parser.write(chunk)
+        except FormParserError:
+            raise HTTPException(status_code=400, detail='Invalid multipart body')
+
+        completed = []
+        events, self._events = self._events, []
+        for event, value in events:
+            if event == 'headers':
+                self._current = self._begin_file(value)
+            elif event == 'data' and self._current is not None:
+                await self._write(self._current, value)
+            elif event == 'end' and self._current is not None:
+                if self._current.content_type is None:
+                    self._sniff(self._current)
+                self._current.file.seek(0)
+                completed.append(self._current)
+                self._current = None
+        return completed
+
+    def finish(self):
+        try:
+            self._parser.finalize()
+        except FormParserError:
+            raise HTTPException(status_code=400, detail='Invalid multipart body')
+        if self._current is not None or self._events:
+            raise HTTPException(status_code=400, detail='Truncated multipart body')
+
+    def close(self):
+        for upload in self._spooled:
+            upload.file.close()
+
+    def _on_part_begin(self):
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_name.lower()] = self._header_value
+        self._header_name = b''
+        self._header_value = b''
+
+    def _begin_file(self, headers: Dict[bytes, bytes]) -> Optional[ReferenceUpload]:
+        _, options = parse_options_header(headers.get(b'content-disposition', b''))
+        if options.get(b'name') != b'files' or b'filename' not in options:
+            return None  # Other form fields are skipped
+
+        self.files += 1
+        if self.files > self.max_files:
+            raise HTTPException(status_code=400, detail=f'At most {self.max_files} files per upload')
+
+        # The part's Content-Type is client-supplied; the type comes from the file's own bytes
+        upload = ReferenceUpload(options[b'filename'].decode('utf-8', 'replace'))
+        self._spooled.append(upload)
+        return upload
+
+    def _sniff(self, upload: ReferenceUpload):
+        upload.content_type = sniff_image_type(upload.head)
+        if upload.content_type is None:
+            raise HTTPException(status_code=415, detail=f'Not a PNG, JPEG, GIF or WebP image: {upload.filename}')
+
+    async def _write(self, upload: ReferenceUpload, data: bytes):
+        upload.size += len(data)
+        if upload.size > self.max_file_bytes:
+            raise HTTPException(status_code=413, detail=f'{upload.filename}: File exceeds {self.max_file_bytes} bytes')
+        if upload.content_type is None:
+            upload.head = (upload.head + data)[:IMAGE_SNIFF_BYTES]
+            if len(upload.head) == IMAGE_SNIFF_BYTES:
+                self._sniff(upload)
+        upload.digest.update(data)
+        if upload.size > upload.SPOOL_BYTES:
+            # Past the spool size the file rolls over to disk - keep the write off the event loop
+            await asyncio.get_running_loop().run_in_executor(None, upload.file.write, data)
+        else:
+            upload.file.write(data)
+
+
+@app.post("/api/reference_images")
+async def upload_reference_images(request: Request):
+    """Upload reference images as multipart/form-data and return handles for unified_generate"""
+    media_type, options = parse_options_header(request.headers.get('content-type', ''))
+    if media_type != b'multipart/form-data' or b'boundary' not in options:
+        raise HTTPException(status_code=400, detail='Expected multipart/form-data')
+
+    # Room for every file plus its part headers and boundaries
+    max_body_bytes = MAX_REFERENCE_UPLOAD_FILES * (MAX_REFERENCE_IMAGE_BYTES + 64 * 1024)
+    content_length = int(request.headers.get('content-length') or 0)
+    if content_length > max_body_bytes:
+        raise HTTPException(status_code=413, detail='Upload too large')
+
+    parser = ReferenceUploadParser(options[b'boundary'], MAX_REFERENCE_IMAGE_BYTES, MAX_REFERENCE_UPLOAD_FILES)
+    uploads: List[tuple] = []
+    stores: Dict[str, asyncio.Task] = {}  # digest -> store task, so repeated files upload once
+    try:
+        received = 0
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_body_bytes:
+                raise HTTPException(status_code=413, detail='Upload too large')
+            # Store each file as soon as its part ends while the rest of the body streams in
+            for upload in await parser.feed(chunk):
+                digest = upload.digest.hexdigest()
+                uploads.append((upload, digest, digest in stores))
+                if digest not in stores:
+                    stores[digest] = asyncio.create_task(
+                        reference_store.store_upload(upload.file, digest, upload.size, upload.content_type)
+                    )
+        parser.finish()
+        if not uploads:
+            raise HTTPException(status_code=400, detail='No files uploaded')
+
+        await asyncio.gather(*stores.values())
+        references = []
+        for upload, digest, repeated in uploads:
+            handle, size, deduplicated = stores[digest].result()
+            references.append({
+                'handle': handle,
+                'filename': upload.filename,
+                'content_type': upload.content_type,
+                'size': size,
+                'deduplicated': deduplicated or repeated
+            })
+
+        logger.info(f'🖼️ Stored {len(references)} reference images')
+
+        return {
+            'success': True,
+            'references': references
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f'💥 Reference upload error: {str(e)}')
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        for store in stores.values():
+            store.cancel()
+        await asyncio.gather(*stores.values(), return_exceptions=True)
+        parser.close()
+
+
+# ==================== GENERATION SCHEDULER ====================
+
+class TokenBucket:
+    """Token bucket refilled continuously at rate tokens per second"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Take a token if one is available; otherwise return seconds until the next one"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class QueuedJob:
+    __slots__ = ('job_id', 'websocket_id', 'run', 'metadata', 'enqueued_at')
+
+    def __init__(self, job_id: str, websocket_id: Optional[str], run, metadata: Optional[Dict]):
+        self.job_id = job_id
+        self.websocket_id = websocket_id
+        self.run = run  # () -> coroutine running the generation handler
+        self.metadata = metadata
+        self.enqueued_at = time.monotonic()
+
+
+class ModelLane:
+    """Priority queue, token bucket and concurrency cap for one model"""
+
+    def __init__(self, name: str, rate_limit: Dict[str, Any]):
+        self.name = name
+        self.bucket = TokenBucket(rate_limit.get('requests_per_minute', 60) / 60.0, rate_limit.get('burst', 1))
+        self.max_concurrent = max(1, rate_limit.get('max_concurrent', 4))
+        self.queue: List[tuple] = []  # heap of (priority, seq, QueuedJob)
+        self.running = 0
+        self.wakeup = asyncio.Event()
+        self.dispatcher: Optional[asyncio.Task] = None
+        self.dispatched = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def position(self, job_id: str) -> Optional[int]:
+        entry = next((e for e in self.queue if e[2].job_id == job_id), None)
+        if entry is None:
+            return None
+        return 1 + sum(1 for e in self.queue if e[:2] < entry[:2])
+
+
+class GenerationScheduler:
+    """Queues generation jobs per model and releases them within MODEL_REGISTRY rate limits
+
+    Lanes cap what one process runs; the durable queue's claims apply the same
+    limits across processes, so lanes rarely have to hold a claimed job back.
+    """
+
+    def __init__(self):
+        self.lanes: Dict[tuple, ModelLane] = {}
+        self._seq = itertools.count()
+        self._running: set = set()
+
+    def lane(self, model_type: str, model: str) -> ModelLane:
+        key = (model_type, model)
+        lane = self.lanes.get(key)
+        if lane is None:
+            model_info = MODEL_REGISTRY[model_type][model]
+            lane = self.lanes[key] = ModelLane(model_info['name'], model_info.get('rate_limit', {}))
+        if lane.dispatcher is None or lane.dispatcher.done():
+            lane.dispatcher = asyncio.create_task(self._dispatch(lane))
+        return lane
+
+    def submit(self, model_type: str, model: str, job_id: str, websocket_id: Optional[str], run,
+               priority: int = 5, metadata: Optional[Dict] = None) -> ModelLane:
+        """Queue a job; lower priority values run first, FIFO within a priority"""
+        lane = self.lane(model_type, model)
+        heapq.heappush(lane.queue, (priority, next(self._seq), QueuedJob(job_id, websocket_id, run, metadata)))
+        lane.wakeup.set()
+        return lane
+
+    def free_capacity(self) -> Dict[tuple, int]:
+        """How many more jobs each model's lane can take before exceeding its concurrency cap"""
+        capacity = {}
+        for model_type, models in MODEL_REGISTRY.items():
+            for model, model_info in models.items():
+                lane = self.lanes.get((model_type, model))
+                if lane is None:
+                    capacity[(model_type, model)] = max(1, model_info.get('rate_limit', {}).get('max_concurrent', 4))
+                else:
+                    capacity[(model_type, model)] = lane.max_concurrent - lane.running - len(lane.queue)
+        return capacity
+
+    def queue_info(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Live queue position, depth and wait for a job that has not started yet"""
+        for lane in self.lanes.values():
+            position = lane.position(job_id)
+            if position is not None:
+                job = next(e[2] for e in lane.queue if e[2].job_id == job_id)
+                return {
+                    'queue_position': position,
+                    'queue_depth': len(lane.queue),
+                    'queue_wait_seconds': round(time.monotonic() - job.enqueued_at, 3)
+                }
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            f'{key[0]}/{key[1]}': {
+                'queued': len(lane.queue),
+                'running': lane.running,
+                'max_concurrent': lane.max_concurrent,
+                'dispatched': lane.dispatched,
+                'avg_wait_seconds': round(lane.total_wait / lane.dispatched, 3) if lane.dispatched else 0.0,
+                'max_wait_seconds': round(lane.max_wait, 3)
+            }
+            for key, lane in self.lanes.items()
+        }
+
+    async def stop(self):
+        for lane in self.lanes.values():
+            if lane.dispatcher is not None:
+                lane.dispatcher.cancel()
+        for task in list(self._running):
+            task.cancel()
+
+    async def _dispatch(self, lane: ModelLane):
+        while True:
+            if not lane.queue or lane.running >= lane.max_concurrent:
+                lane.wakeup.clear()
+                await lane.wakeup.wait()
+                continue
+
+            wait = lane.bucket.take()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+
+            _, _, job = heapq.heappop(lane.queue)
+            waited = time.monotonic() - job.enqueued_at
+            lane.dispatched += 1
+            lane.total_wait += waited
+            lane.max_wait = max(lane.max_wait, waited)
+            if job.metadata is not None:
+                job.metadata['queue_wait_seconds'] = round(waited, 3)
+
+            lane.running += 1
+            task = asyncio.create_task(self._run(lane, job))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, lane: ModelLane, job: QueuedJob):
+        try:
+            await job.run()
+        except Exception as e:
+            logger.error(f"Unhandled error in job {job.job_id}: {e}")
+        finally:
+            lane.running -= 1
+            lane.wakeup.set()
+
+
+scheduler = GenerationScheduler()
+
+
+# ==================== UNIFIED GENERATION ENDPOINT ====================
+
+def validate_generation(request: UnifiedGenerateRequest) -> Dict[str, Any]:
+    """Check the requested model against MODEL_REGISTRY and return its registry entry"""
+    if request.type not in MODEL_REGISTRY:
+        raise HTTPException(status_code=400, detail=f'Invalid type: {request.type}')
+
+    if request.model not in MODEL_REGISTRY[request.type]:
+        raise HTTPException(status_code=400, detail=f'Invalid model for {request.type}: {request.model}')
+
+    model_info = MODEL_REGISTRY[request.type][request.model]
+
+    if not model_info['available']:
+        if model_info.get('placeholder'):
+            raise HTTPException(status_code=503, detail=f'{model_info["name"]} is coming soon')
+        raise HTTPException(status_code=503, detail=f'{model_info["name"]} is not configured')
+
+    if request.model == "hailuo":
+        raise HTTPException(status_code=503, detail="Hailuo-02 integration coming soon")
+
+    return model_info
+
+
+def normalized_duration_for(request: UnifiedGenerateRequest) -> int:
+    normalized_duration = request.duration or 5
+    if request.type == "video" and request.model == "veo3":
+        normalized_duration = max(1, min(8, int(normalized_duration)))
+    return normalized_duration
+
+
+def estimate_cost(request: UnifiedGenerateRequest, model_info: Dict[str, Any]) -> float:
+    if request.type == "video":
+        return model_info.get('cost_per_second', 0.1) * normalized_duration_for(request)
+    return model_info.get('cost_per_image', 0.04) * request.num_images
+
+
+async def prepare_job(job_id: str, request: UnifiedGenerateRequest, model_info: Dict[str, Any]) -> tuple:
+    """Store reference images and build the job's initial metadata; returns (reference_urls, metadata)"""
+    # Initial progress
+    if request.websocket_id:
+        await update_progress(job_id, request.websocket_id, 0, "initializing", "Starting generation...")
+
+    # Normalize inputs
+    normalized_duration = normalized_duration_for(request)
+
+    # If VFX selected, clear camera movement to avoid conflict
+    normalized_camera = "" if request.vfx_template else (request.camera_movement or "")
+
+    # Process reference images from base64
+    reference_urls = []
+    if request.reference_images:
+        if request.websocket_id:
+            await update_progress(job_id, request.websocket_id, 5, "processing", "Processing reference images...")
+
+        for idx, reference in enumerate(request.reference_images):
+            # Decode once into the content-addressed store; jobs only carry the handle
+            try:
+                if is_reference_handle(reference):
+                    known = await reference_store.exists(reference[len(REFERENCE_HANDLE_PREFIX):])
+                    if not known:
+                        raise HTTPException(status_code=400, detail=f'Unknown reference image {idx}: {reference}')
+                    reference_urls.append(reference)
+                else:
+                    reference_urls.append(await reference_store.store_data_url(reference))
+            except HTTPException:
+                raise
+            except ValueError as e:
+                # binascii.Error from a malformed base64 payload is a ValueError
+                raise HTTPException(status_code=400, detail=f'Invalid reference image {idx}: {e}')
+            except Exception as e:
+                logger.error(f"Error storing reference image {idx}: {e}")
+                raise HTTPException(status_code=502, detail=f'Could not store reference image {idx}')
+
+        # Drop the base64 payloads so they are not held by the background task
+        request.reference_images = reference_urls
+
+    # Build metadata
+    metadata = {
+        'job_id': job_id,
+        'type': request.type,
+        'model': request.model,
+        'model_info': model_info,
+        'status': 'processing',
+        'client': request.client,
+        'original_prompt': request.prompt,
+        'duration': normalized_duration,
+        'camera_movement': normalized_camera,
+        'vfx_template': request.vfx_template,
+        'style_presets': request.style_presets,
+        'reference_images_count': len(reference_urls),
+        'reference_images': reference_urls,
+        'quality': request.quality,
+        'aspect_ratio': request.aspect_ratio,
+        'created_at': datetime.now().isoformat()
+    }
+    return reference_urls, metadata
+
+
+async def save_initial_metadata(job_id: str, request: UnifiedGenerateRequest, metadata: Dict):
+    """Queue initial metadata for S3 and record where it lives"""
+    metadata_bucket, metadata_key = job_metadata_location(request.client, request.type, job_id)
+    try:
+        await run_blocking(job_index.put, job_id, metadata_bucket, metadata_key, request.client, request.type)
+    except Exception as e:
+        logger.error(f"Error indexing job location: {e}")
+
+    # Create-only: the worker's terminal write may reach S3 first and must win
+    metadata_writer.submit(job_id, metadata, create_only=True)
+    await record_history(metadata)
+
+
+def job_runner(job_id: str, request: UnifiedGenerateRequest, reference_urls: List[str], metadata: Dict,
+               provider_task_id: Optional[str] = None):
+    """Coroutine factory running the generation handler for a job"""
+    if request.type == "video":
+        if request.model == "veo3":
+            return lambda: generate_veo3_video(job_id, request, reference_urls, metadata, provider_task_id)
+        elif request.model == "runway":
+            return lambda: generate_runway_video(job_id, request, reference_urls, metadata, provider_task_id)
+        else:
+            raise HTTPException(status_code=400, detail=f"Unsupported video model: {request.model}")
+
+    elif request.type == "image":
+        if request.model == "dalle3":
+            return lambda: generate_dalle3_image(job_id, request, metadata)
+        elif request.model == "imagen4":
+            return lambda: generate_imagen4_image(job_id, request, metadata)
         else:
-            estimated_cost = model_info.get('cost_per_image', 0.04) * request.num_images
+            raise HTTPException(status_code=400, detail=f"Unsupported image model: {request.model}")
+
+
+async def dispatch_job(job_id: str, request: UnifiedGenerateRequest, reference_urls: List[str], metadata: Dict):
+    """Persist a prepared job on the durable queue for the generation workers"""
+    job_runner(job_id, request, reference_urls, metadata)  # Reject unsupported models before queueing
+
+    await run_blocking(job_queue.enqueue, job_id, request.model_dump(), reference_urls, metadata, request.priority)
+    job_worker.wake()
+
+    queued = await run_blocking(job_queue.get, job_id)
+    if queued is not None and queued['queue_state'] == 'pending':
+        model_name = MODEL_REGISTRY[request.type][request.model]['name']
+        await update_progress(job_id, request.websocket_id, 5, "queued",
+                              f"Queued for {model_name} (position {queued['queue_position']} of {queued['queue_depth']})")
 
+
+@app.post("/api/unified_generate")
+async def unified_generate(request: UnifiedGenerateRequest):
+    """Unified endpoint for all model generation with WebSocket progress"""
+    try:
+        logger.info(f'🎯 Unified generation: type={request.type}, model={request.model}, client={request.client}')
+
+        # Validate model selection
+        model_info = validate_generation(request)
+
+        # Generate job ID
+        job_id = str(uuid.uuid4())
+        logger.info(f'📋 Job ID: {job_id}')
+
+        reference_urls, metadata = await prepare_job(job_id, request, model_info)
+        await save_initial_metadata(job_id, request, metadata)
+
+        # Route to appropriate handler
+        await dispatch_job(job_id, request, reference_urls, metadata)
+
+        normalized_duration = metadata['duration']
         return {
             'success': True,
             'message': f'{model_info["name"]} generation initiated',
@@ -681,7 +2906,7 @@ async def unified_generate(request: UnifiedGenerateRequest, background_tasks: Ba
             'type': request.type,
             'model': request.model,
             'status': 'processing',
-            'estimated_cost': estimated_cost,
+            'estimated_cost': estimate_cost(request, model_info),
             'estimated_time': normalized_duration * 3 if request.type == "video" else 10,
             'websocket_url': f'/ws/{request.websocket_id}' if request.websocket_id else None
         }
@@ -694,106 +2919,500 @@ async def unified_generate(request: UnifiedGenerateRequest, background_tasks: Ba
         raise HTTPException(status_code=500, detail=str(e))
 
 
-# ==================== VEO 3 GENERATION ====================
+@app.post("/api/unified_generate/batch")
+async def unified_generate_batch(request: BatchGenerateRequest):
+    """Submit many generation jobs at once, tracked together over one WebSocket"""
+    if not request.items:
+        raise HTTPException(status_code=400, detail='Batch is empty')
+    if len(request.items) > MAX_GENERATE_BATCH_ITEMS:
+        raise HTTPException(status_code=400, detail=f'At most {MAX_GENERATE_BATCH_ITEMS} items per batch')
+
+    # Validate everything before creating any job
+    model_infos = []
+    for idx, item in enumerate(request.items):
+        try:
+            model_infos.append(validate_generation(item))
+        except HTTPException as e:
+            raise HTTPException(status_code=e.status_code, detail=f'Item {idx}: {e.detail}')
 
-async def generate_veo3_video(job_id: str, request: UnifiedGenerateRequest, reference_images: List[str],
-                              metadata: Dict):
-    """Generate video with Veo 3 with realistic progress tracking"""
     try:
-        from google import genai
-        from google.genai import types
+        batch_id = str(uuid.uuid4())
+        logger.info(f'🎯 Batch generation {batch_id}: {len(request.items)} jobs')
+
+        for item in request.items:
+            if request.websocket_id and not item.websocket_id:
+                item.websocket_id = request.websocket_id
+
+        async def prepare_item(job_id: str, item: UnifiedGenerateRequest, model_info: Dict):
+            reference_urls, metadata = await prepare_job(job_id, item, model_info)
+            metadata['batch_id'] = batch_id
+            await save_initial_metadata(job_id, item, metadata)
+            return reference_urls, metadata
+
+        # Items succeed or fail on their own - a late failure must not hide jobs already queued
+        job_ids = [str(uuid.uuid4()) for _ in request.items]
+        prepared = await asyncio.gather(*(
+            prepare_item(job_id, item, model_info)
+            for job_id, item, model_info in zip(job_ids, request.items, model_infos)
+        ), return_exceptions=True)
+
+        jobs = []
+        for idx, (job_id, item, model_info, result) in enumerate(zip(job_ids, request.items, model_infos, prepared)):
+            try:
+                if isinstance(result, Exception):
+                    raise result
+                reference_urls, metadata = result
+                try:
+                    await dispatch_job(job_id, item, reference_urls, metadata)
+                except Exception as e:
+                    # The initial record is already stored - close it out instead of leaving it queued
+                    metadata['status'] = 'failed'
+                    metadata['error'] = str(getattr(e, 'detail', e))
+                    metadata['failed_at'] = datetime.now().isoformat()
+                    await update_progress(job_id, item.websocket_id, 0, 'failed', metadata['error'])
+                    job_store.fail(job_id, metadata['error'], metadata)
+                    metadata_writer.submit(job_id, metadata, terminal=True)
+                    await record_history(metadata)
+                    raise
+            except Exception as e:
+                logger.error(f'Batch {batch_id} item {idx} failed: {e}')
+                jobs.append({
+                    'index': idx,
+                    'success': False,
+                    'type': item.type,
+                    'model': item.model,
+                    'error': str(getattr(e, 'detail', e))
+                })
+                continue
+            jobs.append({
+                'index': idx,
+                'success': True,
+                'job_id': job_id,
+                'type': item.type,
+                'model': item.model,
+                'estimated_cost': estimate_cost(item, model_info)
+            })
 
-        websocket_id = request.websocket_id
+        submitted = [job for job in jobs if job['success']]
+        job_ids = [job['job_id'] for job in submitted]
+        if request.websocket_id and job_ids:
+            await progress_bus.publish(request.websocket_id, {
+                'type': 'batch_submitted',
+                'batch_id': batch_id,
+                'job_ids': job_ids
+            })
+
+        return {
+            'success': len(submitted) == len(jobs),
+            'batch_id': batch_id,
+            'job_ids': job_ids,
+            'jobs': jobs,
+            'total': len(jobs),
+            'submitted': len(submitted),
+            'failed': len(jobs) - len(submitted),
+            'status': 'processing' if submitted else 'failed',
+            'estimated_cost': round(sum(job['estimated_cost'] for job in submitted), 4),
+            'websocket_url': f'/ws/{request.websocket_id}' if request.websocket_id else None
+        }
 
-        # Configure client
-        client = genai.Client(api_key=GEMINI_API_KEY)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f'💥 Batch generation error: {str(e)}')
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=str(e))
 
-        # Progress: Initialization
-        await update_progress(job_id, websocket_id, 5, "processing", "Initializing Veo 3 model...")
-        await asyncio.sleep(0.5)
 
-        # Progress: Analyzing prompt
-        await update_progress(job_id, websocket_id, 10, "processing", "Analyzing creative prompt...")
+# ==================== OUTPUT INGESTION ====================
 
-        # Build enhanced prompt with VFX
-        final_prompt = request.prompt
-        if request.vfx_template:
-            normalized_vfx = normalize_vfx_id(request.vfx_template)
-            if normalized_vfx and normalized_vfx in VFX_TEMPLATES:
-                vfx = VFX_TEMPLATES[normalized_vfx]
-                final_prompt = f"{final_prompt}. {vfx['motion']}"
-                await update_progress(job_id, websocket_id, 15, "processing", f"Applying {vfx['name']} effect...")
-        elif request.camera_movement:
-            final_prompt = f"{final_prompt}. Camera: {request.camera_movement}"
-            await update_progress(job_id, websocket_id, 15, "processing", "Setting camera movement...")
+class OutputIngestor:
+    """Streams provider outputs into S3 as parallel multipart parts, each checked by S3 against its Content-MD5"""
 
-        # Add technical specs
-        final_prompt = f"Duration: {request.duration}s. Aspect: {request.aspect_ratio}. {final_prompt}"
+    def __init__(self, part_size: int, max_parts_in_flight: int):
+        self.part_size = max(part_size, 5 * 1024 * 1024)  # S3 minimum part size
+        self.max_parts_in_flight = max_parts_in_flight
+        self.objects = 0
+        self.bytes_ingested = 0
+        self.failures = 0
 
-        await asyncio.sleep(0.5)
+    async def ingest(self, source_url: str, bucket: str, key: str, content_type: str,
+                     headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Copy source_url to s3://bucket/key and return byte count, checksum and throughput"""
+        started = time.monotonic()
+        sha256 = hashlib.sha256()
+        total = 0
+        upload_id = None
+        parts: List[Dict[str, Any]] = []
+        pending: List[asyncio.Task] = []
+        # Each buffered part holds a slot, so memory stays at (in-flight + 1) parts
+        slots = asyncio.Semaphore(self.max_parts_in_flight)
 
-        # Progress: Processing reference images
-        if reference_images and len(reference_images) > 0:
-            await update_progress(job_id, websocket_id, 20, "processing", "Processing reference images...")
-            await asyncio.sleep(1)
+        async def upload_part(number: int, data: bytes):
+            try:
+                # S3 rejects a part whose body does not match ContentMD5; ETags are not MD5s under SSE-KMS
+                response = await run_blocking(
+                    s3_client.upload_part,
+                    Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=number,
+                    Body=data, ContentMD5=base64.b64encode(hashlib.md5(data).digest()).decode('ascii')
+                )
+                parts.append({'PartNumber': number, 'ETag': response['ETag']})
+            finally:
+                slots.release()
 
-            # Image-to-video generation
-            await update_progress(job_id, websocket_id, 25, "processing", "Analyzing visual references...")
-            await asyncio.sleep(1)
+        def raise_failed_part():
+            # Stop downloading as soon as any part has failed instead of at the final gather
+            for task in pending:
+                if task.done() and not task.cancelled() and task.exception() is not None:
+                    raise task.exception()
 
-            # TODO: Process base64 images for Veo 3
-            # For now, simulate image processing
-            await update_progress(job_id, websocket_id, 30, "processing", "Extracting visual features...")
-            await asyncio.sleep(1.5)
+        try:
+            async with providers.http().stream('GET', source_url, headers=headers) as response:
+                response.raise_for_status()
+                expected = response.headers.get('content-length')
+                buffer = bytearray()
+
+                async for chunk in response.aiter_bytes():
+                    sha256.update(chunk)
+                    total += len(chunk)
+                    buffer.extend(chunk)
+                    if len(buffer) < self.part_size:
+                        continue
 
-            # Simulate Veo 3 image-to-video API call
-            await update_progress(job_id, websocket_id, 40, "processing", "Generating initial frames from reference...")
-            await asyncio.sleep(2)
+                    if upload_id is None:
+                        created = await run_blocking(
+                            s3_client.create_multipart_upload, Bucket=bucket, Key=key, ContentType=content_type
+                        )
+                        upload_id = created['UploadId']
+                    raise_failed_part()
+                    await slots.acquire()
+                    raise_failed_part()
+                    data = bytes(buffer[:self.part_size])
+                    del buffer[:self.part_size]
+                    pending.append(asyncio.create_task(upload_part(len(pending) + 1, data)))
+
+                if expected is not None and int(expected) != total:
+                    raise Exception(f'Truncated download for {key}: {total} of {expected} bytes')
+
+            if upload_id is None:
+                # Small output - a single verified PUT
+                data = bytes(buffer)
+                await run_blocking(
+                    s3_client.put_object,
+                    Bucket=bucket, Key=key, Body=data, ContentType=content_type,
+                    ContentMD5=base64.b64encode(hashlib.md5(data).digest()).decode('ascii')
+                )
+            else:
+                if buffer:
+                    await slots.acquire()
+                    pending.append(asyncio.create_task(upload_part(len(pending) + 1, bytes(buffer))))
+                await asyncio.gather(*pending)
+                parts.sort(key=lambda part: part['PartNumber'])
+                await run_blocking(
+                    s3_client.complete_multipart_upload,
+                    Bucket=bucket, Key=key, UploadId=upload_id, MultipartUpload={'Parts': parts}
+                )
 
-            await update_progress(job_id, websocket_id, 50, "processing", "Building motion sequence...")
-            await asyncio.sleep(2)
+        except Exception:
+            self.failures += 1
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            if upload_id is not None:
+                try:
+                    await run_blocking(s3_client.abort_multipart_upload, Bucket=bucket, Key=key, UploadId=upload_id)
+                except Exception as e:
+                    logger.error(f"Error aborting multipart upload for {key}: {e}")
+            raise
 
-            await update_progress(job_id, websocket_id, 60, "processing", "Applying temporal consistency...")
-            await asyncio.sleep(2)
+        seconds = time.monotonic() - started
+        self.objects += 1
+        self.bytes_ingested += total
+        return {
+            'bytes': total,
+            'sha256': sha256.hexdigest(),
+            'parts': len(parts) or 1,
+            'seconds': round(seconds, 3),
+            'throughput_bps': int(total / seconds) if seconds > 0 else total
+        }
 
-            await update_progress(job_id, websocket_id, 70, "processing", "Rendering video frames...")
-            await asyncio.sleep(3)
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'objects': self.objects,
+            'bytes_ingested': self.bytes_ingested,
+            'failures': self.failures
+        }
 
-            await update_progress(job_id, websocket_id, 80, "processing", "Applying final effects...")
-            await asyncio.sleep(2)
 
-        else:
-            # Text-to-video generation
-            await update_progress(job_id, websocket_id, 25, "processing", "Interpreting text prompt...")
-            await asyncio.sleep(1)
+output_ingestor = OutputIngestor(INGEST_PART_SIZE, INGEST_PARTS_IN_FLIGHT)
+
+
+# ==================== PROVIDER TASK POLLER ====================
+
+class PolledTask:
+    """Scheduling state for one outstanding provider task"""
+    __slots__ = ('task_id', 'future', 'on_update', 'state', 'started_at', 'due_at')
+
+    def __init__(self, task_id: str, future: asyncio.Future, on_update):
+        self.task_id = task_id
+        self.future = future
+        self.on_update = on_update
+        self.state = None
+        self.started_at = time.monotonic()
+        self.due_at = self.started_at
+
+
+class TaskPoller:
+    """One background loop that polls every outstanding task of a provider on its own schedule.
+
+    Each task is polled at an interval proportional to how long it has been running,
+    clamped to a per-state (min, max) window and reset whenever the state changes, so
+    a long PENDING queue costs a handful of calls instead of one every few seconds.
+    """
+
+    def __init__(self, name: str, fetch_status, intervals: Dict[str, tuple], success_states: set,
+                 failure_states: set, timeout: float, elapsed_factor: float = 0.2,
+                 default_interval: tuple = (5.0, 30.0)):
+        self.name = name
+        self.fetch_status = fetch_status  # async (task_id) -> (state, payload)
+        self.intervals = intervals
+        self.success_states = success_states
+        self.failure_states = failure_states
+        self.timeout = timeout
+        self.elapsed_factor = elapsed_factor
+        self.default_interval = default_interval
+        self.tasks: Dict[str, PolledTask] = {}
+        self._schedule: List[tuple] = []  # heap of (due_at, task_id)
+        self._in_flight: set = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._runner: Optional[asyncio.Task] = None
+        self.polls = 0
+        self.state_changes = 0
+
+    def start(self):
+        if self._runner is None or self._runner.done():
+            self._wakeup = asyncio.Event()
+            self._runner = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._runner is not None:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+            self._runner = None
+        for poll in list(self._in_flight):
+            poll.cancel()
+        for task in self.tasks.values():
+            if not task.future.done():
+                task.future.cancel()
+        self.tasks.clear()
+        self._schedule.clear()
+
+    async def watch(self, task_id: str, on_update=None, state: Optional[str] = None) -> Dict[str, Any]:
+        """Track a task until it reaches a terminal state and return the provider payload.
+
+        on_update(state, elapsed_seconds) is awaited after every poll of a still-running task.
+        """
+        self.start()
+        task = PolledTask(task_id, asyncio.get_running_loop().create_future(), on_update)
+        task.state = state
+        task.due_at = task.started_at + self._interval_for(task)
+        self.tasks[task_id] = task
+        self._push(task)
+        try:
+            return await task.future
+        finally:
+            self.tasks.pop(task_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'outstanding': len(self.tasks),
+            'polls': self.polls,
+            'state_changes': self.state_changes
+        }
+
+    def _interval_for(self, task: PolledTask) -> float:
+        low, high = self.intervals.get(task.state, self.default_interval)
+        elapsed = time.monotonic() - task.started_at
+        return max(low, min(high, elapsed * self.elapsed_factor))
+
+    def _push(self, task: PolledTask):
+        task.due_at = min(task.due_at, task.started_at + self.timeout)
+        heapq.heappush(self._schedule, (task.due_at, task.task_id))
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            if not self._schedule:
+                await self._wakeup.wait()
+                continue
+
+            delay = self._schedule[0][0] - time.monotonic()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            # Dispatch every task that is due; each one reschedules itself when its poll returns
+            now = time.monotonic()
+            while self._schedule and self._schedule[0][0] <= now:
+                _, task_id = heapq.heappop(self._schedule)
+                task = self.tasks.get(task_id)
+                if task is None or task.future.done():
+                    continue
+                poll = asyncio.create_task(self._poll(task))
+                self._in_flight.add(poll)
+                poll.add_done_callback(self._in_flight.discard)
+
+    async def _poll(self, task: PolledTask):
+        try:
+            state, payload = await self.fetch_status(task.task_id)
+        except Exception as e:
+            logger.warning(f"{self.name} poll error for {task.task_id}: {e}")
+            state, payload = task.state, None
+        self.polls += 1
+
+        if task.future.done():
+            return
+
+        elapsed = time.monotonic() - task.started_at
+        if state in self.success_states:
+            task.future.set_result(payload)
+            return
+        if state in self.failure_states:
+            error = payload.get('error') if isinstance(payload, dict) else payload
+            task.future.set_exception(Exception(f"{self.name} generation failed: {error}"))
+            return
+        if elapsed >= self.timeout:
+            task.future.set_exception(Exception(f"{self.name} generation timeout"))
+            return
+
+        if state != task.state:
+            task.state = state
+            self.state_changes += 1
+
+        if task.on_update:
+            try:
+                await task.on_update(state, elapsed)
+            except Exception as e:
+                logger.error(f"{self.name} progress callback error for {task.task_id}: {e}")
+
+        task.due_at = time.monotonic() + self._interval_for(task)
+        self._push(task)
+
+
+# ==================== VEO 3 GENERATION ====================
+
+async def fetch_veo_operation(operation_name: str):
+    """Fetch a Veo 3 generate-videos operation for the shared poller"""
+    from google.genai import types
+
+    async with io_slot():
+        operation = await providers.genai().aio.operations.get(types.GenerateVideosOperation(name=operation_name))
+
+    if not operation.done:
+        return 'RUNNING', operation
+    if operation.error:
+        return 'FAILED', {'error': operation.error.get('message', operation.error)}
+    return 'SUCCEEDED', operation
+
+
+veo_poller = TaskPoller(
+    'Veo 3',
+    fetch_veo_operation,
+    intervals={'RUNNING': (VEO_POLL_MIN, VEO_POLL_MAX)},
+    success_states={'SUCCEEDED'},
+    failure_states={'FAILED'},
+    timeout=VEO_OPERATION_TIMEOUT
+)
+
 
-            await update_progress(job_id, websocket_id, 35, "processing", "Generating scene layout...")
-            await asyncio.sleep(1.5)
+async def generate_veo3_video(job_id: str, request: UnifiedGenerateRequest, reference_images: List[str],
+                              metadata: Dict, provider_task_id: Optional[str] = None):
+    """Generate video with Veo 3, tracking the provider's long-running operation"""
+    from google.genai import types
 
-            await update_progress(job_id, websocket_id, 45, "processing", "Creating initial frames...")
-            await asyncio.sleep(2)
+    try:
+        websocket_id = request.websocket_id
 
-            await update_progress(job_id, websocket_id, 55, "processing", "Building motion dynamics...")
-            await asyncio.sleep(2)
+        # Build enhanced prompt with VFX
+        final_prompt = request.prompt
+        if request.vfx_template:
+            normalized_vfx = normalize_vfx_id(request.vfx_template)
+            if normalized_vfx and normalized_vfx in VFX_TEMPLATES:
+                vfx = VFX_TEMPLATES[normalized_vfx]
+                final_prompt = f"{final_prompt}. {vfx['motion']}"
+        elif request.camera_movement:
+            final_prompt = f"{final_prompt}. Camera: {request.camera_movement}"
 
-            await update_progress(job_id, websocket_id, 65, "processing", "Applying camera movements...")
-            await asyncio.sleep(2)
+        # Add technical specs
+        final_prompt = f"Duration: {request.duration}s. Aspect: {request.aspect_ratio}. {final_prompt}"
 
-            await update_progress(job_id, websocket_id, 75, "processing", "Rendering final video...")
-            await asyncio.sleep(3)
+        if provider_task_id:
+            # Submitted before a worker restart - keep tracking the same operation
+            operation_name = provider_task_id
+            await update_progress(job_id, websocket_id, 20, "processing", "Resuming Veo 3 generation...")
+        else:
+            await update_progress(job_id, websocket_id, 10, "processing", "Submitting to Veo 3...")
+
+            # Image-to-video starts from the first reference image
+            image = None
+            if reference_images:
+                raw, content_type = await reference_store.load(reference_images[0])
+                image = types.Image(image_bytes=raw, mime_type=content_type)
+
+            async with io_slot():
+                operation = await providers.genai().aio.models.generate_videos(
+                    model=VEO3_MODEL_ID,
+                    prompt=final_prompt,
+                    image=image,
+                    config=types.GenerateVideosConfig(
+                        aspect_ratio=request.aspect_ratio,
+                        number_of_videos=1,
+                        duration_seconds=metadata['duration']
+                    )
+                )
+            operation_name = operation.name
+            await run_blocking(job_queue.set_provider_task, job_id, operation_name)
 
-            await update_progress(job_id, websocket_id, 85, "processing", "Post-processing...")
-            await asyncio.sleep(2)
+            await update_progress(job_id, websocket_id, 20, "processing", "Generation started, monitoring progress...")
 
-        # Finalize
-        await update_progress(job_id, websocket_id, 90, "processing", "Encoding video...")
-        await asyncio.sleep(1)
+        async def on_veo_update(operation_state: str, elapsed: float):
+            # Veo reports no percentage - advance with elapsed time up to the finalizing step
+            await update_progress(job_id, websocket_id, min(20 + int(elapsed / 2), 89), "processing", "Generating video...")
 
-        await update_progress(job_id, websocket_id, 95, "processing", "Uploading to storage...")
+        # Wait on the shared poller instead of polling from this job
+        operation = await veo_poller.watch(operation_name, on_veo_update, state='RUNNING')
+
+        response = operation.response
+        if not response or not response.generated_videos:
+            reasons = '; '.join(response.rai_media_filtered_reasons or []) if response else ''
+            raise Exception(f"Veo 3 returned no video{': ' + reasons if reasons else ''}")
+        video = response.generated_videos[0].video
+
+        await update_progress(job_id, websocket_id, 90, "processing", "Saving to storage...")
 
-        # TODO: Get actual video URL from Veo 3 response
         video_key = f"{request.client.lower()}/generated-videos/{job_id}/output.mp4"
-        video_url = f"https://{VIDEO_OUTPUT_BUCKET}.s3.amazonaws.com/{video_key}"
+        if video.video_bytes:
+            await run_blocking(
+                s3_client.put_object,
+                Bucket=VIDEO_OUTPUT_BUCKET,
+                Key=video_key,
+                Body=video.video_bytes,
+                ContentType=video.mime_type or 'video/mp4'
+            )
+            metadata['ingest'] = {'bytes': len(video.video_bytes)}
+        else:
+            # Gemini file URIs need the API key to download
+            metadata['ingest'] = await output_ingestor.ingest(
+                video.uri, VIDEO_OUTPUT_BUCKET, video_key, video.mime_type or 'video/mp4',
+                headers={'x-goog-api-key': GEMINI_API_KEY}
+            )
+        video_url = presigned_urls.get(VIDEO_OUTPUT_BUCKET, video_key)
 
         # Update metadata
         metadata['status'] = 'completed'
@@ -801,28 +3420,10 @@ async def generate_veo3_video(job_id: str, request: UnifiedGenerateRequest, refe
         metadata['video_key'] = video_key
         metadata['completed_at'] = datetime.now().isoformat()
         metadata['final_prompt'] = final_prompt
-
-        # Save to S3
-        try:
-            s3_client.put_object(
-                Bucket=VIDEO_OUTPUT_BUCKET,
-                Key=f"{request.client.lower()}/generated-videos/{job_id}/metadata.json",
-                Body=json.dumps(metadata, indent=2),
-                ContentType='application/json'
-            )
-        except Exception as e:
-            logger.error(f"Error saving final metadata: {e}")
+        metadata['veo_operation'] = operation_name
 
         # Store in memory
-        generation_progress[job_id] = {
-            "job_id": job_id,
-            "status": "completed",
-            "progress": 100,
-            "video_url": video_url,
-            "video_key": video_key,
-            "metadata": metadata,
-            "timestamp": datetime.now().isoformat()
-        }
+        job_store.complete(job_id, metadata, video_url=video_url, video_key=video_key)
 
         await update_progress(job_id, websocket_id, 100, "completed", "Video generation complete!")
 
@@ -835,142 +3436,162 @@ async def generate_veo3_video(job_id: str, request: UnifiedGenerateRequest, refe
         metadata['error'] = str(e)
         metadata['failed_at'] = datetime.now().isoformat()
 
-        generation_progress[job_id] = {
-            "job_id": job_id,
-            "status": "failed",
-            "progress": 0,
-            "error": str(e),
-            "timestamp": datetime.now().isoformat()
-        }
+        job_store.fail(job_id, str(e))
 
 
 # ==================== RUNWAY GENERATION ====================
 
+async def fetch_runway_task(task_id: str):
+    """Fetch a Runway task's status for the shared poller"""
+    async with io_slot():
+        response = await providers.runway().get(f'/tasks/{task_id}')
+
+    if response.status_code != 200:
+        raise Exception(f'Runway status error: {response.status_code}')
+
+    task_data = response.json()
+    return task_data.get('status'), task_data
+
+
+runway_poller = TaskPoller(
+    'Runway',
+    fetch_runway_task,
+    intervals={
+        'PENDING': (RUNWAY_POLL_PENDING_MIN, RUNWAY_POLL_PENDING_MAX),
+        'RUNNING': (RUNWAY_POLL_RUNNING_MIN, RUNWAY_POLL_RUNNING_MAX)
+    },
+    success_states={'SUCCEEDED'},
+    failure_states={'FAILED', 'CANCELLED'},
+    timeout=RUNWAY_TASK_TIMEOUT
+)
+
+
 async def generate_runway_video(job_id: str, request: UnifiedGenerateRequest, reference_images: List[str],
-                                metadata: Dict):
+                                metadata: Dict, provider_task_id: Optional[str] = None):
     """Generate video with Runway Gen-4"""
     try:
         websocket_id = request.websocket_id
 
-        await update_progress(job_id, websocket_id, 10, "processing", "Initializing Runway Gen-4...")
-
-        headers = {
-            'Authorization': f'Bearer {RUNWAY_API_KEY}',
-            'X-Runway-Version': RUNWAY_API_VERSION,
-            'Content-Type': 'application/json'
-        }
-
-        # Build Runway prompt
-        runway_prompt = request.prompt
-        if request.vfx_template:
-            runway_prompt = compose_prompt_with_vfx(runway_prompt, request.vfx_template, "runway")
+        if provider_task_id:
+            # Submitted before a worker restart - pick the task back up instead of paying for it twice
+            task_id = provider_task_id
+            await update_progress(job_id, websocket_id, 50, "processing", "Resuming Runway task...")
+        else:
+            await update_progress(job_id, websocket_id, 10, "processing", "Initializing Runway Gen-4...")
 
-        await update_progress(job_id, websocket_id, 20, "processing", "Preparing generation request...")
+            # Build Runway prompt
+            runway_prompt = request.prompt
+            if request.vfx_template:
+                runway_prompt = compose_prompt_with_vfx(runway_prompt, request.vfx_template, "runway")
 
-        # Prepare request body
-        if reference_images and len(reference_images) > 0:
-            # Image-to-video
-            await update_progress(job_id, websocket_id, 30, "processing", "Processing reference image...")
+            await update_progress(job_id, websocket_id, 20, "processing", "Preparing generation request...")
 
-            # TODO: Upload base64 to Runway or convert
-            request_body = {
-                "model": "gen4_turbo",
-                "promptText": runway_prompt,
-                "duration": request.duration,
-                "watermark": False
-            }
-        else:
-            # Text-to-video
+            # Prepare request body
             request_body = {
                 "model": "gen4_turbo",
                 "promptText": runway_prompt,
                 "duration": request.duration,
                 "watermark": False
             }
+            endpoint = '/text_to_video'
+            if reference_images and len(reference_images) > 0:
+                # Image-to-video - Runway fetches the stored reference through a presigned URL
+                await update_progress(job_id, websocket_id, 30, "processing", "Processing reference image...")
+                request_body["promptImage"] = reference_store.presigned_url(reference_images[0])
+                endpoint = '/image_to_video'
+
+            await update_progress(job_id, websocket_id, 40, "processing", "Submitting to Runway...")
+
+            # Start generation
+            async with io_slot():
+                response = await providers.runway().post(
+                    endpoint,
+                    json=request_body,
+                    timeout=60
+                )
 
-        await update_progress(job_id, websocket_id, 40, "processing", "Submitting to Runway...")
-
-        # Start generation
-        response = requests.post(
-            f'{RUNWAY_API_BASE}/text_to_video',
-            headers=headers,
-            json=request_body,
-            timeout=60
-        )
-
-        if response.status_code not in (200, 201):
-            raise Exception(f'Runway API error: {response.status_code} - {response.text}')
-
-        data = response.json()
-        task_id = data.get('id')
-
-        await update_progress(job_id, websocket_id, 50, "processing", "Generation started, monitoring progress...")
-
-        # Poll for completion
-        max_attempts = 60
-        for attempt in range(max_attempts):
-            await asyncio.sleep(5)
+            if response.status_code not in (200, 201):
+                raise Exception(f'Runway API error: {response.status_code} - {response.text}')
 
-            status_response = requests.get(
-                f'{RUNWAY_API_BASE}/tasks/{task_id}',
-                headers=headers
-            )
+            data = response.json()
+            task_id = data.get('id')
+            await run_blocking(job_queue.set_provider_task, job_id, task_id)
 
-            if status_response.status_code == 200:
-                task_data = status_response.json()
-                task_status = task_data.get('status')
+            await update_progress(job_id, websocket_id, 50, "processing", "Generation started, monitoring progress...")
 
-                # Update progress based on Runway status
-                if task_status == 'PENDING':
-                    progress = 50 + (attempt * 0.5)
-                    await update_progress(job_id, websocket_id, int(progress), "processing", "Runway processing...")
-                elif task_status == 'RUNNING':
-                    progress = 60 + (attempt * 0.7)
-                    await update_progress(job_id, websocket_id, int(progress), "processing", "Generating video...")
-                elif task_status == 'SUCCEEDED':
-                    await update_progress(job_id, websocket_id, 90, "processing", "Finalizing...")
+        async def on_runway_update(task_status: str, elapsed: float):
+            # Same progress curve as the old 5s loop, driven by elapsed time instead of attempt count
+            attempt = elapsed / 5
+            if task_status == 'RUNNING':
+                progress = 60 + (attempt * 0.7)
+                await update_progress(job_id, websocket_id, min(int(progress), 89), "processing", "Generating video...")
+            else:
+                progress = 50 + (attempt * 0.5)
+                await update_progress(job_id, websocket_id, min(int(progress), 89), "processing", "Runway processing...")
 
-                    # Get video URL
-                    video_url = task_data.get('output', {}).get('url')
+        # Wait on the shared poller instead of polling from this job
+        task_data = await runway_poller.watch(task_id, on_runway_update, state='PENDING')
 
-                    # Update metadata
-                    metadata['status'] = 'completed'
-                    metadata['video_url'] = video_url
-                    metadata['runway_task_id'] = task_id
+        await update_progress(job_id, websocket_id, 90, "processing", "Finalizing...")
 
-                    generation_progress[job_id] = {
-                        "job_id": job_id,
-                        "status": "completed",
-                        "progress": 100,
-                        "video_url": video_url,
-                        "metadata": metadata
-                    }
+        # Get video URL - Runway returns a list of output URLs
+        output = task_data.get('output')
+        if isinstance(output, list):
+            runway_url = output[0] if output else None
+        else:
+            runway_url = (output or {}).get('url')
+
+        metadata['runway_output_url'] = runway_url
+        metadata['runway_task_id'] = task_id
+
+        # Copy the output out of Runway's temporary storage - its URL expires, so the job fails without a copy
+        video_url = runway_url
+        video_key = None
+        if runway_url:
+            await update_progress(job_id, websocket_id, 95, "processing", "Saving to storage...")
+            video_key = f"{request.client.lower()}/generated-videos/{job_id}/output.mp4"
+            for attempt in range(1, INGEST_ATTEMPTS + 1):
+                try:
+                    metadata['ingest'] = await output_ingestor.ingest(runway_url, VIDEO_OUTPUT_BUCKET, video_key, 'video/mp4')
+                    break
+                except Exception as e:
+                    logger.error(f"Runway output ingestion error (attempt {attempt}/{INGEST_ATTEMPTS}): {e}")
+                    if attempt == INGEST_ATTEMPTS:
+                        metadata['ingest_error'] = str(e)
+                        raise Exception(f'Could not save Runway output: {e}')
+                    await asyncio.sleep(INGEST_RETRY_DELAY * 2 ** (attempt - 1))
+            video_url = presigned_urls.get(VIDEO_OUTPUT_BUCKET, video_key)
 
-                    await update_progress(job_id, websocket_id, 100, "completed", "Runway generation complete!")
-                    return
+        # Update metadata
+        metadata['status'] = 'completed'
+        metadata['video_url'] = video_url
+        metadata['video_key'] = video_key
 
-                elif task_status == 'FAILED':
-                    raise Exception(f"Runway generation failed: {task_data.get('error')}")
+        job_store.complete(job_id, metadata, video_url=video_url, video_key=video_key)
 
-        raise Exception("Runway generation timeout")
+        await update_progress(job_id, websocket_id, 100, "completed", "Runway generation complete!")
 
     except Exception as e:
         logger.error(f"Runway generation error: {e}")
         await update_progress(job_id, request.websocket_id, 0, "failed", str(e))
 
+        metadata['status'] = 'failed'
+        metadata['error'] = str(e)
+        metadata['failed_at'] = datetime.now().isoformat()
+
+        job_store.fail(job_id, str(e))
+
 
 # ==================== DALL-E 3 GENERATION ====================
 
 async def generate_dalle3_image(job_id: str, request: UnifiedGenerateRequest, metadata: Dict):
     """Generate image with DALL-E 3"""
     try:
-        import openai
-
         websocket_id = request.websocket_id
 
         await update_progress(job_id, websocket_id, 10, "processing", "Initializing DALL-E 3...")
 
-        client = openai.OpenAI(api_key=OPENAI_API_KEY)
+        client = providers.openai()
 
         await update_progress(job_id, websocket_id, 30, "processing", "Preparing image prompt...")
 
@@ -983,51 +3604,36 @@ async def generate_dalle3_image(job_id: str, request: UnifiedGenerateRequest, me
 
         await update_progress(job_id, websocket_id, 50, "processing", "Generating image...")
 
-        response = client.images.generate(
-            model="dall-e-3",
-            prompt=request.prompt,
-            size=size,
-            quality="hd" if request.quality == "high" else "standard",
-            n=1
-        )
+        async with io_slot():
+            response = await client.images.generate(
+                model="dall-e-3",
+                prompt=request.prompt,
+                size=size,
+                quality="hd" if request.quality == "high" else "standard",
+                n=1
+            )
 
         await update_progress(job_id, websocket_id, 80, "processing", "Processing result...")
 
         image_url = response.data[0].url
         revised_prompt = response.data[0].revised_prompt
 
-        # Download and save to S3
-        image_response = requests.get(image_url)
+        # Stream the result into S3
         image_key = f"{request.client.lower()}/generated-images/{job_id}/output.png"
 
         await update_progress(job_id, websocket_id, 90, "processing", "Saving to storage...")
 
-        s3_client.put_object(
-            Bucket=IMAGE_OUTPUT_BUCKET,
-            Key=image_key,
-            Body=image_response.content,
-            ContentType='image/png'
-        )
+        metadata['ingest'] = await output_ingestor.ingest(image_url, IMAGE_OUTPUT_BUCKET, image_key, 'image/png')
 
         # Generate presigned URL
-        presigned_url = s3_client.generate_presigned_url(
-            'get_object',
-            Params={'Bucket': IMAGE_OUTPUT_BUCKET, 'Key': image_key},
-            ExpiresIn=3600
-        )
+        presigned_url = presigned_urls.get(IMAGE_OUTPUT_BUCKET, image_key)
 
         # Update metadata
         metadata['status'] = 'completed'
         metadata['image_urls'] = [{"url": presigned_url, "key": image_key}]
         metadata['revised_prompt'] = revised_prompt
 
-        generation_progress[job_id] = {
-            "job_id": job_id,
-            "status": "completed",
-            "progress": 100,
-            "image_urls": [{"url": presigned_url, "key": image_key}],
-            "metadata": metadata
-        }
+        job_store.complete(job_id, metadata, image_urls=[{"url": presigned_url, "key": image_key}])
 
         await update_progress(job_id, websocket_id, 100, "completed", "Image generation complete!")
 
@@ -1041,13 +3647,11 @@ async def generate_dalle3_image(job_id: str, request: UnifiedGenerateRequest, me
 async def generate_imagen4_image(job_id: str, request: UnifiedGenerateRequest, metadata: Dict):
     """Generate image with Imagen 4"""
     try:
-        from google import genai
-
         websocket_id = request.websocket_id
 
         await update_progress(job_id, websocket_id, 10, "processing", "Initializing Imagen 4...")
 
-        client = genai.Client(api_key=GEMINI_API_KEY)
+        client = providers.genai()
 
         await update_progress(job_id, websocket_id, 30, "processing", "Preparing photorealistic prompt...")
 
@@ -1068,13 +3672,7 @@ async def generate_imagen4_image(job_id: str, request: UnifiedGenerateRequest, m
         metadata['status'] = 'completed'
         metadata['image_urls'] = [{"url": image_url}]
 
-        generation_progress[job_id] = {
-            "job_id": job_id,
-            "status": "completed",
-            "progress": 100,
-            "image_urls": [{"url": image_url}],
-            "metadata": metadata
-        }
+        job_store.complete(job_id, metadata, image_urls=[{"url": image_url}])
 
         await update_progress(job_id, websocket_id, 100, "completed", "Imagen 4 generation complete!")
 
@@ -1085,33 +3683,120 @@ async def generate_imagen4_image(job_id: str, request: UnifiedGenerateRequest, m
 
 # ==================== STATUS CHECK ====================
 
+def status_etag(state: Dict[str, Any]) -> str:
+    # The live queue wait ticks on every poll and is not a change of state
+    stable = {k: v for k, v in state.items() if k != 'queue_wait_seconds'}
+    return f'"{hashlib.sha1(json_bytes(stable)).hexdigest()[:20]}"'
+
+
+async def await_status_change(request: StatusRequest, known: Optional[str], wait: float) -> tuple:
+    """Current (state, etag), holding up to wait seconds while the etag still matches known"""
+    wait = min(max(wait, 0), MAX_STATUS_WAIT) if known else 0
+    deadline = time.monotonic() + wait
+
+    # Listen before the first read so a change in between still wakes this request
+    events = job_events.listen([request.job_id]) if wait else None
+    try:
+        while True:
+            state = await job_status(request)
+            etag = status_etag(state)
+            remaining = deadline - time.monotonic()
+            if etag != known or remaining <= 0 or state.get('status') in TERMINAL_STATUSES:
+                return state, etag
+            try:
+                await asyncio.wait_for(events.get(), timeout=remaining)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        if events is not None:
+            job_events.unlisten([request.job_id], events)
+
+
+def status_response(state: Dict[str, Any], etag: str) -> Response:
+    return Response(json_bytes({**state, 'version': etag}), media_type='application/json',
+                    headers={'ETag': etag, 'Cache-Control': 'no-cache'})
+
+
+@app.get("/api/check_unified_status")
+async def check_unified_status_conditional(job_id: str, type: str = "video", wait: float = 0,
+                                           if_none_match: Optional[str] = Header(None)):
+    """Conditional status check - 304 when If-None-Match still matches the job's ETag
+
+    With wait > 0 the request is held until the job's state changes or wait seconds pass.
+    """
+    known = next((tag.strip().removeprefix('W/') for tag in (if_none_match or '').split(',') if tag.strip()), None)
+    state, etag = await await_status_change(StatusRequest(job_id=job_id, type=type), known, wait)
+    if etag == known:
+        return Response(status_code=304, headers={'ETag': etag, 'Cache-Control': 'no-cache'})
+    return status_response(state, etag)
+
+
 @app.post("/api/check_unified_status")
 async def check_unified_status(request: StatusRequest):
-    """Check status of unified generation"""
+    """Check status of unified generation
+
+    Always returns the full status, with its ETag as version. Sending version back
+    with wait > 0 holds the request until the job's state changes or wait seconds
+    pass. Use GET with If-None-Match for 304 responses.
+    """
+    state, etag = await await_status_change(request, request.version, request.wait)
+    return status_response(state, etag)
+
+
+async def job_status(request: StatusRequest) -> Dict[str, Any]:
+    """Current status of a job from the freshest source that knows it"""
     try:
         job_id = request.job_id
 
         # Check in-memory first
-        if job_id in generation_progress:
-            return generation_progress[job_id]
+        job_state = job_store.get(job_id)
+        if job_state is not None and job_state['status'] in TERMINAL_STATUSES:
+            return job_state
+
+        # Queued or running jobs - the queue row is current even when another process runs the job
+        queued = await run_blocking(job_queue.get, job_id)
+        if queued is not None and queued['queue_state'] == 'finalizing':
+            # The row holds the terminal result while S3 may still have an older state
+            return queued
+        if queued is not None and queued['queue_state'] in ('pending', 'claimed'):
+            if job_state is None:
+                return queued
+            if datetime.fromisoformat(queued['timestamp']) > datetime.fromisoformat(job_state['timestamp']):
+                # Another process has reported newer progress than this one holds
+                job_state.update(queued)
+            else:
+                job_state.update((k, v) for k, v in queued.items() if k.startswith('queue_') or k == 'seq')
+            job_state.update(scheduler.queue_info(job_id) or {})
+            return job_state
+        if job_state is not None and queued is None:
+            return job_state
+
+        # Progress published by a process on another node
+        shared = await progress_bus.get_state(job_id)
+        if shared is not None and shared['status'] not in TERMINAL_STATUSES:
+            return shared
 
         # Check S3 for metadata
         output_bucket = VIDEO_OUTPUT_BUCKET if request.type == "video" else IMAGE_OUTPUT_BUCKET
 
-        # Try different client folders
         metadata = None
-        client_found = None
-        for client in ['dfsa', 'atlas', 'yourbud', 'generic']:
+        location = await run_blocking(job_index.get, job_id)
+        if location:
+            # Indexed job - a single read at its recorded location
             try:
-                response = s3_client.get_object(
-                    Bucket=output_bucket,
-                    Key=f"{client}/generated-{request.type}s/{job_id}/metadata.json"
-                )
-                metadata = json.loads(response['Body'].read())
-                client_found = client
-                break
+                metadata = await run_blocking(read_s3_json, location['bucket'], location['key'])
             except s3_client.exceptions.NoSuchKey:
-                continue
+                pass
+        else:
+            # Jobs created before the index existed - try the known client folders and backfill
+            for client in ['dfsa', 'atlas', 'yourbud', 'generic']:
+                key = f"{client}/generated-{request.type}s/{job_id}/metadata.json"
+                try:
+                    metadata = await run_blocking(read_s3_json, output_bucket, key)
+                    await run_blocking(job_index.put, job_id, output_bucket, key, client, request.type)
+                    break
+                except s3_client.exceptions.NoSuchKey:
+                    continue
 
         if not metadata:
             raise HTTPException(status_code=404, detail=f'Job not found: {job_id}')
@@ -1130,121 +3815,1022 @@ async def check_unified_status(request: StatusRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ==================== JOB EVENT STREAM ====================
+
+def job_event_id(data: Dict) -> int:
+    """The event's per-job sequence number, assigned by the job's queue row so every process agrees on it"""
+    return data.get('seq', 0)
+
+
+def parse_event_positions(value: Optional[str]) -> Dict[str, int]:
+    """Per-job positions from a Last-Event-ID of the form job_id:seq,job_id:seq"""
+    positions = {}
+    for position in (value or '').split(','):
+        if position:
+            job_id, _, seq = position.rpartition(':')
+            if not job_id:
+                raise ValueError(position)
+            positions[job_id] = int(seq)
+    return positions
+
+
+def format_event_positions(positions: Dict[str, int]) -> str:
+    return ','.join(f'{job_id}:{seq}' for job_id, seq in positions.items())
+
+
+def status_event(state: Dict[str, Any]) -> Dict[str, Any]:
+    """A job_status result in the shape of a progress event"""
+    metadata = state.get('metadata') or {}
+    timestamp = (state.get('timestamp') or metadata.get('completed_at') or metadata.get('failed_at')
+                 or metadata.get('created_at') or datetime.now().isoformat())
+    return {
+        'job_id': state['job_id'],
+        'progress': state.get('progress', 0),
+        'status': state['status'],
+        'message': state.get('message') or metadata.get('error') or '',
+        'timestamp': timestamp,
+        'seq': state.get('seq', 0)
+    }
+
+
+class JobEventLog:
+    """Recent progress events per job for SSE replay, fed from the progress bus"""
+
+    def __init__(self, buffer_size: int, max_jobs: int):
+        self.buffer_size = buffer_size
+        self.max_jobs = max_jobs
+        self._events: OrderedDict = OrderedDict()  # job_id -> deque of (event_id, data)
+        self._listeners: Dict[str, set] = {}  # job_id -> queues of open streams
+        self.recorded = 0
+        self.replayed = 0
+
+    async def record(self, websocket_id: Optional[str], data: Dict):
+        job_id = data.get('job_id')
+        if not job_id or 'progress' not in data or 'timestamp' not in data:
+            return
+
+        events = self._events.get(job_id)
+        if 'seq' not in data:
+            # Job without a queue row - number its events in this process
+            data = {**data, 'seq': events[-1][0] + 1 if events else 1}
+        event = (job_event_id(data), data)
+        if events is None:
+            events = self._events[job_id] = deque(maxlen=self.buffer_size)
+            while len(self._events) > self.max_jobs:
+                self._events.popitem(last=False)
+        else:
+            self._events.move_to_end(job_id)
+        events.append(event)
+        self.recorded += 1
+
+        for queue in self._listeners.get(job_id, ()):
+            if queue.full():
+                queue.get_nowait()  # Drop the oldest; the stream catches up from the newest state
+            queue.put_nowait(event)
+
+    def listen(self, job_ids: List[str]) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.buffer_size * len(job_ids))
+        for job_id in job_ids:
+            self._listeners.setdefault(job_id, set()).add(queue)
+        return queue
+
+    def unlisten(self, job_ids: List[str], queue: asyncio.Queue):
+        for job_id in job_ids:
+            listeners = self._listeners.get(job_id)
+            if listeners is not None:
+                listeners.discard(queue)
+                if not listeners:
+                    del self._listeners[job_id]
+
+    def since(self, job_id: str, last_event_id: Optional[int]) -> List[tuple]:
+        """Buffered events after last_event_id, or just the latest one for a fresh stream"""
+        events = self._events.get(job_id)
+        if not events:
+            return []
+        if last_event_id is None:
+            return [events[-1]]
+        replay = [event for event in events if event[0] > last_event_id]
+        self.replayed += len(replay)
+        return replay
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'jobs': len(self._events),
+            'streams': len({id(q) for listeners in self._listeners.values() for q in listeners}),
+            'recorded': self.recorded,
+            'replayed': self.replayed
+        }
+
+
+job_events = JobEventLog(JOB_EVENT_BUFFER_SIZE, JOB_EVENT_LOG_MAX_JOBS)
+progress_bus.subscribe(job_events.record)
+
+
+@app.get("/api/job_events")
+async def stream_job_events(job_ids: str, type: str = "video", last_event_id: Optional[str] = None,
+                            last_event_id_header: Optional[str] = Header(None, alias='Last-Event-ID')):
+    """Stream progress for one or more comma-separated job IDs over Server-Sent Events
+
+    Every event ID carries the stream's position in each job (job_id:seq,...), so
+    a reconnect resumes every job from its own ring buffer. Unknown jobs are
+    rejected with 404 up front, and the stream ends once every job has completed
+    or failed.
+    """
+    ids = list(dict.fromkeys(job_id.strip() for job_id in job_ids.split(',') if job_id.strip()))
+    if not ids:
+        raise HTTPException(status_code=400, detail="job_ids is required")
+    if len(ids) > MAX_SSE_JOBS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SSE_JOBS} jobs per stream")
+
+    try:
+        resume_from = parse_event_positions(last_event_id_header or last_event_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+
+    # Raises 404 for a job no source knows, before any of the stream is sent
+    snapshots = [
+        status_event(state)
+        for state in await asyncio.gather(*(job_status(StatusRequest(job_id=job_id, type=type)) for job_id in ids))
+    ]
+
+    async def events():
+        # Listen before replaying so nothing published in between is missed
+        queue = job_events.listen(ids)
+        try:
+            yield "retry: 3000\n\n".encode('utf-8')
+
+            last_sent = {job_id: resume_from[job_id] for job_id in ids if job_id in resume_from}
+            pending = set(ids)
+
+            def render(event: tuple):
+                event_id, data = event
+                if event_id <= last_sent.get(data['job_id'], -1):
+                    return None
+                last_sent[data['job_id']] = event_id
+                if data['status'] in TERMINAL_STATUSES:
+                    pending.discard(data['job_id'])
+                return sse_event('progress', data, format_event_positions(last_sent))
+
+            for job_id, snapshot in zip(ids, snapshots):
+                resumed = resume_from.get(job_id)
+                replay = job_events.since(job_id, resumed)
+                if not replay and (resumed is None or snapshot['status'] in TERMINAL_STATUSES):
+                    # Nothing buffered here - start from the job's current state
+                    replay = [(job_event_id(snapshot), snapshot)]
+                for event in replay:
+                    chunk = render(event)
+                    if chunk:
+                        yield chunk
+                if snapshot['status'] in TERMINAL_STATUSES:
+                    # Already over, even if this client saw the final event before reconnecting
+                    pending.discard(job_id)
+
+            while pending:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                chunk = render(event)
+                if chunk:
+                    yield chunk
+
+            yield sse_event('end', {'job_ids': ids})
+        finally:
+            job_events.unlisten(ids, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 # ==================== VISUAL ASSETS ====================
 
+CLIENT_ASSET_FOLDERS = {
+    'DFSA': 'client-dfsa',
+    'Atlas': 'client-atlas',
+    'YourBud': 'client-yourbuddy'
+}
+
+VISUAL_ASSET_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif')
+
+
+def client_asset_prefix(client: str) -> str:
+    return f"{CLIENT_ASSET_FOLDERS.get(client, 'client-dfsa')}/"
+
+
+def is_visual_asset_key(key: str, prefix: str) -> bool:
+    if key.endswith('/') or '/.DS_Store' in key or key == prefix:
+        return False
+    return key.lower().endswith(VISUAL_ASSET_EXTENSIONS)
+
+
+def build_asset_record(key: str, obj: Dict[str, Any]) -> Dict[str, Any]:
+    """Asset fields derived from an S3 listing entry (URLs are added per response)"""
+    last_modified = obj.get('LastModified')
+    return {
+        'filename': key.split('/')[-1],
+        'category': asset_category(key),
+        'key': key,
+        'size': obj.get('Size', 0),
+        'lastModified': last_modified.isoformat() if last_modified else None
+    }
+
+
+def asset_category(key: str) -> str:
+    lowered = key.lower()
+    if 'hero' in lowered:
+        return 'product-hero'
+    elif 'lifestyle' in lowered:
+        return 'lifestyle'
+    elif 'enhanced' in lowered:
+        return 'enhanced'
+    return 'general'
+
+
+class PresignedUrlCache:
+    """Reuses presigned GET URLs until they are close to expiry"""
+
+    def __init__(self, expires_in: int, refresh_margin: int, max_entries: int = 100000):
+        self.expires_in = expires_in
+        self.refresh_margin = refresh_margin
+        self.max_entries = max_entries
+        self._urls: OrderedDict = OrderedDict()  # (bucket, key) -> (url, expires_at)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, bucket: str, key: str) -> str:
+        cached = self._urls.get((bucket, key))
+        if cached is not None and cached[1] - time.time() > self.refresh_margin:
+            self._urls.move_to_end((bucket, key))
+            self.hits += 1
+            return cached[0]
+
+        self.misses += 1
+        # Signing is local - no network round trip
+        url = s3_client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': bucket, 'Key': key},
+            ExpiresIn=self.expires_in
+        )
+        self._urls[(bucket, key)] = (url, time.time() + self.expires_in)
+        self._urls.move_to_end((bucket, key))
+        while len(self._urls) > self.max_entries:
+            self._urls.popitem(last=False)
+        return url
+
+    def discard(self, bucket: str, key: str):
+        self._urls.pop((bucket, key), None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'size': len(self._urls), 'hits': self.hits, 'misses': self.misses}
+
+
+presigned_urls = PresignedUrlCache(PRESIGNED_URL_EXPIRY, PRESIGNED_URL_REFRESH_MARGIN)
+
+
+def with_asset_url(record: Dict[str, Any], asset_id: str, url: str) -> Dict[str, Any]:
+    asset = {'id': asset_id, 'url': url, 'thumbnail': url}
+    asset.update(record)
+    return asset
+
+
+class ClientCatalog:
+    """Cached listing of one client prefix"""
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self.entries: Dict[str, Dict[str, Any]] = {}  # key -> asset record without URLs
+        self.signatures: Dict[str, tuple] = {}  # key -> (etag, last_modified)
+        self.sorted_keys: List[str] = []
+        self.category_counts: Counter = Counter()
+        self.refreshed_at = 0.0
+        self.lock = asyncio.Lock()
+
+
+class VisualAssetCatalog:
+    """In-process catalog of client reference assets with incremental refresh"""
+
+    def __init__(self, bucket: str, ttl: float, list_concurrency: int):
+        self.bucket = bucket
+        self.ttl = ttl
+        self.list_concurrency = list_concurrency
+        self._clients: Dict[str, ClientCatalog] = {}
+        self.refreshes = 0
+        self.changed_keys = 0
+        self.removed_keys = 0
+
+    async def get(self, prefix: str, force_refresh: bool = False) -> ClientCatalog:
+        """Return the catalog for a prefix, refreshing it if older than the TTL"""
+        catalog = self._clients.get(prefix)
+        if catalog is None:
+            catalog = self._clients[prefix] = ClientCatalog(prefix)
+
+        if force_refresh or time.time() - catalog.refreshed_at > self.ttl:
+            async with catalog.lock:
+                # Another request may have refreshed while we waited
+                if force_refresh or time.time() - catalog.refreshed_at > self.ttl:
+                    await self._refresh(catalog)
+        return catalog
+
+    def peek(self, prefix: str) -> Optional[ClientCatalog]:
+        """Return the catalog only if it is loaded and fresh"""
+        catalog = self._clients.get(prefix)
+        if catalog is not None and time.time() - catalog.refreshed_at <= self.ttl:
+            return catalog
+        return None
+
+    def asset_with_url(self, catalog: ClientCatalog, key: str, index: int) -> Dict[str, Any]:
+        url = presigned_urls.get(self.bucket, key)
+        return with_asset_url(catalog.entries[key], f'asset_{index}', url)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'clients': len(self._clients),
+            'assets': sum(len(c.entries) for c in self._clients.values()),
+            'refreshes': self.refreshes,
+            'changed_keys': self.changed_keys,
+            'removed_keys': self.removed_keys
+        }
+
+    def _list(self, prefix: str, delimiter: Optional[str] = None) -> tuple:
+        """List objects and sub-prefixes under a prefix (blocking - run via run_blocking)"""
+        params = {'Bucket': self.bucket, 'Prefix': prefix, 'MaxKeys': 1000}
+        if delimiter:
+            params['Delimiter'] = delimiter
+
+        objects = []
+        sub_prefixes = []
+        paginator = s3_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(**params):
+            objects.extend(page.get('Contents', []))
+            sub_prefixes.extend(p['Prefix'] for p in page.get('CommonPrefixes', []))
+        return objects, sub_prefixes
+
+    async def _refresh(self, catalog: ClientCatalog):
+        # Top level first, then every sub-folder listed in parallel
+        objects, sub_prefixes = await run_blocking(self._list, catalog.prefix, '/')
+
+        semaphore = asyncio.Semaphore(self.list_concurrency)
+
+        async def list_sub_prefix(sub_prefix: str):
+            async with semaphore:
+                listed, _ = await run_blocking(self._list, sub_prefix)
+                return listed
+
+        for listed in await asyncio.gather(*(list_sub_prefix(p) for p in sub_prefixes)):
+            objects.extend(listed)
+
+        seen = set()
+        changed = 0
+        for obj in objects:
+            key = obj['Key']
+            if not is_visual_asset_key(key, catalog.prefix):
+                continue
+            seen.add(key)
+
+            last_modified = obj.get('LastModified')
+            signature = (obj.get('ETag'), last_modified)
+            if catalog.signatures.get(key) == signature:
+                continue
+
+            # New or changed object
+            changed += 1
+            if key in catalog.signatures:
+                presigned_urls.discard(self.bucket, key)
+            catalog.signatures[key] = signature
+            if key not in catalog.entries:
+                catalog.category_counts[asset_category(key)] += 1
+            catalog.entries[key] = build_asset_record(key, obj)
+
+        removed = [key for key in catalog.entries if key not in seen]
+        for key in removed:
+            category = catalog.entries.pop(key)['category']
+            catalog.category_counts[category] -= 1
+            if not catalog.category_counts[category]:
+                del catalog.category_counts[category]
+            del catalog.signatures[key]
+            presigned_urls.discard(self.bucket, key)
+
+        if changed or removed or len(catalog.sorted_keys) != len(catalog.entries):
+            catalog.sorted_keys = sorted(catalog.entries)
+
+        catalog.refreshed_at = time.time()
+        self.refreshes += 1
+        self.changed_keys += changed
+        self.removed_keys += len(removed)
+        logger.info(f'🗂️ Catalog refresh {catalog.prefix}: {changed} changed, {len(removed)} removed, '
+                    f'{len(catalog.entries)} total')
+
+
+asset_catalog = VisualAssetCatalog(VISUAL_ASSETS_BUCKET, ASSET_CATALOG_TTL, ASSET_LIST_CONCURRENCY)
+
+
 @app.post("/api/visual_assets")
 async def get_visual_assets(request: VisualAssetsRequest):
     """Fetch visual assets for reference"""
     try:
         logger.info(f'🎨 Loading {request.client} assets...')
-        assets = []
 
-        client_folders = {
-            'DFSA': 'client-dfsa',
-            'Atlas': 'client-atlas',
-            'YourBud': 'client-yourbuddy'
+        catalog = await asset_catalog.get(client_asset_prefix(request.client))
+        assets = [
+            asset_catalog.asset_with_url(catalog, key, idx)
+            for idx, key in enumerate(catalog.sorted_keys)
+        ]
+
+        logger.info(f'✅ Loaded {len(assets)} assets for {request.client}')
+
+        return {
+            'success': True,
+            'client': request.client,
+            'assets': assets,
+            'total': len(assets),
+            'categories': list(catalog.category_counts)
         }
 
-        folder_name = client_folders.get(request.client, 'client-dfsa')
-        prefix = f"{folder_name}/"
+    except Exception as e:
+        logger.error(f'💥 Error loading visual assets: {str(e)}')
+        raise HTTPException(status_code=500, detail=str(e))
 
-        paginator = s3_client.get_paginator('list_objects_v2')
-        pages = paginator.paginate(
-            Bucket=VISUAL_ASSETS_BUCKET,
-            Prefix=prefix,
-            MaxKeys=1000
-        )
 
-        asset_count = 0
-        for page in pages:
-            if 'Contents' in page:
-                for obj in page['Contents']:
-                    key = obj['Key']
-                    if key.endswith('/') or '/.DS_Store' in key or key == prefix:
-                        continue
+# ==================== PAGINATED VISUAL ASSETS ====================
 
-                    if not any(key.lower().endswith(ext) for ext in ['.jpg', '.jpeg', '.png', '.webp', '.gif']):
-                        continue
+MAX_ASSET_PAGE_SIZE = 1000
+
+
+def encode_cursor(key: str) -> str:
+    return base64.urlsafe_b64encode(key.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        # validate=True - the lenient decoder drops stray characters and would restart the listing silently
+        return base64.b64decode(cursor.encode('ascii'), altchars=b'-_', validate=True).decode('utf-8')
+    except Exception:
+        raise HTTPException(status_code=400, detail='Invalid cursor')
 
-                    try:
-                        url = s3_client.generate_presigned_url(
-                            'get_object',
-                            Params={'Bucket': VISUAL_ASSETS_BUCKET, 'Key': key},
-                            ExpiresIn=3600
-                        )
 
-                        filename = key.split('/')[-1]
-                        category = 'general'
-
-                        if 'hero' in key.lower():
-                            category = 'product-hero'
-                        elif 'lifestyle' in key.lower():
-                            category = 'lifestyle'
-                        elif 'enhanced' in key.lower():
-                            category = 'enhanced'
-
-                        assets.append({
-                            'id': f'asset_{asset_count}',
-                            'url': url,
-                            'thumbnail': url,
-                            'filename': filename,
-                            'category': category,
-                            'key': key,
-                            'size': obj.get('Size', 0),
-                            'lastModified': obj.get('LastModified').isoformat() if obj.get('LastModified') else None
-                        })
-
-                        asset_count += 1
+def asset_filter(category: Optional[str], extension: Optional[str]):
+    suffix = f".{extension.lower().lstrip('.')}" if extension else None
 
+    def matches(key: str) -> bool:
+        if suffix and not key.lower().endswith(suffix):
+            return False
+        return not category or asset_category(key) == category
+
+    return matches
+
+
+def list_asset_page(prefix: str, start_after: Optional[str], limit: int, matches) -> tuple:
+    """Read one page straight from S3 when the catalog is cold (blocking - run via run_blocking)
+
+    Returns (records, has_more), listing only as far as the page needs.
+    """
+    records = []
+    params = {'Bucket': VISUAL_ASSETS_BUCKET, 'Prefix': prefix, 'MaxKeys': min(1000, limit + 1)}
+    if start_after:
+        params['StartAfter'] = start_after
+
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(**params):
+        for obj in page.get('Contents', []):
+            key = obj['Key']
+            if not is_visual_asset_key(key, prefix) or not matches(key):
+                continue
+            if len(records) == limit:
+                return records, True
+            records.append(build_asset_record(key, obj))
+    return records, False
+
+
+def json_bytes(data: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+
+async def gzip_stream(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+@app.post("/api/visual_assets/page")
+async def get_visual_assets_page(request: VisualAssetsPageRequest, http_request: Request):
+    """Fetch one page of visual assets, streamed and optionally gzip-compressed"""
+    try:
+        prefix = client_asset_prefix(request.client)
+        page_size = max(1, min(MAX_ASSET_PAGE_SIZE, request.page_size))
+        start_after = decode_cursor(request.cursor) if request.cursor else None
+        matches = asset_filter(request.category, request.extension)
+
+        catalog = asset_catalog.peek(prefix)
+        categories = None
+        if catalog is not None:
+            # Warm catalog - seek to the cursor in the sorted key list
+            records = []
+            has_more = False
+            start = bisect.bisect_right(catalog.sorted_keys, start_after) if start_after else 0
+            for key in itertools.islice(catalog.sorted_keys, start, None):
+                if not matches(key):
+                    continue
+                if len(records) == page_size:
+                    has_more = True
+                    break
+                records.append(catalog.entries[key])
+            categories = list(catalog.category_counts)
+        else:
+            records, has_more = await run_blocking(list_asset_page, prefix, start_after, page_size, matches)
+
+        next_cursor = encode_cursor(records[-1]['key']) if has_more and records else None
+
+        async def body():
+            yield b'{"success":true,"client":' + json_bytes(request.client) + b',"assets":['
+            for idx, record in enumerate(records):
+                asset = with_asset_url(record, record['key'], presigned_urls.get(VISUAL_ASSETS_BUCKET, record['key']))
+                yield (b',' if idx else b'') + json_bytes(asset)
+            footer = {'count': len(records), 'next_cursor': next_cursor}
+            if categories is not None:
+                footer['categories'] = categories
+            yield b'],' + json_bytes(footer)[1:]
+
+        headers = {'Vary': 'Accept-Encoding'}
+        stream = body()
+        if 'gzip' in http_request.headers.get('accept-encoding', ''):
+            headers['Content-Encoding'] = 'gzip'
+            stream = gzip_stream(stream)
+
+        return StreamingResponse(stream, media_type='application/json', headers=headers)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f'💥 Error loading visual asset page: {str(e)}')
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# ==================== ASSET SIMILARITY ====================
+
+def perceptual_hash(data: bytes) -> int:
+    """64-bit difference hash of an image (blocking, CPU bound)"""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        # Let the JPEG decoder downscale while decoding instead of inflating the full image
+        image.draft('L', (64, 64))
+        pixels = image.convert('L').resize((9, 8), Image.LANCZOS).tobytes()  # One byte per grayscale pixel
+
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = (value << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+class BKTree:
+    """Burkhard-Keller tree over 64-bit hashes for Hamming-radius queries"""
+
+    def __init__(self):
+        self.root = None  # [hash, [items], {distance: child}]
+        self.size = 0
+
+    def add(self, value: int, item: str):
+        self.size += 1
+        if self.root is None:
+            self.root = [value, [item], {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming_distance(value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [item], {}]
+                return
+            node = child
+
+    def remove(self, value: int, item: str) -> bool:
+        """Drop an item; its node stays in place to keep routing the nodes below it"""
+        node = self.root
+        while node is not None:
+            distance = hamming_distance(value, node[0])
+            if distance == 0:
+                if item in node[1]:
+                    node[1].remove(item)
+                    self.size -= 1
+                    return True
+                return False
+            node = node[2].get(distance)
+        return False
+
+    def search(self, value: int, max_distance: int) -> List[tuple]:
+        """Return (distance, item) for every item within max_distance"""
+        results = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(value, node[0])
+            if distance <= max_distance:
+                results.extend((distance, item) for item in node[1])
+            # Triangle inequality - only children in [d - r, d + r] can match
+            for edge, child in node[2].items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    stack.append(child)
+        return results
+
+
+class AssetSimilarityIndex:
+    """Persistent perceptual-hash index per client prefix, hashed incrementally by ETag
+
+    Hashing runs in a background task per prefix and each hash goes straight into
+    the prefix's BK-tree, so queries never wait for downloads. A prefix without a
+    persisted index, or a key not hashed yet, reports as warming until it is.
+    """
+
+    def __init__(self, path: str, bucket: str, hash_concurrency: int):
+        self.bucket = bucket
+        self.hash_concurrency = hash_concurrency
+        self._lock = threading.Lock()
+        self._conn = open_state_db(path)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS asset_hashes ('
+            'prefix TEXT NOT NULL, key TEXT NOT NULL, etag TEXT, phash TEXT NOT NULL, '
+            'PRIMARY KEY (prefix, key))'
+        )
+        self._hashes: Dict[str, Dict[str, tuple]] = {}  # prefix -> key -> (etag, hash)
+        self._trees: Dict[str, BKTree] = {}
+        self._synced_at: Dict[str, float] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._warming: Dict[str, asyncio.Task] = {}
+        self._import_error: Optional[ImportError] = None
+        self.hashed = 0
+        self.hash_errors = 0
+
+    async def similar(self, prefix: str, key: str, max_distance: int, limit: int) -> Optional[List[tuple]]:
+        """Return (distance, key) pairs of the assets closest to key, nearest first, or None while warming"""
+        if self._import_error is not None:
+            raise self._import_error
+        catalog = await asset_catalog.get(prefix)
+        await self._load_prefix(prefix)
+        if self._synced_at.get(prefix, 0) < catalog.refreshed_at and prefix not in self._warming:
+            warming = asyncio.create_task(self._warm(prefix))
+            self._warming[prefix] = warming
+            warming.add_done_callback(lambda _: self._warming.pop(prefix, None))
+
+        entry = self._hashes[prefix].get(key)
+        if entry is None:
+            if key in catalog.signatures and (prefix in self._warming or not self._synced_at.get(prefix)):
+                return None
+            raise KeyError(key)
+        matches = self._trees[prefix].search(entry[1], max_distance)
+        matches = [m for m in matches if m[1] != key]
+        matches.sort()
+        return matches[:limit]
+
+    async def sync(self, prefix: str):
+        """Hash new or changed catalog keys and drop deleted ones"""
+        catalog = await asset_catalog.get(prefix)
+        await self._load_prefix(prefix)
+        async with self._locks[prefix]:
+            if self._synced_at.get(prefix, 0) >= catalog.refreshed_at:
+                return
+
+            known = self._hashes[prefix]
+            tree = self._trees[prefix]
+            stale = [key for key, signature in catalog.signatures.items()
+                     if key not in known or known[key][0] != signature[0]]
+            removed = [key for key in known if key not in catalog.signatures]
+            for key in removed:
+                tree.remove(known.pop(key)[1], key)
+
+            semaphore = asyncio.Semaphore(self.hash_concurrency)
+
+            async def hash_key(key: str):
+                async with semaphore:
+                    try:
+                        data = await run_blocking(self._download, key)
+                        # Decoding is CPU work - keep it off the loop too
+                        value = await asyncio.get_running_loop().run_in_executor(None, perceptual_hash, data)
+                    except ImportError:
+                        raise
                     except Exception as e:
-                        logger.error(f'Error processing asset {key}: {e}')
-                        continue
+                        self.hash_errors += 1
+                        logger.warning(f'Could not hash {key}: {e}')
+                        return None
+                    # Queryable as soon as it is hashed, not when the whole prefix is done
+                    etag = catalog.signatures[key][0]
+                    if key in known:
+                        tree.remove(known[key][1], key)
+                    known[key] = (etag, value)
+                    tree.add(value, key)
+                    self.hashed += 1
+                    return key, etag, value
+
+            hashed = [h for h in await asyncio.gather(*(hash_key(k) for k in stale)) if h]
+            if hashed or removed:
+                await run_blocking(self._save, prefix, hashed, removed)
+                logger.info(f'🔎 Similarity index {prefix}: {len(hashed)} hashed, {len(removed)} removed')
+
+            self._synced_at[prefix] = catalog.refreshed_at
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'prefixes': len(self._hashes),
+            'hashes': sum(len(h) for h in self._hashes.values()),
+            'warming': len(self._warming),
+            'hashed': self.hashed,
+            'hash_errors': self.hash_errors
+        }
+
+    async def _load_prefix(self, prefix: str):
+        """Build the prefix's tree from its persisted hashes the first time it is used"""
+        lock = self._locks.setdefault(prefix, asyncio.Lock())
+        if prefix in self._hashes:
+            return
+        async with lock:
+            if prefix not in self._hashes:
+                known = await run_blocking(self._load, prefix)
+                tree = BKTree()
+                for key, (_, value) in known.items():
+                    tree.add(value, key)
+                self._trees[prefix] = tree
+                self._hashes[prefix] = known
+
+    async def _warm(self, prefix: str):
+        try:
+            await self.sync(prefix)
+        except ImportError as e:
+            self._import_error = e
+            logger.error(f'⚠️ Image hashing requires Pillow: {e}')
+        except Exception as e:
+            logger.error(f'Similarity index warm-up error for {prefix}: {e}')
+
+    def _download(self, key: str) -> bytes:
+        return s3_client.get_object(Bucket=self.bucket, Key=key)['Body'].read()
+
+    def _load(self, prefix: str) -> Dict[str, tuple]:
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT key, etag, phash FROM asset_hashes WHERE prefix = ?', (prefix,)
+            ).fetchall()
+        return {key: (etag, int(phash, 16)) for key, etag, phash in rows}
+
+    def _save(self, prefix: str, hashed: List[tuple], removed: List[str]):
+        with self._lock:
+            self._conn.execute('BEGIN')
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO asset_hashes VALUES (?, ?, ?, ?)',
+                [(prefix, key, etag, f'{value:016x}') for key, etag, value in hashed]
+            )
+            self._conn.executemany(
+                'DELETE FROM asset_hashes WHERE prefix = ? AND key = ?',
+                [(prefix, key) for key in removed]
+            )
+            self._conn.execute('COMMIT')
 
-        logger.info(f'✅ Loaded {len(assets)} assets for {request.client}')
+
+similarity_index = AssetSimilarityIndex(STATE_DB_PATH, VISUAL_ASSETS_BUCKET, ASSET_HASH_CONCURRENCY)
+
+
+@app.post("/api/visual_assets/similar")
+async def get_similar_assets(request: SimilarAssetsRequest):
+    """Find visually similar assets in the client's folder"""
+    try:
+        prefix = client_asset_prefix(request.client)
+        try:
+            matches = await similarity_index.similar(
+                prefix, request.key, max(0, min(64, request.max_distance)), max(1, request.limit)
+            )
+        except KeyError:
+            raise HTTPException(status_code=404, detail=f'Asset not indexed: {request.key}')
+        except ImportError:
+            raise HTTPException(status_code=503, detail='Image hashing requires Pillow')
+        if matches is None:
+            # Still hashing in the background - the client retries shortly
+            return {
+                'success': False,
+                'status': 'warming',
+                'client': request.client,
+                'key': request.key,
+                'assets': [],
+                'total': 0
+            }
+
+        catalog = await asset_catalog.get(prefix)
+        assets = []
+        for distance, key in matches:
+            if key not in catalog.entries:
+                continue
+            asset = with_asset_url(catalog.entries[key], key, presigned_urls.get(VISUAL_ASSETS_BUCKET, key))
+            asset['distance'] = distance
+            assets.append(asset)
 
         return {
             'success': True,
             'client': request.client,
+            'key': request.key,
             'assets': assets,
-            'total': len(assets),
-            'categories': list(set(a['category'] for a in assets))
+            'total': len(assets)
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f'💥 Error loading visual assets: {str(e)}')
+        logger.error(f'💥 Error finding similar assets: {str(e)}')
         raise HTTPException(status_code=500, detail=str(e))
 
 
 # ==================== VIDEO HISTORY ====================
 
+HISTORY_SUMMARY_FIELDS = ('duration', 'quality', 'aspect_ratio', 'camera_movement', 'vfx_template', 'style_presets',
+                          'reference_images', 'reference_images_count', 'video_key', 'image_urls', 'error',
+                          'completed_at', 'failed_at')
+
+
+class HistoryIndex(ABC):
+    """Queryable index of generation jobs, newest first. Calls are blocking - run them via run_blocking."""
+
+    @abstractmethod
+    def record(self, metadata: Dict[str, Any]):
+        """Insert or update a job from its metadata"""
+
+    @abstractmethod
+    def query(self, client: Optional[str], job_type: Optional[str], model: Optional[str], status: Optional[str],
+              since: Optional[float], until: Optional[float], cursor: Optional[tuple], limit: int) -> List[Dict]:
+        """Jobs matching every given filter, ordered by (created_at, job_id) descending, after cursor"""
+
+
+class SQLiteHistoryIndex(HistoryIndex):
+    """History index in the local state database, with keyset pagination on (created_at, job_id)"""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = open_state_db(path)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS job_history ('
+            'job_id TEXT PRIMARY KEY, client TEXT NOT NULL, type TEXT NOT NULL, model TEXT NOT NULL, '
+            'status TEXT NOT NULL, created_at REAL NOT NULL, updated_at REAL NOT NULL, '
+            'prompt TEXT, summary TEXT NOT NULL)'
+        )
+        # One index per filter so any single filter plus the time ordering is a range scan
+        self._conn.execute('CREATE INDEX IF NOT EXISTS job_history_created ON job_history (created_at, job_id)')
+        for column in ('client', 'type', 'model', 'status'):
+            self._conn.execute(
+                f'CREATE INDEX IF NOT EXISTS job_history_{column} ON job_history ({column}, created_at, job_id)'
+            )
+
+    def record(self, metadata: Dict[str, Any]):
+        summary = {k: metadata[k] for k in HISTORY_SUMMARY_FIELDS if metadata.get(k) is not None}
+        if summary.get('image_urls'):
+            # Presigned URLs expire - keep only the keys and re-sign them when history is read
+            summary['image_urls'] = [
+                {'key': image['key']} if isinstance(image, dict) and image.get('key') else image
+                for image in summary['image_urls']
+            ]
+        created_at = datetime.fromisoformat(metadata['created_at']).timestamp()
+        # Versioned by the job's own timestamps, not by when this process got around to recording it
+        finished = metadata.get('completed_at') or metadata.get('failed_at')
+        updated_at = datetime.fromisoformat(finished).timestamp() if finished else created_at
+        with self._lock:
+            # A late creation record never overwrites a newer (e.g. terminal) one
+            self._conn.execute(
+                'INSERT INTO job_history VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT(job_id) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at, '
+                'summary = excluded.summary WHERE excluded.updated_at >= job_history.updated_at',
+                (metadata['job_id'], metadata['client'].lower(), metadata['type'], metadata['model'],
+                 metadata.get('status', 'processing'), created_at, updated_at,
+                 metadata.get('original_prompt'), json.dumps(summary, separators=(',', ':')))
+            )
+
+    def query(self, client: Optional[str], job_type: Optional[str], model: Optional[str], status: Optional[str],
+              since: Optional[float], until: Optional[float], cursor: Optional[tuple], limit: int) -> List[Dict]:
+        clauses, params = [], []
+        for column, value in (('client', client.lower() if client else None), ('type', job_type),
+                              ('model', model), ('status', status)):
+            if value:
+                clauses.append(f'{column} = ?')
+                params.append(value)
+        if since is not None:
+            clauses.append('created_at >= ?')
+            params.append(since)
+        if until is not None:
+            clauses.append('created_at < ?')
+            params.append(until)
+        if cursor is not None:
+            clauses.append('(created_at, job_id) < (?, ?)')
+            params.extend(cursor)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT job_id, client, type, model, status, created_at, updated_at, prompt, summary '
+                f'FROM job_history {where} ORDER BY created_at DESC, job_id DESC LIMIT ?',
+                (*params, limit)
+            ).fetchall()
+        return [
+            {
+                'job_id': row[0],
+                'client': row[1],
+                'type': row[2],
+                'model': row[3],
+                'status': row[4],
+                'created_at': row[5],
+                'updated_at': row[6],
+                'prompt': row[7],
+                **json.loads(row[8])
+            }
+            for row in rows
+        ]
+
+
+HISTORY_BACKENDS = {
+    'sqlite': lambda: SQLiteHistoryIndex(STATE_DB_PATH),
+}
+
+
+def create_history_index(backend: str) -> HistoryIndex:
+    """Pick the history index backend from HISTORY_INDEX_BACKEND"""
+    if backend not in HISTORY_BACKENDS:
+        logger.error(f"⚠️ Unknown HISTORY_INDEX_BACKEND: {backend} - using sqlite")
+        backend = 'sqlite'
+    return HISTORY_BACKENDS[backend]()
+
+
+history_index = create_history_index(HISTORY_INDEX_BACKEND)
+
+
+async def record_history(metadata: Dict[str, Any]):
+    try:
+        await run_blocking(history_index.record, metadata)
+    except Exception as e:
+        logger.error(f"Error recording history for {metadata.get('job_id')}: {e}")
+
+
+def parse_history_time(value: Optional[str], field: str) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f'Invalid {field}: {value}')
+
+
 @app.post("/api/video_history")
-async def get_video_history(request: Request):
-    """Get video generation history"""
+async def get_video_history(request: HistoryRequest):
+    """Get generation history, newest first, filtered by client/type/model/status/time range"""
     try:
-        body = await request.json()
-        limit = body.get('limit', 50)
-
-        # Return mock data for now
-        mock_videos = []
-        for i in range(min(limit, 10)):
-            mock_videos.append({
-                'job_id': str(uuid.uuid4()),
-                'client': 'DFSA',
-                'status': 'completed',
-                'created_at': datetime.now().isoformat(),
-                'prompt': f'Sample video prompt {i + 1}',
-                'duration': 5,
-                'quality': 'standard',
-                'camera_movement': 'dolly_in',
-                'reference_images': []
-            })
+        limit = max(1, min(request.limit, MAX_HISTORY_PAGE_SIZE))
+        since = parse_history_time(request.since, 'since')
+        until = parse_history_time(request.until, 'until')
+
+        cursor = None
+        if request.cursor:
+            created_at, _, job_id = decode_cursor(request.cursor).partition('|')
+            try:
+                cursor = (float(created_at), job_id)
+            except ValueError:
+                raise HTTPException(status_code=400, detail='Invalid cursor')
+
+        # One extra row tells whether another page exists
+        rows = await run_blocking(history_index.query, request.client, request.type, request.model,
+                                  request.status, since, until, cursor, limit + 1)
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(f"{rows[-1]['created_at']!r}|{rows[-1]['job_id']}")
+
+        for row in rows:
+            row['created_at'] = datetime.fromtimestamp(row['created_at']).isoformat()
+            row['updated_at'] = datetime.fromtimestamp(row['updated_at']).isoformat()
+            if row.get('video_key'):
+                row['video_url'] = presigned_urls.get(VIDEO_OUTPUT_BUCKET, row['video_key'])
+            if row.get('image_urls'):
+                row['image_urls'] = [
+                    {'url': presigned_urls.get(IMAGE_OUTPUT_BUCKET, image['key']), 'key': image['key']}
+                    if isinstance(image, dict) and image.get('key') else image
+                    for image in row['image_urls']
+                ]
 
         return {
             'success': True,
-            'videos': mock_videos,
-            'total': len(mock_videos)
+            'videos': rows,
+            'total': len(rows),
+            'next_cursor': next_cursor
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f'Error fetching video history: {e}')
         raise HTTPException(status_code=500, detail=str(e))
@@ -1253,7 +4839,7 @@ async def get_video_history(request: Request):
 # ==================== LEGACY ENDPOINTS ====================
 
 @app.post("/api/generate_video")
-async def generate_video_legacy(request: Request, background_tasks: BackgroundTasks):
+async def generate_video_legacy(request: Request):
     """Legacy video generation endpoint - redirects to unified"""
     body = await request.json()
 
@@ -1269,7 +4855,7 @@ async def generate_video_legacy(request: Request, background_tasks: BackgroundTa
         reference_images=body.get('reference_images', [])
     )
 
-    return await unified_generate(unified_request, background_tasks)
+    return await unified_generate(unified_request)
 
 
 @app.post("/api/check_video_status")
@@ -1282,12 +4868,258 @@ async def check_video_status_legacy(request: Request):
         type="video"
     )
 
-    return await check_unified_status(status_request)
+    return await job_status(status_request)
+
+
+# ==================== GENERATION WORKERS ====================
+
+class JobWorker:
+    """Claims jobs from the durable queue and runs them through the scheduler lanes"""
+
+    def __init__(self, queue: DurableJobQueue, poll_interval: float, finalize_grace: float):
+        self.worker_id = f'worker-{os.getpid()}-{uuid.uuid4().hex[:8]}'
+        self.queue = queue
+        self.poll_interval = poll_interval
+        self.finalize_grace = finalize_grace
+        self._held: set = set()
+        self._finalizers: Dict[str, asyncio.Task] = {}  # jobs done generating, waiting for their metadata to persist
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.claimed = 0
+        self.resumed = 0
+        self.finished = 0
+        self.requeued = 0
+        self.recovered = 0
+
+    def start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"👷 Generation worker {self.worker_id} started")
+
+    def wake(self):
+        """Nudge the claim loop after a local enqueue instead of waiting for the next poll"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await scheduler.stop()
+        if self._finalizers:
+            # Push out queued terminal writes and give finalizers a bounded wait; the rest replay from their lease
+            await metadata_writer.flush()
+            _, unfinished = await asyncio.wait(self._finalizers.values(), timeout=self.finalize_grace)
+            for finalizer in unfinished:
+                finalizer.cancel()
+        # Hand unfinished jobs straight back so the next worker resumes them without waiting out the lease
+        released = await run_blocking(self.queue.release, self.worker_id)
+        if released:
+            logger.info(f"👷 Released {released} unfinished jobs from {self.worker_id}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'worker_id': self.worker_id,
+            'running': self._task is not None,
+            'held': len(self._held),
+            'finalizing': len(self._finalizers),
+            'claimed': self.claimed,
+            'resumed': self.resumed,
+            'finished': self.finished,
+            'requeued': self.requeued,
+            'recovered': self.recovered
+        }
+
+    async def _run(self):
+        last_renewal = 0.0
+        while True:
+            try:
+                now = time.monotonic()
+                if now - last_renewal >= self.queue.lease_seconds / 3:
+                    await run_blocking(self.queue.renew, self.worker_id)
+                    requeued = await run_blocking(self.queue.requeue_expired)
+                    if requeued:
+                        self.requeued += requeued
+                        logger.warning(f"👷 Requeued {requeued} jobs with expired leases")
+                    for job in await run_blocking(self.queue.claim_finalizing, self.worker_id, METADATA_FLUSH_BATCH):
+                        if job['job_id'] in self._finalizers:
+                            continue
+                        # Generation already finished elsewhere - only its metadata write is replayed
+                        self.recovered += 1
+                        logger.warning(f"👷 Replaying final metadata write for job {job['job_id']}")
+                        self._persist(job['job_id'], job['status'], job['final_metadata'])
+                    last_renewal = now
+
+                # Claim per model only what its lane can start, so one busy model never starves the rest
+                capacity = {key: free for key, free in scheduler.free_capacity().items() if free > 0}
+                if capacity:
+                    for job in await run_blocking(self.queue.claim, self.worker_id, capacity, model_rate_limits()):
+                        self._submit(job)
+            except Exception as e:
+                logger.error(f"Job worker error: {e}")
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _submit(self, job: Dict[str, Any]):
+        job_id = job['job_id']
+        request = UnifiedGenerateRequest(**job['request'])
+        metadata = job['metadata']
+        run = job_runner(job_id, request, job['reference_urls'], metadata, job['provider_task_id'])
+
+        self.claimed += 1
+        if job['provider_task_id']:
+            self.resumed += 1
+            logger.info(f"👷 Resuming job {job_id} on provider task {job['provider_task_id']}")
+
+        async def execute():
+            try:
+                await run()
+            except Exception as e:
+                logger.error(f"Job {job_id} crashed: {e}")
+            finally:
+                self._held.discard(job_id)
+            # Not reached when cancelled on shutdown - those jobs are released back to the queue
+            job_state = job_store.get(job_id) or {}
+            status = job_state['status'] if job_state.get('status') in TERMINAL_STATUSES else 'failed'
+            final = final_metadata(metadata, job_state, status)
+            # Saved on the row before anything is written, so recovery never reruns the generation
+            await run_blocking(self.queue.finalizing, job_id, status, final)
+            # Returning frees the lane slot; persistence is awaited outside the scheduler
+            self._persist(job_id, status, final)
+            self.wake()
+
+        self._held.add(job_id)
+        scheduler.submit(request.type, request.model, job_id, request.websocket_id, execute,
+                         priority=job['priority'], metadata=metadata)
+
+    def _persist(self, job_id: str, status: str, final: Dict[str, Any]):
+        """Queue the terminal metadata write and finish the queue row once it lands"""
+        try:
+            written = metadata_writer.submit(job_id, final, terminal=True)
+        except Exception as e:
+            # Still finish the queue row - replaying cannot fix metadata the writer rejects
+            logger.error(f"Error queueing final metadata for {job_id}: {e}")
+            written = None
+        finalizer = asyncio.create_task(self._finalize(job_id, status, final, written))
+        self._finalizers[job_id] = finalizer
+        finalizer.add_done_callback(lambda _: self._finalizers.pop(job_id, None))
+
+    async def _finalize(self, job_id: str, status: str, final: Dict[str, Any], written: Optional[asyncio.Future]):
+        await record_history(final)
+        message = None
+        if written is not None:
+            # Finish the queue row only once S3 has the terminal state, so a crash in between replays it
+            try:
+                await written
+            except Exception as e:
+                # The writer gave up; the row records the failure instead of replaying forever
+                status, message = 'failed', str(e)
+        try:
+            await run_blocking(self.queue.finish, job_id, status, message)
+            self.finished += 1
+        except Exception as e:
+            logger.error(f"Error finishing job {job_id}: {e}")
+
+
+job_worker = JobWorker(job_queue, JOB_WORKER_POLL_INTERVAL, JOB_FINALIZE_GRACE_SECONDS)
+
+
+def model_rate_limits() -> Dict[tuple, Dict[str, Any]]:
+    return {
+        (model_type, model): model_info.get('rate_limit', {})
+        for model_type, models in MODEL_REGISTRY.items()
+        for model, model_info in models.items()
+    }
+
+
+def final_metadata(metadata: Dict, job_state: Dict, status: str) -> Dict:
+    """Terminal metadata.json for any model: handler metadata plus the job's result fields"""
+    final = dict(metadata)
+    final['status'] = status
+    for field in RESULT_FIELDS:
+        if job_state.get(field) is not None:
+            final[field] = job_state[field]
+    if status == 'failed':
+        final.setdefault('error', job_state.get('message') or 'Generation failed')
+        final.setdefault('failed_at', datetime.now().isoformat())
+    else:
+        final.setdefault('completed_at', datetime.now().isoformat())
+    return final
+
+
+def worker_process_main():
+    """Entry point of one generation worker process"""
+    async def serve():
+        await providers.start()
+        await progress_bus.start()
+        runway_poller.start()
+        veo_poller.start()
+        metadata_writer.start()
+        job_worker.start()
+
+        stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stopping.set)
+        await stopping.wait()
+
+        await job_worker.stop()
+        await runway_poller.stop()
+        await veo_poller.stop()
+        await metadata_writer.stop()
+        await progress_bus.close()
+        await providers.close()
+
+    asyncio.run(serve())
+    io_executor.shutdown(wait=False)
+    progress_executor.shutdown(wait=False)
+
+
+def run_workers(processes: int) -> int:
+    """Run the generation handlers in separate worker processes until interrupted; returns the exit code"""
+    if isinstance(progress_bus, InMemoryProgressBus):
+        # Progress published in a worker process would never reach the API's WebSocket clients
+        logger.error("❌ Worker processes need a shared progress bus - set PROGRESS_BUS_URL to a redis:// URL")
+        return 1
+    logger.info(f'👷 Starting {processes} generation worker processes')
+    context = multiprocessing.get_context('spawn')
+    workers = [
+        context.Process(target=worker_process_main, name=f'generation-worker-{i}')
+        for i in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+
+    def forward_shutdown(signum, frame):
+        # Each worker releases its unfinished jobs on SIGTERM
+        for worker in workers:
+            if worker.is_alive():
+                os.kill(worker.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGINT, forward_shutdown)
+    signal.signal(signal.SIGTERM, forward_shutdown)
+    for worker in workers:
+        worker.join()
+    return 0
 
 
 # ==================== MAIN ====================
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'worker':
+        # python lambda_function.py worker [processes] - run with EMBEDDED_JOB_WORKER=false on the API
+        sys.exit(run_workers(int(sys.argv[2]) if len(sys.argv) > 2 else JOB_WORKER_PROCESSES))
+
     host = os.environ.get('HOST', '0.0.0.0')
     port = int(os.environ.get('PORT', 8000))
 
@@ -1299,4 +5131,5 @@ if __name__ == "__main__":
     logger.info(f'  Video: Veo 3={VEO3_AVAILABLE}, Runway={RUNWAY_AVAILABLE}, Hailuo={HAILUO_AVAILABLE}')
     logger.info(f'  Image: DALL-E 3={DALLE_AVAILABLE}, Imagen 4={IMAGEN4_AVAILABLE}')
 
-    uvicorn.run("lambda_function:app", host=host, port=port, reload=True, log_level="info")
\ No newline at end of file
+    uvicorn.run("lambda_function:app", host=host, port=port, reload=True, log_level="info",
+                ws_per_message_deflate=WS_PER_MESSAGE_DEFLATE)
\ No newline at end of file
@@ -0,0 +1,30 @@
+import os
+import sys
+import tempfile
+
+import pytest
+from moto import mock_aws
+
+# lambda_function reads its configuration and creates boto3 clients at import time
+_state_dir = tempfile.mkdtemp(prefix='creative-studio-tests-')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+os.environ['STATE_DB_PATH'] = os.path.join(_state_dir, 'state.db')
+os.environ.setdefault('VEO_POLL_MIN', '0.01')
+os.environ.setdefault('VEO_POLL_MAX', '0.02')
+
+_aws = mock_aws()
+_aws.start()
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import lambda_function  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def lf():
+    """lambda_function imported against mocked AWS with its output buckets created"""
+    for bucket in {lambda_function.VISUAL_ASSETS_BUCKET, lambda_function.VIDEO_OUTPUT_BUCKET,
+                   lambda_function.IMAGE_OUTPUT_BUCKET, lambda_function.REFERENCE_IMAGES_BUCKET}:
+        lambda_function.s3_client.create_bucket(Bucket=bucket)
+    return lambda_function
@@ -0,0 +1,56 @@
+import itertools
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from google.genai import types
+
+
+class FakeVeoOperations:
+    """Local stand-in for Gemini's models.generate_videos and operations.get
+
+    Each operation stays running for polls_until_done calls to operations.get and then
+    finishes with either the queued video bytes or, when filtered, the RAI reasons.
+    """
+
+    def __init__(self, polls_until_done: int = 2, video_bytes: bytes = b'fake-mp4',
+                 filtered_reasons: Optional[List[str]] = None):
+        self.polls_until_done = polls_until_done
+        self.video_bytes = video_bytes
+        self.filtered_reasons = filtered_reasons
+        self.operations: Dict[str, Dict[str, Any]] = {}
+        self.submissions: List[Dict[str, Any]] = []
+        self.gets = 0
+        self._ids = itertools.count(1)
+
+    def client(self) -> SimpleNamespace:
+        """Object shaped like genai.Client for ProviderClients._genai"""
+        return SimpleNamespace(aio=SimpleNamespace(models=self, operations=self))
+
+    def start_operation(self, model: str) -> str:
+        name = f"models/{model}/operations/{next(self._ids)}"
+        self.operations[name] = {'polls': 0}
+        return name
+
+    async def generate_videos(self, model: str, prompt: str, image=None,
+                              config: Optional[types.GenerateVideosConfig] = None):
+        name = self.start_operation(model)
+        self.submissions.append({'name': name, 'model': model, 'prompt': prompt, 'image': image, 'config': config})
+        return types.GenerateVideosOperation(name=name, done=False)
+
+    async def get(self, operation: types.GenerateVideosOperation):
+        self.gets += 1
+        state = self.operations[operation.name]
+        state['polls'] += 1
+        if state['polls'] < self.polls_until_done:
+            return types.GenerateVideosOperation(name=operation.name, done=False)
+
+        if self.filtered_reasons:
+            response = types.GenerateVideosResponse(
+                generated_videos=[],
+                rai_media_filtered_count=len(self.filtered_reasons),
+                rai_media_filtered_reasons=self.filtered_reasons
+            )
+        else:
+            video = types.Video(video_bytes=self.video_bytes, mime_type='video/mp4')
+            response = types.GenerateVideosResponse(generated_videos=[types.GeneratedVideo(video=video)])
+        return types.GenerateVideosOperation(name=operation.name, done=True, response=response)
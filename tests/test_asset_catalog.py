@@ -0,0 +1,56 @@
+import asyncio
+import uuid
+
+import pytest
+
+
+@pytest.fixture
+def prefix(lf):
+    prefix = f'client-{uuid.uuid4().hex[:8]}/'
+    yield prefix
+    listed = lf.s3_client.list_objects_v2(Bucket=lf.VISUAL_ASSETS_BUCKET, Prefix=prefix).get('Contents', [])
+    for obj in listed:
+        lf.s3_client.delete_object(Bucket=lf.VISUAL_ASSETS_BUCKET, Key=obj['Key'])
+
+
+def put(lf, key, body=b'image'):
+    lf.s3_client.put_object(Bucket=lf.VISUAL_ASSETS_BUCKET, Key=key, Body=body)
+
+
+def test_refresh_applies_only_what_changed(lf, prefix):
+    catalog = lf.VisualAssetCatalog(lf.VISUAL_ASSETS_BUCKET, ttl=300, list_concurrency=4)
+    put(lf, prefix + 'logo.png')
+    put(lf, prefix + 'photos/beach.jpg')
+    put(lf, prefix + 'photos/notes.txt')
+
+    first = asyncio.run(catalog.get(prefix))
+    assert first.sorted_keys == [prefix + 'logo.png', prefix + 'photos/beach.jpg']
+
+    # Within the TTL the cached listing is served without listing S3 again
+    put(lf, prefix + 'photos/city.jpg')
+    assert asyncio.run(catalog.get(prefix)).sorted_keys == first.sorted_keys
+    assert catalog.stats()['refreshes'] == 1
+
+    lf.s3_client.delete_object(Bucket=lf.VISUAL_ASSETS_BUCKET, Key=prefix + 'logo.png')
+    refreshed = asyncio.run(catalog.get(prefix, force_refresh=True))
+
+    assert refreshed.sorted_keys == [prefix + 'photos/beach.jpg', prefix + 'photos/city.jpg']
+    assert catalog.stats()['changed_keys'] == 3  # two initial keys, then only city.jpg
+    assert catalog.stats()['removed_keys'] == 1
+
+
+def test_presigned_urls_are_reused_until_close_to_expiry(lf, monkeypatch):
+    cache = lf.PresignedUrlCache(expires_in=3600, refresh_margin=300)
+
+    url = cache.get('bucket', 'a.png')
+    assert cache.get('bucket', 'a.png') == url
+    assert (cache.stats()['hits'], cache.stats()['misses']) == (1, 1)
+
+    now = lf.time.time()
+    monkeypatch.setattr(lf.time, 'time', lambda: now + 3400)
+    cache.get('bucket', 'a.png')
+    assert cache.stats()['misses'] == 2
+
+    cache.discard('bucket', 'a.png')
+    cache.get('bucket', 'a.png')
+    assert cache.stats()['misses'] == 3
@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+KEYS = [f'client-atlas/batch/{i:02d}.png' for i in range(7)] + ['client-atlas/batch/cover.jpg']
+
+
+@pytest.fixture
+def client(lf, monkeypatch):
+    monkeypatch.setattr(lf, 'asset_catalog', lf.VisualAssetCatalog(lf.VISUAL_ASSETS_BUCKET, 300, 4))
+    for key in KEYS:
+        lf.s3_client.put_object(Bucket=lf.VISUAL_ASSETS_BUCKET, Key=key, Body=b'image')
+    yield TestClient(lf.app)
+    for key in KEYS:
+        lf.s3_client.delete_object(Bucket=lf.VISUAL_ASSETS_BUCKET, Key=key)
+
+
+def all_pages(client, **params):
+    pages = []
+    cursor = None
+    while True:
+        response = client.post('/api/visual_assets/page', json={'client': 'Atlas', 'cursor': cursor, **params})
+        assert response.status_code == 200
+        page = response.json()
+        pages.append([asset['key'] for asset in page['assets']])
+        cursor = page['next_cursor']
+        if cursor is None:
+            return pages
+
+
+def test_cold_and_warm_catalogs_page_identically(lf, client):
+    cold = all_pages(client, page_size=3)
+    asyncio.run(lf.asset_catalog.get('client-atlas/'))
+    warm = all_pages(client, page_size=3)
+
+    assert cold == warm == [KEYS[0:3], KEYS[3:6], KEYS[6:8]]
+
+
+def test_pages_filter_by_extension_and_gzip_on_request(lf, client):
+    assert all_pages(client, page_size=10, extension='jpg') == [['client-atlas/batch/cover.jpg']]
+
+    response = client.post('/api/visual_assets/page', json={'client': 'Atlas', 'page_size': 2},
+                           headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['content-encoding'] == 'gzip'
+    assert response.json()['count'] == 2
+
+
+def test_invalid_cursor_is_rejected(client):
+    response = client.post('/api/visual_assets/page', json={'client': 'Atlas', 'cursor': '%%%'})
+
+    assert response.status_code == 400
@@ -0,0 +1,87 @@
+import asyncio
+import io
+
+import pytest
+from PIL import Image
+
+
+def png(pattern):
+    image = Image.new('L', (90, 80))
+    image.putdata([pattern(x, y) for y in range(80) for x in range(90)])
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def assets(lf, tmp_path, monkeypatch):
+    monkeypatch.setattr(lf, 'asset_catalog', lf.VisualAssetCatalog(lf.VISUAL_ASSETS_BUCKET, 300, 4))
+    monkeypatch.setattr(lf, 'similarity_index', lf.AssetSimilarityIndex(
+        str(tmp_path / 'hashes.db'), lf.VISUAL_ASSETS_BUCKET, 4
+    ))
+    prefix = lf.client_asset_prefix('similarity-test')
+    images = {
+        'gradient.png': png(lambda x, y: x * 2),
+        'gradient-copy.png': png(lambda x, y: min(255, x * 2 + 3)),
+        'stripes.png': png(lambda x, y: 255 if (x // 10 + y // 10) % 2 else 0)
+    }
+    for name, data in images.items():
+        lf.s3_client.put_object(Bucket=lf.VISUAL_ASSETS_BUCKET, Key=prefix + name, Body=data)
+    yield prefix
+    for name in images:
+        lf.s3_client.delete_object(Bucket=lf.VISUAL_ASSETS_BUCKET, Key=prefix + name)
+
+
+def test_queries_report_warming_until_hashed_in_the_background(lf, assets):
+    request = lf.SimilarAssetsRequest(client='similarity-test', key=assets + 'gradient.png', max_distance=10)
+
+    async def scenario():
+        first = await lf.get_similar_assets(request)
+        assert first['status'] == 'warming'
+
+        for _ in range(200):
+            if not lf.similarity_index.stats()['warming']:
+                break
+            await asyncio.sleep(0.01)
+        return await lf.get_similar_assets(request)
+
+    warm = asyncio.run(scenario())
+
+    assert warm['success'] is True
+    assert [asset['key'] for asset in warm['assets']] == [assets + 'gradient-copy.png']
+    assert lf.similarity_index.stats()['hashes'] == 3
+
+
+def test_bk_tree_removal_keeps_routing_intact(lf):
+    tree = lf.BKTree()
+    for value, item in [(0b0000, 'a'), (0b0001, 'b'), (0b0010, 'c'), (0b0100, 'd')]:
+        tree.add(value, item)
+
+    assert tree.remove(0b0001, 'b')
+    assert not tree.remove(0b0001, 'b')
+    assert tree.size == 3
+    # 'c' and 'd' hang below the emptied node and are still found
+    assert sorted(tree.search(0b0010, 2)) == [(0, 'c'), (1, 'a'), (2, 'd')]
+
+
+def test_hashes_persist_and_only_changes_are_rehashed(lf, assets, tmp_path, monkeypatch):
+    asyncio.run(lf.similarity_index.sync(assets))
+    assert lf.similarity_index.stats()['hashed'] == 3
+
+    # A fresh process loads the stored hashes instead of downloading every asset again
+    index = lf.AssetSimilarityIndex(str(tmp_path / 'hashes.db'), lf.VISUAL_ASSETS_BUCKET, 4)
+    monkeypatch.setattr(lf, 'similarity_index', index)
+    lf.s3_client.delete_object(Bucket=lf.VISUAL_ASSETS_BUCKET, Key=assets + 'gradient-copy.png')
+    lf.s3_client.put_object(Bucket=lf.VISUAL_ASSETS_BUCKET, Key=assets + 'stripes.png',
+                            Body=png(lambda x, y: x * 2 + 1))
+
+    async def resync():
+        await lf.asset_catalog.get(assets, force_refresh=True)
+        await index.sync(assets)
+        return await index.similar(assets, assets + 'gradient.png', 10, 10)
+
+    matches = asyncio.run(resync())
+
+    assert index.stats()['hashed'] == 1
+    assert index.stats()['hashes'] == 2
+    assert [key for _, key in matches] == [assets + 'stripes.png']
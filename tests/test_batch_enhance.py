@@ -0,0 +1,49 @@
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+
+def test_batch_keeps_order_bounds_concurrency_and_falls_back_per_item(lf, monkeypatch):
+    monkeypatch.setattr(lf, 'ENHANCE_BATCH_CONCURRENCY', 2)
+    monkeypatch.setattr(lf, 'enhancement_cache', lf.EnhancementCache(max_entries=10, ttl=60))
+    lock = threading.Lock()
+    running = 0
+    peak = 0
+
+    def agent(agent_input):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+        if agent_input['prompt'] == 'broken':
+            raise RuntimeError('throttled')
+        return {'enhanced_prompt': agent_input['prompt'].upper()}
+
+    monkeypatch.setattr(lf, 'invoke_enhancement_agent', agent)
+    prompts = ['a cat', 'a dog', 'broken', 'a bird', 'a fish']
+
+    response = TestClient(lf.app).post('/api/enhance_prompt/batch', json={'items': [
+        {'prompt': prompt, 'model': 'veo3', 'type': 'video'} for prompt in prompts
+    ]})
+
+    assert response.status_code == 200
+    results = response.json()['results']
+    assert [r['original_prompt'] for r in results] == prompts
+    assert results[0]['enhanced_prompt'] == 'A CAT'
+    assert results[2]['enhanced_prompt'] not in ('broken', 'BROKEN')  # Local enhancement instead
+    assert all(r['success'] for r in results)
+    assert peak == 2
+
+
+def test_oversized_batches_are_rejected(lf, monkeypatch):
+    monkeypatch.setattr(lf, 'MAX_ENHANCE_BATCH_ITEMS', 2)
+
+    response = TestClient(lf.app).post('/api/enhance_prompt/batch', json={'items': [
+        {'prompt': 'a cat', 'model': 'veo3', 'type': 'video'}
+    ] * 3})
+
+    assert response.status_code == 400
@@ -0,0 +1,70 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def batch(lf, tmp_path, monkeypatch):
+    monkeypatch.setitem(lf.MODEL_REGISTRY['image']['dalle3'], 'available', True)
+    monkeypatch.setattr(lf, 'job_queue', lf.DurableJobQueue(str(tmp_path / 'queue.db'), 60))
+    monkeypatch.setattr(lf, 'metadata_writer', lf.MetadataWriter(flush_interval=1, batch_size=10, terminal_memory=100))
+    return TestClient(lf.app)
+
+
+def item(prompt, **kwargs):
+    return {'type': 'image', 'model': 'dalle3', 'client': 'Acme', 'prompt': prompt, **kwargs}
+
+
+def test_late_failure_still_reports_the_jobs_already_queued(lf, batch, monkeypatch):
+    dispatch_job = lf.dispatch_job
+
+    async def flaky_dispatch(job_id, request, reference_urls, metadata):
+        if request.prompt == 'second':
+            raise RuntimeError('queue unavailable')
+        await dispatch_job(job_id, request, reference_urls, metadata)
+
+    monkeypatch.setattr(lf, 'dispatch_job', flaky_dispatch)
+
+    response = batch.post('/api/unified_generate/batch', json={'items': [item('first'), item('second'), item('third')]})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body['success'] is False
+    assert (body['submitted'], body['failed']) == (2, 1)
+    assert [job['success'] for job in body['jobs']] == [True, False, True]
+    assert body['jobs'][1]['error'] == 'queue unavailable'
+    assert body['job_ids'] == [body['jobs'][0]['job_id'], body['jobs'][2]['job_id']]
+    for job_id in body['job_ids']:
+        assert lf.job_queue.get(job_id)['queue_state'] == 'pending'
+    # The failed item's initial record is closed out rather than left queued
+    failed = [job_id for job_id in lf.metadata_writer._pending if job_id not in body['job_ids']]
+    assert lf.job_store.get(failed[0])['status'] == 'failed'
+
+
+def test_invalid_item_rejects_the_batch_before_any_job_exists(lf, batch):
+    response = batch.post('/api/unified_generate/batch', json={'items': [item('first'), item('second', model='nope')]})
+
+    assert response.status_code == 400
+    assert response.json()['detail'].startswith('Item 1:')
+    assert lf.job_queue.stats() == {}
+
+
+def test_batch_jobs_share_the_batch_id_and_websocket(lf, batch, monkeypatch):
+    published = []
+
+    async def publish(websocket_id, data):
+        published.append((websocket_id, data))
+
+    monkeypatch.setattr(lf.progress_bus, 'publish', publish)
+
+    response = batch.post('/api/unified_generate/batch', json={'items': [item('first'), item('second')],
+                                                               'websocket_id': 'ws-1'})
+
+    body = response.json()
+    assert body['success'] is True and body['submitted'] == 2
+    assert ('ws-1', {'type': 'batch_submitted', 'batch_id': body['batch_id'], 'job_ids': body['job_ids']}) in published
+    for job_id in body['job_ids']:
+        assert json.loads(lf.metadata_writer._pending[job_id].body)['batch_id'] == body['batch_id']
+        assert lf.job_store.get(job_id)['status'] == 'queued'
+    assert lf.job_queue.stats() == {'pending': 2}
@@ -0,0 +1,53 @@
+import asyncio
+
+
+def test_cancelled_leader_does_not_strand_followers(lf):
+    cache = lf.EnhancementCache(max_entries=10, ttl=60)
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {'enhanced_prompt': 'a sharper prompt'}
+
+    async def scenario():
+        agent_input = {'prompt': 'a prompt'}
+        leader = asyncio.create_task(cache.get_or_compute(agent_input, compute))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(cache.get_or_compute(agent_input, compute))
+        await asyncio.sleep(0)
+        leader.cancel()
+        result = await asyncio.wait_for(follower, timeout=1)
+        cached = await cache.get_or_compute(agent_input, compute)
+        return leader.cancelled(), result, cached
+
+    leader_cancelled, result, cached = asyncio.run(scenario())
+
+    assert leader_cancelled
+    assert result == cached == {'enhanced_prompt': 'a sharper prompt'}
+    assert calls == 1
+    assert cache.stats()['coalesced'] == 1
+    assert cache.stats()['hits'] == 1
+
+
+def test_failures_reach_every_caller_and_are_not_cached(lf):
+    cache = lf.EnhancementCache(max_entries=10, ttl=60)
+
+    async def compute():
+        await asyncio.sleep(0.01)
+        raise RuntimeError('throttled')
+
+    async def scenario():
+        agent_input = {'prompt': 'a prompt'}
+        return await asyncio.gather(
+            cache.get_or_compute(agent_input, compute),
+            cache.get_or_compute(agent_input, compute),
+            return_exceptions=True
+        )
+
+    results = asyncio.run(scenario())
+
+    assert [str(r) for r in results] == ['throttled', 'throttled']
+    assert cache.stats()['size'] == 0
+    assert cache._in_flight == {}
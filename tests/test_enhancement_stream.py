@@ -0,0 +1,24 @@
+import asyncio
+import threading
+import time
+
+
+def test_token_streams_run_outside_the_io_budget(lf, monkeypatch):
+    seen = {}
+
+    def fake_stream(agent_input, emit, stop):
+        seen['thread'] = threading.current_thread().name
+        seen['io_slots_free'] = lf.io_slot()._value
+        for text in ('a ', 'sharper ', 'prompt'):
+            time.sleep(0.01)
+            emit(text)
+
+    monkeypatch.setattr(lf, 'stream_enhancement', fake_stream)
+
+    async def scenario():
+        lf.io_slot()
+        return [text async for text in lf.enhancement_tokens({'prompt': 'a prompt'})]
+
+    assert asyncio.run(scenario()) == ['a ', 'sharper ', 'prompt']
+    assert seen['thread'].startswith('enhance-stream')
+    assert seen['io_slots_free'] == lf.MAX_INFLIGHT_IO
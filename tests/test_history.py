@@ -0,0 +1,28 @@
+import json
+import uuid
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+
+def test_history_stores_image_keys_and_resigns_them(lf, tmp_path, monkeypatch):
+    index = lf.SQLiteHistoryIndex(str(tmp_path / 'history.db'))
+    monkeypatch.setattr(lf, 'history_index', index)
+    job_id = str(uuid.uuid4())
+    key = f'acme/generated-images/{job_id}/output.png'
+    index.record({
+        'job_id': job_id, 'client': 'Acme', 'type': 'image', 'model': 'dalle3', 'status': 'completed',
+        'created_at': datetime.now().isoformat(), 'completed_at': datetime.now().isoformat(),
+        'original_prompt': 'a cat',
+        'image_urls': [{'url': 'https://expired.example/signed?X-Amz-Expires=1', 'key': key},
+                       {'url': 'https://provider.example/image.png'}]
+    })
+
+    stored = index._conn.execute('SELECT summary FROM job_history WHERE job_id = ?', (job_id,)).fetchone()[0]
+    assert json.loads(stored)['image_urls'] == [{'key': key}, {'url': 'https://provider.example/image.png'}]
+
+    response = TestClient(lf.app).post('/api/video_history', json={'client': 'Acme', 'type': 'image'})
+
+    images = response.json()['videos'][0]['image_urls']
+    assert images[0] == {'url': lf.presigned_urls.get(lf.IMAGE_OUTPUT_BUCKET, key), 'key': key}
+    assert images[1] == {'url': 'https://provider.example/image.png'}
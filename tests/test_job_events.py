@@ -0,0 +1,79 @@
+import asyncio
+import json
+import uuid
+
+from fastapi.testclient import TestClient
+
+
+def sse_events(text):
+    events = []
+    for block in text.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if ': ' in line and not line.startswith(':'))
+        if 'event' in fields:
+            events.append(fields)
+    return events
+
+
+def finished_job(lf):
+    job_id = str(uuid.uuid4())
+    lf.job_store.update_progress(job_id, 100, 'completed', 'Video generation complete!')
+    return job_id
+
+
+def test_unknown_jobs_are_rejected_before_streaming(lf):
+    client = TestClient(lf.app)
+    known = finished_job(lf)
+
+    response = client.get('/api/job_events', params={'job_ids': f'{known},{uuid.uuid4()}'})
+
+    assert response.status_code == 404
+
+
+def test_stream_ends_for_finished_jobs(lf):
+    client = TestClient(lf.app)
+    job_id = finished_job(lf)
+
+    response = client.get('/api/job_events', params={'job_ids': job_id})
+
+    events = sse_events(response.text)
+    assert [e['event'] for e in events] == ['progress', 'end']
+    assert '"completed"' in events[0]['data']
+
+
+def test_reconnect_after_final_event_ends_immediately(lf):
+    client = TestClient(lf.app)
+    job_id = finished_job(lf)
+    final = sse_events(client.get('/api/job_events', params={'job_ids': job_id}).text)[0]
+
+    response = client.get('/api/job_events', params={'job_ids': job_id}, headers={'Last-Event-ID': final['id']})
+
+    assert [e['event'] for e in sse_events(response.text)] == ['end']
+
+
+def test_reconnect_resumes_each_job_from_its_own_position(lf):
+    client = TestClient(lf.app)
+    first, second = finished_job(lf), finished_job(lf)
+
+    async def publish():
+        for job_id, events in ((first, [(10, 'processing'), (50, 'processing'), (100, 'completed')]),
+                               (second, [(30, 'processing'), (100, 'completed')])):
+            for seq, (progress, status) in enumerate(events, start=1):
+                await lf.job_events.record(None, {'job_id': job_id, 'progress': progress, 'status': status,
+                                                  'message': '', 'timestamp': '2026-01-01T00:00:00', 'seq': seq})
+
+    asyncio.run(publish())
+
+    response = client.get('/api/job_events', params={'job_ids': f'{first},{second}'},
+                          headers={'Last-Event-ID': f'{first}:2,{second}:1'})
+
+    events = sse_events(response.text)
+    assert [e['event'] for e in events] == ['progress', 'progress', 'end']
+    assert [json.loads(e['data'])['job_id'] for e in events[:2]] == [first, second]
+    assert events[1]['id'] == f'{first}:3,{second}:2'
+
+
+def test_malformed_last_event_id_is_rejected(lf):
+    response = TestClient(lf.app).get('/api/job_events', params={'job_ids': finished_job(lf)},
+                                      headers={'Last-Event-ID': '1700000000000000'})
+
+    assert response.status_code == 400
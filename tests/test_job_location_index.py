@@ -0,0 +1,53 @@
+import asyncio
+import json
+import uuid
+
+import pytest
+
+
+@pytest.fixture
+def reads(lf, tmp_path, monkeypatch):
+    monkeypatch.setattr(lf, 'job_index', lf.JobLocationIndex(str(tmp_path / 'index.db')))
+    keys = []
+    read_s3_json = lf.read_s3_json
+
+    def counting_read(bucket, key):
+        keys.append(key)
+        return read_s3_json(bucket, key)
+
+    monkeypatch.setattr(lf, 'read_s3_json', counting_read)
+    return keys
+
+
+def store_metadata(lf, client, job_id, status='completed'):
+    key = f'{client}/generated-videos/{job_id}/metadata.json'
+    lf.s3_client.put_object(Bucket=lf.VIDEO_OUTPUT_BUCKET, Key=key,
+                            Body=json.dumps({'job_id': job_id, 'status': status}))
+    return key
+
+
+def status(lf, job_id):
+    return asyncio.run(lf.job_status(lf.StatusRequest(job_id=job_id, type='video')))
+
+
+def test_indexed_jobs_are_read_with_a_single_get(lf, reads):
+    job_id = str(uuid.uuid4())
+    key = store_metadata(lf, 'acme', job_id)
+    lf.job_index.put(job_id, lf.VIDEO_OUTPUT_BUCKET, key, 'acme', 'video')
+
+    assert status(lf, job_id)['status'] == 'completed'
+    assert reads == [key]
+
+
+def test_unindexed_jobs_are_found_once_and_backfilled(lf, reads):
+    job_id = str(uuid.uuid4())
+    key = store_metadata(lf, 'yourbud', job_id, status='failed')
+
+    assert status(lf, job_id)['status'] == 'failed'
+    assert reads[-1] == key and len(reads) == 3  # dfsa, atlas, then yourbud
+    assert lf.job_index.get(job_id) == {'bucket': lf.VIDEO_OUTPUT_BUCKET, 'key': key,
+                                        'client': 'yourbud', 'type': 'video'}
+
+    reads.clear()
+    status(lf, job_id)
+    assert reads == [key]
@@ -0,0 +1,85 @@
+import time
+
+import pytest
+
+
+LIMITS = {
+    ('video', 'veo3'): {'requests_per_minute': 600, 'burst': 10, 'max_concurrent': 4},
+    ('video', 'hailuo'): {'requests_per_minute': 600, 'burst': 10, 'max_concurrent': 2},
+    ('image', 'dalle3'): {'requests_per_minute': 60, 'burst': 2, 'max_concurrent': 5},
+}
+OPEN = {key: 100 for key in LIMITS}
+
+
+@pytest.fixture
+def queues(lf, tmp_path):
+    """Two queues on one database, standing in for separate worker processes"""
+    path = str(tmp_path / 'queue.db')
+    return lf.DurableJobQueue(path, 60), lf.DurableJobQueue(path, 60)
+
+
+def enqueue(queue, model_type, model, count, prefix):
+    for i in range(count):
+        queue.enqueue(f'{prefix}-{i}', {'type': model_type, 'model': model}, [], {}, 5)
+
+
+def by_model(jobs):
+    counts = {}
+    for job in jobs:
+        key = (job['request']['type'], job['request']['model'])
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def test_concurrency_cap_holds_across_processes(queues):
+    first, second = queues
+    enqueue(first, 'video', 'hailuo', 6, 'hailuo')
+
+    claimed = first.claim('a', OPEN, LIMITS) + second.claim('b', OPEN, LIMITS)
+    assert len(claimed) == 2
+
+    first.finish(claimed[0]['job_id'], 'completed')
+    assert len(second.claim('b', OPEN, LIMITS)) == 1
+    assert first.claim('a', OPEN, LIMITS) == []
+
+
+def test_burst_of_one_model_does_not_block_others(queues):
+    queue, _ = queues
+    enqueue(queue, 'video', 'veo3', 20, 'veo')
+    enqueue(queue, 'image', 'dalle3', 3, 'dalle')
+
+    counts = by_model(queue.claim('a', OPEN, LIMITS))
+    assert counts == {('video', 'veo3'): 4, ('image', 'dalle3'): 2}
+
+
+def test_claims_respect_local_capacity(queues):
+    queue, _ = queues
+    enqueue(queue, 'video', 'veo3', 5, 'veo')
+
+    assert len(queue.claim('a', {('video', 'veo3'): 1}, LIMITS)) == 1
+    assert queue.claim('a', {('image', 'dalle3'): 5}, LIMITS) == []
+
+
+def test_rate_bucket_is_shared_and_refills(queues):
+    first, second = queues
+    enqueue(first, 'image', 'dalle3', 4, 'dalle')
+
+    assert len(first.claim('a', OPEN, LIMITS)) == 2
+    for job_id in ('dalle-0', 'dalle-1'):
+        first.finish(job_id, 'completed')
+    # Burst spent: concurrency is free again but no tokens are left
+    assert second.claim('b', OPEN, LIMITS) == []
+
+    time.sleep(1.1)
+    assert len(second.claim('b', OPEN, LIMITS)) == 1
+
+
+def test_progress_events_are_numbered_per_job_across_processes(queues):
+    a, b = queues
+    enqueue(a, 'video', 'veo3', 2, 'job')
+
+    assert a.record_progress('job-0', 10, 'processing', '', time.time()) == 1
+    assert b.record_progress('job-0', 20, 'processing', '', time.time()) == 2
+    assert a.record_progress('job-1', 10, 'processing', '', time.time()) == 1
+    assert a.record_progress('missing', 10, 'processing', '', time.time()) is None
+    assert b.get('job-0')['seq'] == 2
@@ -0,0 +1,76 @@
+import time
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def job(lf):
+    job_id = str(uuid.uuid4())
+    lf.job_store.update_progress(job_id, 40, 'processing', 'Generating video...')
+    return job_id
+
+
+def test_get_honours_if_none_match(lf, job):
+    client = TestClient(lf.app)
+
+    first = client.get('/api/check_unified_status', params={'job_id': job, 'type': 'video'})
+    assert first.status_code == 200
+    etag = first.headers['etag']
+    assert first.json()['version'] == etag
+
+    unchanged = client.get('/api/check_unified_status', params={'job_id': job}, headers={'If-None-Match': etag})
+    assert unchanged.status_code == 304
+    assert unchanged.headers['etag'] == etag
+
+    lf.job_store.update_progress(job, 60, 'processing', 'Generating video...')
+    changed = client.get('/api/check_unified_status', params={'job_id': job}, headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.json()['progress'] == 60
+
+
+def test_get_long_poll_times_out_with_304(lf, job):
+    client = TestClient(lf.app)
+    etag = client.get('/api/check_unified_status', params={'job_id': job}).headers['etag']
+
+    started = time.monotonic()
+    response = client.get('/api/check_unified_status', params={'job_id': job, 'wait': 0.2},
+                          headers={'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert time.monotonic() - started >= 0.2
+
+
+def test_post_always_returns_the_full_status(lf, job):
+    client = TestClient(lf.app)
+    version = client.post('/api/check_unified_status', json={'job_id': job, 'type': 'video'}).json()['version']
+
+    for kwargs in ({'json': {'job_id': job, 'type': 'video', 'version': version, 'wait': 0.1}},
+                   {'json': {'job_id': job, 'type': 'video'}, 'headers': {'If-None-Match': version}}):
+        response = client.post('/api/check_unified_status', **kwargs)
+        assert response.status_code == 200
+        assert response.json()['version'] == version
+        assert response.json()['progress'] == 40
+
+
+def test_unknown_job_is_404(lf):
+    response = TestClient(lf.app).get('/api/check_unified_status', params={'job_id': str(uuid.uuid4())})
+    assert response.status_code == 404
+
+
+def test_finalizing_job_is_answered_from_the_queue_row(lf, tmp_path, monkeypatch):
+    queue = lf.DurableJobQueue(str(tmp_path / 'queue.db'), 60)
+    monkeypatch.setattr(lf, 'job_queue', queue)
+    job_id = str(uuid.uuid4())
+    final = {'job_id': job_id, 'type': 'image', 'model': 'dalle3', 'client': 'Acme', 'status': 'completed',
+             'image_urls': [{'url': 'https://images.test/1.png'}]}
+    queue.enqueue(job_id, {'type': 'image', 'model': 'dalle3'}, [], dict(final, status='queued'), 5)
+    queue.claim('other-worker', {('image', 'dalle3'): 5}, lf.model_rate_limits())
+    queue.finalizing(job_id, 'completed', final)
+
+    response = TestClient(lf.app).get('/api/check_unified_status', params={'job_id': job_id, 'type': 'image'})
+
+    assert response.status_code == 200
+    assert response.json()['status'] == 'completed'
+    assert response.json()['metadata']['image_urls'] == final['image_urls']
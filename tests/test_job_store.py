@@ -0,0 +1,45 @@
+import time
+
+
+def test_finished_jobs_are_evicted_before_active_ones(lf):
+    store = lf.JobStore(max_jobs=3, finished_ttl=60)
+    store.update_progress('running', 10, 'processing')
+    store.update_progress('done-1', 100, 'completed')
+    store.update_progress('done-2', 100, 'completed')
+
+    store.update_progress('new', 5, 'queued')
+
+    assert 'done-1' not in store
+    assert all(job_id in store for job_id in ('running', 'done-2', 'new'))
+    assert store.stats()['evictions'] == 1
+
+
+def test_finished_jobs_expire_after_the_ttl(lf, monkeypatch):
+    store = lf.JobStore(max_jobs=10, finished_ttl=60)
+    store.update_progress('old', 100, 'completed')
+    store.update_progress('active', 50, 'processing')
+
+    now = time.time()
+    monkeypatch.setattr(lf.time, 'time', lambda: now + 61)
+
+    assert store.get('old') is None
+    assert store.get('active')['progress'] == 50
+    assert store.stats()['expirations'] == 1
+
+
+def test_completed_jobs_rebuild_model_info_and_results_on_read(lf):
+    store = lf.JobStore(max_jobs=10, finished_ttl=60)
+    metadata = {'job_id': 'job', 'type': 'image', 'model': 'dalle3', 'client': 'Acme',
+                'model_info': lf.MODEL_REGISTRY['image']['dalle3'], 'image_urls': ['stale']}
+    store.update_progress('job', 100, 'completed', 'done')
+    store.complete('job', metadata, image_urls=[{'url': 'https://images.test/1.png'}])
+
+    record = store._finished['job']
+    # Registry entries and results are referenced, not copied into the stored metadata
+    assert 'model_info' not in record.metadata and 'image_urls' not in record.metadata
+
+    state = store.get('job')
+    assert state['status'] == 'completed'
+    assert state['image_urls'] == [{'url': 'https://images.test/1.png'}]
+    assert state['metadata']['model_info'] is lf.MODEL_REGISTRY['image']['dalle3']
+    assert state['metadata']['image_urls'] == state['image_urls']
@@ -0,0 +1,149 @@
+import asyncio
+import json
+import time
+import uuid
+
+
+async def wait_for_state(queue, job_id, state, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        queued = queue.get(job_id)
+        if queued['queue_state'] == state:
+            return queued
+        assert asyncio.get_running_loop().time() < deadline, f"{job_id} stuck in {queued['queue_state']}"
+        await asyncio.sleep(0.01)
+
+
+def test_lane_slot_is_released_before_metadata_persists(lf, tmp_path, monkeypatch):
+    queue = lf.DurableJobQueue(str(tmp_path / 'queue.db'), 60)
+    writer = lf.MetadataWriter(flush_interval=0.01, batch_size=10, terminal_memory=100, retry_base=0.01)
+    worker = lf.JobWorker(queue, poll_interval=0.01, finalize_grace=1)
+    monkeypatch.setattr(lf, 'metadata_writer', writer)
+
+    s3_down = True
+    put_object = lf.s3_client.put_object
+
+    def flaky_put_object(**kwargs):
+        if s3_down:
+            raise ConnectionError('S3 unavailable')
+        return put_object(**kwargs)
+
+    async def fake_dalle(job_id, request, metadata):
+        lf.job_store.complete(job_id, metadata, image_urls=[{'url': 'https://images.test/1.png'}])
+        await lf.update_progress(job_id, None, 100, 'completed', 'done')
+
+    monkeypatch.setattr(lf.s3_client, 'put_object', flaky_put_object)
+    monkeypatch.setattr(lf, 'generate_dalle3_image', fake_dalle)
+
+    job_id = str(uuid.uuid4())
+    request = lf.UnifiedGenerateRequest(type='image', model='dalle3', prompt='a cat', client='Acme')
+    metadata = {'job_id': job_id, 'type': 'image', 'model': 'dalle3', 'client': 'Acme'}
+    queue.enqueue(job_id, request.model_dump(), [], metadata, 5)
+
+    async def scenario():
+        nonlocal s3_down
+        writer.start()
+        worker.start()
+        try:
+            await wait_for_state(queue, job_id, 'finalizing')
+            lane = lf.scheduler.lanes[('image', 'dalle3')]
+            assert lane.running == 0
+            assert worker.stats()['finalizing'] == 1
+
+            s3_down = False
+            await wait_for_state(queue, job_id, 'done')
+            assert worker.stats()['finished'] == 1
+        finally:
+            await worker.stop()
+            await writer.stop()
+
+    asyncio.run(scenario())
+
+
+def test_finalizing_jobs_replay_only_their_metadata_write(lf, tmp_path, monkeypatch):
+    queue = lf.DurableJobQueue(str(tmp_path / 'queue.db'), lease_seconds=0.05)
+    limits = {('image', 'dalle3'): {'requests_per_minute': 600, 'burst': 10, 'max_concurrent': 1}}
+    job_id = str(uuid.uuid4())
+    final = {'job_id': job_id, 'type': 'image', 'model': 'dalle3', 'client': 'Acme', 'status': 'completed',
+             'created_at': '2026-01-01T00:00:00', 'completed_at': '2026-01-01T00:01:00'}
+    queue.enqueue(job_id, {'type': 'image', 'model': 'dalle3', 'prompt': 'a cat', 'client': 'Acme'}, [], final, 5)
+    queue.enqueue('job-2', {'type': 'image', 'model': 'dalle3'}, [], {}, 5)
+
+    assert [job['job_id'] for job in queue.claim('dead-worker', {('image', 'dalle3'): 5}, limits)] == [job_id]
+    queue.finalizing(job_id, 'completed', final)
+    # A finalizing job no longer holds the model's only slot
+    assert [job['job_id'] for job in queue.claim('dead-worker', {('image', 'dalle3'): 5}, limits)] == ['job-2']
+    queue.finish('job-2', 'completed')
+
+    # The worker died: its finalizing job must never be generated again
+    time.sleep(0.06)
+    assert queue.requeue_expired() == 0
+    assert queue.get(job_id)['queue_state'] == 'finalizing'
+
+    async def must_not_run(*args, **kwargs):
+        raise AssertionError('finished generation was run again')
+
+    writer = lf.MetadataWriter(flush_interval=0.01, batch_size=10, terminal_memory=100, retry_base=0.01)
+    worker = lf.JobWorker(queue, poll_interval=0.01, finalize_grace=1)
+    monkeypatch.setattr(lf, 'metadata_writer', writer)
+    monkeypatch.setattr(lf, 'generate_dalle3_image', must_not_run)
+
+    async def scenario():
+        writer.start()
+        worker.start()
+        try:
+            await wait_for_state(queue, job_id, 'done')
+        finally:
+            await worker.stop()
+            await writer.stop()
+
+    asyncio.run(scenario())
+
+    assert worker.stats()['recovered'] == 1
+    bucket, key = lf.job_metadata_location('Acme', 'image', job_id)
+    stored = json.loads(lf.s3_client.get_object(Bucket=bucket, Key=key)['Body'].read())
+    assert stored['status'] == 'completed'
+
+
+def test_metadata_writes_back_off_and_fail_the_row_after_max_attempts(lf, tmp_path, monkeypatch):
+    queue = lf.DurableJobQueue(str(tmp_path / 'queue.db'), 60)
+    writer = lf.MetadataWriter(flush_interval=0.01, batch_size=10, terminal_memory=100,
+                               max_attempts=3, retry_base=0.05, retry_max=1)
+    worker = lf.JobWorker(queue, poll_interval=0.01, finalize_grace=1)
+    monkeypatch.setattr(lf, 'metadata_writer', writer)
+
+    attempts = []
+
+    def failing_put_object(**kwargs):
+        attempts.append(time.monotonic())
+        raise ConnectionError('S3 unavailable')
+
+    monkeypatch.setattr(lf.s3_client, 'put_object', failing_put_object)
+
+    job_id = str(uuid.uuid4())
+    final = {'job_id': job_id, 'type': 'image', 'model': 'dalle3', 'client': 'Acme', 'status': 'completed',
+             'created_at': '2026-01-01T00:00:00', 'completed_at': '2026-01-01T00:01:00'}
+    queue.enqueue(job_id, {'type': 'image', 'model': 'dalle3'}, [], final, 5)
+    queue.claim('worker', {('image', 'dalle3'): 5}, lf.model_rate_limits())
+    queue.finalizing(job_id, 'completed', final)
+    assert queue.get(job_id)['queue_state'] == 'finalizing'
+
+    async def scenario():
+        writer.start()
+        try:
+            worker._persist(job_id, 'completed', final)
+            await wait_for_state(queue, job_id, 'done')
+        finally:
+            await writer.stop()
+
+    asyncio.run(scenario())
+
+    assert len(attempts) == 3
+    # Exponential backoff: the second gap is at least twice the base delay
+    assert attempts[1] - attempts[0] >= 0.05
+    assert attempts[2] - attempts[1] >= 0.1
+    queued = queue.get(job_id)
+    assert queued['status'] == 'failed'
+    assert 'after 3 attempts' in queued['message']
+    assert writer.stats()['dropped'] == 1
+    assert writer.stats()['pending'] == 0
@@ -0,0 +1,64 @@
+import asyncio
+import time
+
+
+async def ticker(interval: float, stop: asyncio.Event) -> float:
+    """Tick every interval seconds and return the worst observed oversleep"""
+    max_lag = 0.0
+    while not stop.is_set():
+        started = time.monotonic()
+        await asyncio.sleep(interval)
+        max_lag = max(max_lag, time.monotonic() - started - interval)
+    return max_lag
+
+
+def test_run_blocking_keeps_event_loop_responsive(lf):
+    async def scenario():
+        stop = asyncio.Event()
+        tick = asyncio.create_task(ticker(0.01, stop))
+        await asyncio.sleep(0.05)
+        results = await asyncio.gather(*(lf.run_blocking(time.sleep, 0.5) for _ in range(4)))
+        stop.set()
+        return results, await tick
+
+    started = time.monotonic()
+    results, max_lag = asyncio.run(scenario())
+
+    assert results == [None] * 4
+    # The four sleeps ran concurrently in the executor rather than serially on the loop
+    assert time.monotonic() - started < 1.5
+    assert max_lag < 0.1
+
+
+def test_run_blocking_propagates_exceptions(lf):
+    def fail():
+        raise ValueError('boom')
+
+    async def scenario():
+        try:
+            await lf.run_blocking(fail)
+        except ValueError as e:
+            return str(e)
+
+    assert asyncio.run(scenario()) == 'boom'
+
+
+def test_progress_mirror_does_not_wait_for_io_slots(lf):
+    async def scenario():
+        slots = lf.io_slot()
+        held = 0
+        while not slots.locked():
+            await slots.acquire()
+            held += 1
+        try:
+            started = time.monotonic()
+            await asyncio.wait_for(lf.emit_progress('mirror-job', None, {
+                'job_id': 'mirror-job', 'progress': 10, 'status': 'processing', 'message': '',
+                'timestamp': '2026-01-01T00:00:00'
+            }), timeout=1)
+            return time.monotonic() - started
+        finally:
+            for _ in range(held):
+                slots.release()
+
+    assert asyncio.run(scenario()) < 0.5
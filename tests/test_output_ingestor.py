@@ -0,0 +1,89 @@
+import asyncio
+import uuid
+
+import httpx
+import pytest
+
+
+MB = 1024 * 1024
+
+
+class ChunkStream(httpx.AsyncByteStream):
+    def __init__(self, chunks: int, chunk_size: int = MB):
+        self.chunks = chunks
+        self.chunk_size = chunk_size
+        self.sent = 0
+
+    async def __aiter__(self):
+        for i in range(self.chunks):
+            self.sent += 1
+            await asyncio.sleep(0.001)
+            yield bytes([i % 256]) * self.chunk_size
+
+
+@pytest.fixture
+def source(lf, monkeypatch):
+    stream = ChunkStream(chunks=12)
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, stream=stream))
+    monkeypatch.setattr(lf.providers, '_http', httpx.AsyncClient(transport=transport))
+    return stream
+
+
+def test_ingests_large_outputs_as_multipart_upload(lf, source):
+    ingestor = lf.OutputIngestor(part_size=5 * MB, max_parts_in_flight=2)
+
+    result = asyncio.run(ingestor.ingest('https://provider.test/out.mp4', lf.VIDEO_OUTPUT_BUCKET,
+                                         'tests/ingest/out.mp4', 'video/mp4'))
+
+    assert result['bytes'] == 12 * MB
+    assert result['parts'] == 3
+    stored = lf.s3_client.get_object(Bucket=lf.VIDEO_OUTPUT_BUCKET, Key='tests/ingest/out.mp4')['Body'].read()
+    assert stored == b''.join(bytes([i]) * MB for i in range(12))
+
+
+def test_failed_part_stops_the_download_early(lf, source, monkeypatch):
+    source.chunks = 200
+
+    def reject_part(**kwargs):
+        raise RuntimeError('part rejected')
+
+    monkeypatch.setattr(lf.s3_client, 'upload_part', reject_part)
+    ingestor = lf.OutputIngestor(part_size=5 * MB, max_parts_in_flight=4)
+
+    with pytest.raises(RuntimeError, match='part rejected'):
+        asyncio.run(ingestor.ingest('https://provider.test/out.mp4', lf.VIDEO_OUTPUT_BUCKET,
+                                    'tests/ingest/failed.mp4', 'video/mp4'))
+
+    assert source.sent < 50
+    assert ingestor.failures == 1
+
+
+def test_runway_job_fails_when_its_output_cannot_be_saved(lf, monkeypatch):
+    def runway(request):
+        return httpx.Response(200, json={'id': 'task-1'})
+
+    async def finished(task_id, on_update, state):
+        return {'status': 'SUCCEEDED', 'output': ['https://runway.test/output.mp4']}
+
+    attempts = []
+
+    async def unavailable(source_url, bucket, key, content_type, **kwargs):
+        attempts.append(source_url)
+        raise httpx.ConnectError('Runway storage unavailable')
+
+    monkeypatch.setattr(lf.providers, '_runway', httpx.AsyncClient(base_url=lf.RUNWAY_API_BASE,
+                                                                   transport=httpx.MockTransport(runway)))
+    monkeypatch.setattr(lf.runway_poller, 'watch', finished)
+    monkeypatch.setattr(lf.output_ingestor, 'ingest', unavailable)
+    monkeypatch.setattr(lf, 'INGEST_RETRY_DELAY', 0)
+
+    job_id = str(uuid.uuid4())
+    request = lf.UnifiedGenerateRequest(type='video', model='runway', prompt='a lighthouse', client='Acme')
+    metadata = {'job_id': job_id, 'type': 'video', 'model': 'runway', 'client': 'Acme'}
+    asyncio.run(lf.generate_runway_video(job_id, request, [], metadata))
+
+    assert len(attempts) == lf.INGEST_ATTEMPTS
+    assert lf.job_store.get(job_id)['status'] == 'failed'
+    assert metadata['status'] == 'failed'
+    assert 'Runway storage unavailable' in metadata['ingest_error']
+    assert metadata['runway_output_url'] == 'https://runway.test/output.mp4'
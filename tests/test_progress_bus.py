@@ -0,0 +1,55 @@
+import asyncio
+import multiprocessing
+
+import pytest
+
+
+def test_worker_processes_refuse_an_in_process_bus(lf, monkeypatch):
+    started = []
+    monkeypatch.setattr(lf, 'progress_bus', lf.InMemoryProgressBus(10))
+    monkeypatch.setattr(multiprocessing, 'get_context', lambda method: started.append(method))
+
+    assert lf.run_workers(2) == 1
+    assert started == []
+
+
+def test_bus_backends_must_implement_the_transport(lf):
+    class Incomplete(lf.ProgressBus):
+        async def publish(self, websocket_id, data):
+            pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_events_reach_every_handler_even_when_one_fails(lf):
+    bus = lf.InMemoryProgressBus(max_jobs=2)
+    received = []
+
+    async def failing(websocket_id, data):
+        raise RuntimeError('socket gone')
+
+    async def handler(websocket_id, data):
+        received.append((websocket_id, data['progress']))
+
+    bus.subscribe(failing)
+    bus.subscribe(handler)
+
+    async def scenario():
+        await bus.publish('ws-1', {'job_id': 'job', 'progress': 40})
+        for job_id in ('a', 'b', 'c'):
+            await bus.set_state(job_id, {'job_id': job_id})
+        return [await bus.get_state(job_id) for job_id in ('a', 'b', 'c')]
+
+    states = asyncio.run(scenario())
+
+    assert received == [('ws-1', 40)]
+    assert bus.stats()['published'] == bus.stats()['delivered'] == 1
+    # Shared state is bounded like the job store
+    assert states == [None, {'job_id': 'b'}, {'job_id': 'c'}]
+
+
+def test_bus_backend_follows_the_url_scheme(lf):
+    assert isinstance(lf.create_progress_bus('memory://'), lf.InMemoryProgressBus)
+    assert isinstance(lf.create_progress_bus('redis://localhost:6379/0'), lf.RedisProgressBus)
+    assert isinstance(lf.create_progress_bus('kafka://broker:9092'), lf.InMemoryProgressBus)
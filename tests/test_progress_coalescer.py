@@ -0,0 +1,71 @@
+import asyncio
+
+
+def test_evicted_jobs_are_dropped_from_the_coalescer(lf):
+    store = lf.JobStore(max_jobs=2, finished_ttl=60)
+    sent = []
+
+    async def emit(job_id, websocket_id, data):
+        sent.append((job_id, data['progress']))
+
+    coalescer = lf.ProgressCoalescer(min_interval=60, emit=emit)
+    store.on_evict(coalescer.forget)
+
+    async def progress(job_id, value):
+        store.update_progress(job_id, value, 'processing')
+        await coalescer.submit(job_id, None, {'progress': value, 'status': 'processing'})
+
+    async def scenario():
+        await progress('a', 10)
+        await progress('a', 20)  # Throttled - waits on a timer
+        await progress('b', 10)
+        assert coalescer.stats()['tracked_jobs'] == 2
+
+        await progress('c', 10)  # Evicts 'a', the least recently used job
+        assert 'a' not in store
+        assert coalescer.stats()['tracked_jobs'] == 2
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+
+    assert ('a', 20) not in sent
+
+
+def test_updates_are_throttled_but_status_changes_go_out_at_once(lf):
+    sent = []
+
+    async def emit(job_id, websocket_id, data):
+        sent.append((data['progress'], data['status']))
+
+    coalescer = lf.ProgressCoalescer(min_interval=0.05, emit=emit)
+
+    async def scenario():
+        for progress, status in [(10, 'processing'), (10, 'processing'), (20, 'processing'), (30, 'processing'),
+                                 (40, 'processing')]:
+            await coalescer.submit('job', None, {'progress': progress, 'status': status})
+        assert sent == [(10, 'processing')]
+        await asyncio.sleep(0.1)
+        assert sent == [(10, 'processing'), (40, 'processing')]
+
+        # The interval has passed, so the next update goes straight out and the one after it waits
+        await coalescer.submit('job', None, {'progress': 45, 'status': 'processing'})
+        await coalescer.submit('job', None, {'progress': 50, 'status': 'processing'})
+        # The terminal update replaces the held-back one and is never delayed
+        await coalescer.submit('job', None, {'progress': 100, 'status': 'completed'})
+
+    asyncio.run(scenario())
+
+    assert sent == [(10, 'processing'), (40, 'processing'), (45, 'processing'), (100, 'completed')]
+    stats = coalescer.stats()
+    assert (stats['suppressed'], stats['coalesced'], stats['tracked_jobs']) == (1, 3, 0)
+
+
+def test_msgpack_frames_carry_epoch_timestamps(lf):
+    data = {'job_id': 'job', 'progress': 50, 'status': 'processing', 'message': '',
+            'timestamp': '2026-01-01T12:00:00.250000'}
+
+    decoded = lf.msgpack.unpackb(lf.encode_msgpack(data))
+
+    assert decoded['timestamp'] == lf.datetime.fromisoformat(data['timestamp']).timestamp()
+    assert {k: v for k, v in decoded.items() if k != 'timestamp'} == {k: v for k, v in data.items() if k != 'timestamp'}
+    assert len(lf.encode_msgpack(data)) < len(lf.json_bytes(data))
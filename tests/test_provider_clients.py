@@ -0,0 +1,43 @@
+import asyncio
+
+import httpx
+
+
+def test_clients_are_shared_until_closed(lf):
+    providers = lf.ProviderClients()
+
+    async def scenario():
+        http, runway = providers.http(), providers.runway()
+        assert providers.http() is http and providers.runway() is runway
+        assert runway.headers['Authorization'] == f'Bearer {lf.RUNWAY_API_KEY}'
+
+        await providers.close()
+        assert http.is_closed and runway.is_closed
+        # Background workers without the lifespan get a fresh client on first use
+        assert providers.http() is not http
+        await providers.close()
+
+    asyncio.run(scenario())
+
+
+def test_start_warms_configured_providers_only(lf, monkeypatch):
+    monkeypatch.setitem(lf.MODEL_REGISTRY['video']['runway'], 'available', True)
+    for models in lf.MODEL_REGISTRY.values():
+        for model, info in models.items():
+            if model != 'runway':
+                monkeypatch.setitem(info, 'available', False)
+
+    warmed = []
+    providers = lf.ProviderClients()
+    providers._runway = httpx.AsyncClient(base_url=lf.RUNWAY_API_BASE, transport=httpx.MockTransport(
+        lambda request: warmed.append((request.method, str(request.url))) or httpx.Response(200)
+    ))
+
+    async def scenario():
+        await providers.start()
+        assert providers._openai is None and providers._genai is None
+        await providers.close()
+
+    asyncio.run(scenario())
+
+    assert warmed == [('HEAD', lf.RUNWAY_API_BASE)]
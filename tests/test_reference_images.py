@@ -0,0 +1,74 @@
+import asyncio
+import base64
+import json
+import uuid
+
+import botocore.exceptions
+import httpx
+import pytest
+from fastapi import HTTPException
+
+
+def image_request(lf, references, model='veo3'):
+    return lf.UnifiedGenerateRequest(type='video', model=model, prompt='a lighthouse', client='Acme',
+                                     reference_images=references)
+
+
+def prepare(lf, request):
+    return asyncio.run(lf.prepare_job(str(uuid.uuid4()), request, {}))
+
+
+def data_url(raw: bytes) -> str:
+    return 'data:image/png;base64,' + base64.b64encode(raw).decode('ascii')
+
+
+def test_data_urls_are_stored_as_handles(lf):
+    reference_urls, metadata = prepare(lf, image_request(lf, [data_url(b'png-1')]))
+
+    assert len(reference_urls) == 1 and lf.is_reference_handle(reference_urls[0])
+    assert metadata['reference_images'] == reference_urls
+
+    # A stored handle can be passed straight back in
+    assert prepare(lf, image_request(lf, reference_urls))[0] == reference_urls
+
+
+def test_malformed_and_unknown_references_are_rejected(lf):
+    with pytest.raises(HTTPException) as error:
+        prepare(lf, image_request(lf, ['data:image/png;base64,not base64!']))
+    assert error.value.status_code == 400
+
+    with pytest.raises(HTTPException) as error:
+        prepare(lf, image_request(lf, ['ref:sha256:' + '0' * 64]))
+    assert error.value.status_code == 400
+
+
+def test_storage_failures_are_reported_as_bad_gateway(lf, monkeypatch):
+    def unavailable(**kwargs):
+        raise botocore.exceptions.ClientError({'Error': {'Code': 'SlowDown'}}, 'PutObject')
+
+    monkeypatch.setattr(lf.s3_client, 'put_object', unavailable)
+
+    with pytest.raises(HTTPException) as error:
+        prepare(lf, image_request(lf, [data_url(b'png-unstored')]))
+    assert error.value.status_code == 502
+
+
+def test_runway_starts_from_the_presigned_reference(lf, monkeypatch):
+    submitted = []
+
+    def runway(request):
+        submitted.append((request.url.path, json.loads(request.content)))
+        return httpx.Response(503, text='unavailable')
+
+    client = httpx.AsyncClient(base_url=lf.RUNWAY_API_BASE, transport=httpx.MockTransport(runway))
+    monkeypatch.setattr(lf.providers, '_runway', client)
+    request = image_request(lf, [data_url(b'png-runway')], model='runway')
+    reference_urls, metadata = prepare(lf, request)
+
+    job_id = str(uuid.uuid4())
+    asyncio.run(lf.generate_runway_video(job_id, request, reference_urls, metadata))
+
+    path, body = submitted[0]
+    assert path.endswith('/image_to_video')
+    assert body['promptImage'] == lf.reference_store.presigned_url(reference_urls[0])
+    assert lf.job_store.get(job_id)['status'] == 'failed'
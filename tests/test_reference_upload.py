@@ -0,0 +1,91 @@
+import asyncio
+import hashlib
+
+import pytest
+from fastapi import HTTPException, Request
+from fastapi.testclient import TestClient
+
+
+BOUNDARY = 'reference-boundary'
+PNG = b'\x89PNG\r\n\x1a\n'
+
+
+def part(filename, data, content_type='image/png', name='files'):
+    return (
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+        f'Content-Type: {content_type}\r\n\r\n'
+    ).encode() + data + b'\r\n'
+
+
+def body(*parts):
+    return b''.join(parts) + f'--{BOUNDARY}--\r\n'.encode()
+
+
+@pytest.fixture
+def client(lf):
+    return TestClient(lf.app)
+
+
+def post(client, content, **headers):
+    return client.post('/api/reference_images', content=content, headers={
+        'content-type': f'multipart/form-data; boundary={BOUNDARY}', **headers
+    })
+
+
+def test_uploads_are_content_addressed_and_deduplicated(lf, client):
+    image = PNG + b'a' * 3 * 1024 * 1024
+    response = post(client, body(part('one.png', image), part('copy.png', image), part('two.png', PNG + b'-2')))
+
+    assert response.status_code == 200
+    references = response.json()['references']
+    assert [r['filename'] for r in references] == ['one.png', 'copy.png', 'two.png']
+    assert references[0]['handle'] == f"ref:sha256:{hashlib.sha256(image).hexdigest()}"
+    assert references[0]['handle'] == references[1]['handle']
+    assert [r['deduplicated'] for r in references] == [False, True, False]
+    assert references[0]['size'] == len(image)
+    stored = lf.s3_client.get_object(Bucket=lf.REFERENCE_IMAGES_BUCKET, Key=lf.reference_store.key_for(references[0]['handle']))
+    assert stored['Body'].read() == image
+
+
+def test_oversized_content_length_is_rejected_before_parsing(lf, client, monkeypatch):
+    monkeypatch.setattr(lf, 'MAX_REFERENCE_IMAGE_BYTES', 1024)
+    monkeypatch.setattr(lf, 'MAX_REFERENCE_UPLOAD_FILES', 1)
+
+    response = post(client, body(part('big.png', b'x' * 200 * 1024)))
+
+    assert response.status_code == 413
+
+
+def test_oversized_file_stops_reading_the_stream(lf, monkeypatch):
+    monkeypatch.setattr(lf, 'MAX_REFERENCE_IMAGE_BYTES', 64 * 1024)
+    chunks = [part('big.png', PNG)[:-2]] + [b'x' * 16 * 1024] * 1000
+    received = []
+
+    async def receive():
+        received.append(1)
+        return {'type': 'http.request', 'body': chunks[len(received) - 1], 'more_body': len(received) < len(chunks)}
+
+    # Chunked transfer, so there is no Content-Length to reject up front
+    request = Request({
+        'type': 'http', 'method': 'POST', 'path': '/api/reference_images',
+        'headers': [(b'content-type', f'multipart/form-data; boundary={BOUNDARY}'.encode())]
+    }, receive)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(lf.upload_reference_images(request))
+
+    assert error.value.status_code == 413
+    assert len(received) < 10
+
+
+def test_rejects_non_images_and_surplus_files(lf, client, monkeypatch):
+    assert post(client, body(part('notes.txt', b'hello', content_type='text/plain'))).status_code == 415
+    # The declared type is not trusted - only the file's own bytes
+    assert post(client, body(part('fake.png', b'<html>not an image</html>'))).status_code == 415
+    jpeg = post(client, body(part('photo.png', b'\xff\xd8\xff\xe0' + b'j' * 32, content_type='text/plain')))
+    assert jpeg.status_code == 200
+    assert jpeg.json()['references'][0]['content_type'] == 'image/jpeg'
+
+    monkeypatch.setattr(lf, 'MAX_REFERENCE_UPLOAD_FILES', 1)
+    response = post(client, body(part('a.png', PNG + b'a'), part('b.png', PNG + b'b')))
+    assert response.status_code == 400
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+
+def test_token_bucket_allows_a_burst_then_paces(lf, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(lf.time, 'monotonic', lambda: now[0])
+    bucket = lf.TokenBucket(rate=2, burst=3)
+
+    assert [bucket.take() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.take() == pytest.approx(0.5)
+
+    now[0] += 0.5
+    assert bucket.take() == 0.0
+    now[0] += 100
+    assert [bucket.take() for _ in range(4)][-1] > 0  # Refill never exceeds the burst
+
+
+def test_lanes_run_by_priority_within_the_cap_without_blocking_other_models(lf, monkeypatch):
+    fast = {'requests_per_minute': 6000, 'burst': 10, 'max_concurrent': 2}
+    monkeypatch.setitem(lf.MODEL_REGISTRY['video']['runway'], 'rate_limit', dict(fast, max_concurrent=1))
+    monkeypatch.setitem(lf.MODEL_REGISTRY['image']['dalle3'], 'rate_limit', fast)
+    started = []
+    release = {}
+
+    def job(name):
+        async def run():
+            started.append(name)
+            release[name] = asyncio.Event()
+            await release[name].wait()
+        return run
+
+    async def settle():
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+    async def scenario():
+        scheduler = lf.GenerationScheduler()
+        try:
+            scheduler.submit('video', 'runway', 'r-low', None, job('r-low'), priority=9)
+            await settle()
+            scheduler.submit('video', 'runway', 'r-later', None, job('r-later'), priority=5)
+            scheduler.submit('video', 'runway', 'r-urgent', None, job('r-urgent'), priority=1)
+            scheduler.submit('image', 'dalle3', 'd-1', None, job('d-1'))
+            await settle()
+
+            # Runway is at its cap of one; DALL-E runs regardless
+            assert started == ['r-low', 'd-1']
+            assert scheduler.queue_info('r-later')['queue_position'] == 2
+
+            release['r-low'].set()
+            await settle()
+            release['r-urgent'].set()
+            await settle()
+            assert started == ['r-low', 'd-1', 'r-urgent', 'r-later']
+            assert scheduler.stats()['video/runway']['dispatched'] == 3
+        finally:
+            await scheduler.stop()
+
+    asyncio.run(scenario())
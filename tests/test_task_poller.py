@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+
+def poller(lf, fetch, **kwargs):
+    options = {'intervals': {'PENDING': (0.01, 0.05), 'RUNNING': (0.01, 0.05)}, 'success_states': {'SUCCEEDED'},
+               'failure_states': {'FAILED'}, 'timeout': 5}
+    options.update(kwargs)
+    return lf.TaskPoller('Test', fetch, **options)
+
+
+def test_one_loop_tracks_many_tasks_through_their_states(lf):
+    script = {f'task-{i}': ['PENDING', 'RUNNING', 'RUNNING', 'SUCCEEDED'] for i in range(20)}
+    polls = []
+    updates = []
+
+    async def fetch(task_id):
+        polls.append(task_id)
+        state = script[task_id].pop(0)
+        return state, {'id': task_id, 'output': [f'https://runway.test/{task_id}.mp4']}
+
+    async def scenario():
+        tasks = poller(lf, fetch)
+        try:
+            async def on_update(state, elapsed):
+                updates.append(state)
+
+            results = await asyncio.gather(*(tasks.watch(task_id, on_update, state='PENDING') for task_id in script))
+            return results, tasks.stats()
+        finally:
+            await tasks.stop()
+
+    results, stats = asyncio.run(scenario())
+
+    assert [result['id'] for result in results] == list(script)
+    assert stats['polls'] == len(polls) == 20 * 4
+    # PENDING -> RUNNING is the only change; terminal states resolve the task instead
+    assert stats['state_changes'] == 20
+    assert updates.count('RUNNING') == 40
+    assert stats['outstanding'] == 0
+
+
+def test_failures_and_timeouts_are_raised_to_the_watcher(lf):
+    async def fetch(task_id):
+        if task_id == 'broken':
+            return 'FAILED', {'error': 'content policy'}
+        return 'RUNNING', None
+
+    async def scenario():
+        tasks = poller(lf, fetch, timeout=0.1)
+        try:
+            with pytest.raises(Exception, match='content policy'):
+                await tasks.watch('broken')
+            with pytest.raises(Exception, match='timeout'):
+                await tasks.watch('stuck')
+        finally:
+            await tasks.stop()
+
+    asyncio.run(scenario())
+
+
+def test_poll_interval_grows_with_elapsed_time_within_the_state_window(lf):
+    tasks = poller(lf, None, intervals={'PENDING': (1.0, 10.0)}, elapsed_factor=0.5)
+    task = lf.PolledTask('task', None, None)
+    task.state = 'PENDING'
+
+    task.started_at -= 1
+    assert tasks._interval_for(task) == pytest.approx(1.0)
+    task.started_at -= 9
+    assert tasks._interval_for(task) == pytest.approx(5.0, abs=0.01)
+    task.started_at -= 100
+    assert tasks._interval_for(task) == 10.0
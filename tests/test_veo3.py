@@ -0,0 +1,75 @@
+import asyncio
+import uuid
+
+import pytest
+
+from fake_genai import FakeVeoOperations
+
+
+@pytest.fixture
+def veo(lf, monkeypatch):
+    fake = FakeVeoOperations()
+    monkeypatch.setattr(lf.providers, '_genai', fake.client())
+    return fake
+
+
+def veo_request(lf, **overrides):
+    fields = dict(type='video', model='veo3', prompt='a lighthouse at dusk', client='Acme', aspect_ratio='16:9', duration=6)
+    fields.update(overrides)
+    return lf.UnifiedGenerateRequest(**fields)
+
+
+def run_job(lf, job_id, request, metadata, provider_task_id=None):
+    async def scenario():
+        try:
+            await lf.generate_veo3_video(job_id, request, [], metadata, provider_task_id=provider_task_id)
+        finally:
+            await lf.veo_poller.stop()
+
+    asyncio.run(scenario())
+    return lf.job_store.get(job_id)
+
+
+def test_fresh_job_submits_operation_and_stores_video(lf, veo):
+    job_id = str(uuid.uuid4())
+    request = veo_request(lf)
+    metadata = {'duration': lf.normalized_duration_for(request)}
+
+    state = run_job(lf, job_id, request, metadata)
+
+    assert state['status'] == 'completed'
+    assert len(veo.submissions) == 1
+    config = veo.submissions[0]['config']
+    assert config.duration_seconds == 6
+    assert config.aspect_ratio == '16:9'
+    assert metadata['veo_operation'] == veo.submissions[0]['name']
+    stored = lf.s3_client.get_object(Bucket=lf.VIDEO_OUTPUT_BUCKET, Key=metadata['video_key'])
+    assert stored['Body'].read() == b'fake-mp4'
+
+
+def test_resumed_job_tracks_existing_operation(lf, veo):
+    job_id = str(uuid.uuid4())
+    request = veo_request(lf)
+    operation_name = veo.start_operation(lf.VEO3_MODEL_ID)
+    metadata = {'duration': 6}
+
+    state = run_job(lf, job_id, request, metadata, provider_task_id=operation_name)
+
+    assert state['status'] == 'completed'
+    assert veo.submissions == []
+    assert veo.operations[operation_name]['polls'] == veo.polls_until_done
+    assert metadata['veo_operation'] == operation_name
+
+
+def test_safety_filtered_job_fails_with_reasons(lf, veo):
+    veo.filtered_reasons = ['Video could not be generated due to safety filters']
+    job_id = str(uuid.uuid4())
+    request = veo_request(lf)
+    metadata = {'duration': 6}
+
+    state = run_job(lf, job_id, request, metadata)
+
+    assert state['status'] == 'failed'
+    assert metadata['status'] == 'failed'
+    assert 'safety filters' in metadata['error']
+    assert 'video_key' not in metadata
@@ -0,0 +1,58 @@
+import anyio.from_thread
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def client(lf):
+    # Every socket on one event loop, without running the app lifespan
+    with anyio.from_thread.start_blocking_portal() as portal:
+        client = TestClient(lf.app)
+        client.portal = portal
+        yield client
+
+
+def progress(job_id, value):
+    return {'job_id': job_id, 'progress': value, 'status': 'processing', 'message': '',
+            'timestamp': '2026-01-01T00:00:00'}
+
+
+def test_events_reach_every_socket_of_the_client_and_job_subscribers(lf, client):
+    with client.websocket_connect('/ws/client-a') as first, client.websocket_connect('/ws/client-a') as second, \
+            client.websocket_connect('/ws/watcher') as watcher:
+        watcher.send_json({'action': 'subscribe', 'job_ids': ['job-1']})
+        assert watcher.receive_json() == {'type': 'subscribed', 'job_ids': ['job-1']}
+
+        client.portal.call(lf.manager.send_progress, 'client-a', progress('job-1', 10))
+        client.portal.call(lf.manager.send_progress, 'client-a', progress('job-2', 20))
+
+        assert [first.receive_json()['progress'] for _ in range(2)] == [10, 20]
+        assert [second.receive_json()['progress'] for _ in range(2)] == [10, 20]
+        assert watcher.receive_json()['job_id'] == 'job-1'
+
+        watcher.send_json({'action': 'unsubscribe', 'job_ids': ['job-1']})
+        assert watcher.receive_json()['type'] == 'unsubscribed'
+        client.portal.call(lf.manager.send_progress, 'client-a', progress('job-1', 30))
+        watcher.send_json({'action': 'ping'})
+        assert watcher.receive_json() == {'type': 'pong'}
+
+
+def test_subscription_limit_and_msgpack_encoding(lf, client, monkeypatch):
+    monkeypatch.setattr(lf.manager, 'max_subscriptions', 2)
+
+    with client.websocket_connect('/ws/client-b', subprotocols=['msgpack']) as socket:
+        assert socket.accepted_subprotocol == 'msgpack'
+        socket.send_bytes(lf.msgpack.packb({'action': 'subscribe', 'job_ids': ['a', 'b', 'c']}))
+
+        assert lf.msgpack.unpackb(socket.receive_bytes()) == {'type': 'subscribed', 'job_ids': ['a', 'b']}
+        assert 'limit' in lf.msgpack.unpackb(socket.receive_bytes())['message']
+
+
+def test_slow_consumers_drop_their_oldest_messages(lf):
+    connection = lf.Connection(websocket=None, client_id='slow', encoding='json', queue_size=3)
+
+    for value in range(5):
+        connection.enqueue(progress('job', value))
+
+    assert connection.dropped == 2
+    assert [data['progress'] for data in connection.queue] == [2, 3, 4]